@@ -0,0 +1,81 @@
+"""Caché de compilaciones completas.
+
+Si no ha cambiado nada de lo que entra en una compilación (el Excel, las
+constantes de maquetación, las imágenes, las fuentes y el propio código), el
+resultado es el mismo: en vez de maquetar otra vez se copian los ficheros que
+salieron la última vez. La clave es un BLAKE2b de todas esas entradas y cada
+entrada de la caché es una carpeta `CARPETA_CACHE/<clave>` con los ficheros de
+salida (ficheros o carpetas, como la web estática). Se guardan las
+`MAX_ENTRADAS` usadas más recientemente.
+"""
+
+import hashlib
+import os
+import shutil
+
+CARPETA_CACHE = ".cache_compilacion"
+MAX_ENTRADAS = 4
+
+
+def huella_entradas(ficheros, configuracion):
+    """Clave de caché: el contenido de `ficheros` (los que no existen cuentan
+    como ausentes) más el `repr` de `configuracion`. Los ficheros se
+    identifican por su nombre, no por su ruta, para que la clave no dependa
+    de la carpeta desde la que se compila."""
+    h = hashlib.blake2b(repr(configuracion).encode(), digest_size=16)
+    for ruta in ficheros:
+        h.update(b"\0" + os.path.basename(ruta).encode() + b"\0")
+        if not os.path.exists(ruta):
+            h.update(b"-")
+            continue
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+    return h.hexdigest()
+
+
+def _copiar(origen, destino):
+    """Copia un fichero o una carpeta y la pone en `destino` de una vez."""
+    tmp = destino + ".tmp"
+    if os.path.isdir(origen):
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(origen, tmp)
+        shutil.rmtree(destino, ignore_errors=True)
+    else:
+        shutil.copyfile(origen, tmp)
+    os.replace(tmp, destino)
+
+
+def restaurar(clave, destinos, carpeta=CARPETA_CACHE):
+    """Copia los ficheros de la entrada `clave` a `destinos` (nombre en la
+    caché → ruta). Devuelve False, sin tocar nada, si la entrada no existe o
+    le falta alguno."""
+    entrada = os.path.join(carpeta, clave)
+    origenes = {nombre: os.path.join(entrada, nombre) for nombre in destinos}
+    if not all(os.path.exists(o) for o in origenes.values()):
+        return False
+    for nombre, destino in destinos.items():
+        _copiar(origenes[nombre], destino)
+    os.utime(entrada)  # la marca de tiempo decide qué entradas se podan
+    return True
+
+
+def guardar(clave, ficheros, carpeta=CARPETA_CACHE, max_entradas=MAX_ENTRADAS):
+    """Guarda `ficheros` (nombre en la caché → ruta) como la entrada `clave`
+    y poda las entradas menos usadas."""
+    entrada = os.path.join(carpeta, clave)
+    tmp = entrada + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for nombre, ruta in ficheros.items():
+        _copiar(ruta, os.path.join(tmp, nombre))
+    shutil.rmtree(entrada, ignore_errors=True)
+    os.replace(tmp, entrada)
+
+    entradas = sorted(
+        (e for e in os.scandir(carpeta) if e.is_dir() and not e.name.endswith(".tmp")),
+        key=lambda e: e.stat().st_mtime,
+        reverse=True,
+    )
+    for vieja in entradas[max_entradas:]:
+        shutil.rmtree(vieja.path, ignore_errors=True)
@@ -0,0 +1,209 @@
+"""Comparación de un registro nuevo con el de la compilación anterior.
+
+Cada hotel se identifica por su `N. REGISTRO` (o, si no lo tiene, por una
+clave compuesta CP + localidad + nombre) y se resume en una huella de los
+campos que se ven impresos en la guía. Comparando las huellas con la
+instantánea guardada de la última compilación se obtienen, en tiempo lineal,
+los hoteles añadidos, eliminados y modificados y las provincias afectadas.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+from normalizacion import VACIOS, nombre_clave, normalizar_ciudad
+
+# Campos que cambian lo que se imprime (o dónde se imprime) de cada hotel
+CAMPOS_VISIBLES = [
+    "NOMBRE DE EMPRESA",
+    "N. REGISTRO",
+    "CLASIFICACION HOTEL",
+    "NRO. HABITACIONES",
+    "MODALIDAD",
+    "DIRECCION",
+    "CP",
+    "LOCALIDAD",
+    "PROVINCIA",
+    "TELEFONO1",
+    "SITIO WEB",
+]
+
+VERSION_INSTANTANEA = 2
+
+def claves_hotel(df):
+    """Clave estable de cada fila, en el orden del DataFrame.
+
+    `N. REGISTRO` si es válido; si no, "CP|LOCALIDAD|NOMBRE". Si una clave se
+    repite (registros duplicados en el Excel) se numeran las apariciones
+    ("#2", "#3"...) para que ninguna fila pise a otra.
+    """
+    vistas = {}
+    claves = []
+    for reg, cp, loc, nombre in zip(
+        df["N. REGISTRO"], df["CP"], df["LOCALIDAD"], df["NOMBRE DE EMPRESA"]
+    ):
+        reg = str(reg).strip()
+        if reg not in VACIOS:
+            clave = "R:" + "".join(reg.upper().split())
+        else:
+            clave = f"C:{cp}|{normalizar_ciudad(loc)}|{nombre_clave(nombre)}"
+        n = vistas.get(clave, 0) + 1
+        vistas[clave] = n
+        claves.append(clave if n == 1 else f"{clave}#{n}")
+    return claves
+
+
+def _texto_campo(valor):
+    texto = "" if valor is None else str(valor)
+    return "" if texto in VACIOS else texto
+
+
+def huellas_registro(df):
+    """Devuelve {clave: [huella, provincia, nombre]} para todas las filas.
+
+    La huella son 8 bytes de BLAKE2b (en hexadecimal) sobre los
+    `CAMPOS_VISIBLES`; basta para detectar cualquier cambio de impresión.
+    Los valores vacíos ("-", NaN, <NA>...) cuentan todos como "", así la
+    huella no depende de los tipos de columna (p. ej. del modo compacto).
+    """
+    columnas = [df[c] if c in df.columns else [""] * len(df) for c in CAMPOS_VISIBLES]
+    huellas = {}
+    for clave, valores in zip(claves_hotel(df), zip(*columnas)):
+        texto = "\x1f".join(_texto_campo(v) for v in valores)
+        h = hashlib.blake2b(texto.encode("utf-8"), digest_size=8).hexdigest()
+        provincia = str(valores[CAMPOS_VISIBLES.index("PROVINCIA")])
+        nombre = str(valores[0]).strip()
+        huellas[clave] = [h, provincia, nombre]
+    return huellas
+
+
+def cargar_instantanea(ruta):
+    """Lee la instantánea de la compilación anterior (None si no hay)."""
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with gzip.open(ruta, "rt", encoding="utf-8") as f:
+            datos = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"No se pudo leer la instantánea {ruta}: {e}")
+        return None
+    if datos.get("version") != VERSION_INSTANTANEA:
+        return None
+    return datos
+
+
+def guardar_instantanea(ruta, huellas, paginas_provincia, maquetacion,
+                        hotel_pages, loc_pages):
+    """Guarda lo mínimo para comparar y reaprovechar en la próxima compilación:
+    huellas por hotel, páginas que ocupa cada provincia, la huella de la
+    configuración de maquetación y los números de página de los índices."""
+    datos = {
+        "version": VERSION_INSTANTANEA,
+        "maquetacion": maquetacion,
+        "hoteles": huellas,
+        "provincias": paginas_provincia,
+        "indice_hoteles": hotel_pages,
+        "indice_poblaciones": loc_pages,
+    }
+    tmp = ruta + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, ruta)
+
+
+def calcular_delta(anterior, actuales):
+    """Compara las huellas de la instantánea `anterior` con las `actuales`.
+
+    Devuelve un dict con los conjuntos de claves `añadidos`, `eliminados` y
+    `modificados` y el conjunto `provincias` de provincias afectadas (las de
+    antes y después de cada cambio, por si un hotel cambia de provincia).
+    """
+    previas = anterior["hoteles"] if anterior else {}
+    añadidos = set()
+    modificados = set()
+    provincias = set()
+    for clave, (huella, provincia, _nombre) in actuales.items():
+        previa = previas.get(clave)
+        if previa is None:
+            añadidos.add(clave)
+            provincias.add(provincia)
+        elif previa[0] != huella:
+            modificados.add(clave)
+            provincias.add(provincia)
+            provincias.add(previa[1])
+    eliminados = {c for c in previas if c not in actuales}
+    for clave in eliminados:
+        provincias.add(previas[clave][1])
+    return {
+        "añadidos": añadidos,
+        "eliminados": eliminados,
+        "modificados": modificados,
+        "provincias": provincias,
+    }
+
+
+def diferencias_indice(anterior, actual):
+    """Entradas de un índice (nombre → página) que aparecen, desaparecen o
+    cambian de página. Devuelve una lista ordenada de (nombre, antes, después)."""
+    anterior = anterior or {}
+    cambios = []
+    for nombre, pagina in actual.items():
+        if anterior.get(nombre) != pagina:
+            cambios.append((nombre, anterior.get(nombre), pagina))
+    for nombre, pagina in anterior.items():
+        if nombre not in actual:
+            cambios.append((nombre, pagina, None))
+    cambios.sort(key=lambda c: normalizar_ciudad(c[0]))
+    return cambios
+
+
+def escribir_informe(ruta, delta, anterior, actuales, cambios_hoteles, cambios_poblaciones):
+    """Informe de cambios en texto plano para los editores."""
+    previas = anterior["hoteles"] if anterior else {}
+
+    def _nombre(clave):
+        datos = actuales.get(clave) or previas.get(clave)
+        return datos[2]
+
+    def _provincia(clave):
+        datos = actuales.get(clave) or previas.get(clave)
+        return datos[1]
+
+    lineas = ["INFORME DE CAMBIOS DEL REGISTRO DE HOTELES", ""]
+    if anterior is None:
+        lineas.append("No hay compilación anterior: todo el registro se considera nuevo.")
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+        return
+    lineas.append(f"Hoteles añadidos:    {len(delta['añadidos'])}")
+    lineas.append(f"Hoteles eliminados:  {len(delta['eliminados'])}")
+    lineas.append(f"Hoteles modificados: {len(delta['modificados'])}")
+    lineas.append(f"Provincias afectadas: {len(delta['provincias'])}")
+    lineas.append("")
+
+    por_provincia = {}
+    for marca, conjunto in (("+", "añadidos"), ("-", "eliminados"), ("~", "modificados")):
+        for clave in delta[conjunto]:
+            por_provincia.setdefault(_provincia(clave), []).append((marca, _nombre(clave), clave))
+    for provincia in sorted(por_provincia, key=normalizar_ciudad):
+        lineas.append(f"== {provincia} ==")
+        for marca, nombre, clave in sorted(
+            por_provincia[provincia], key=lambda e: (normalizar_ciudad(e[1]), e[0])
+        ):
+            lineas.append(f"  {marca} {nombre}  [{clave}]")
+        lineas.append("")
+
+    for titulo, cambios in (
+        ("ÍNDICE DE HOTELES", cambios_hoteles),
+        ("ÍNDICE DE POBLACIONES", cambios_poblaciones),
+    ):
+        lineas.append(f"{titulo}: {len(cambios)} entradas cambian")
+        for nombre, antes, despues in cambios:
+            antes_txt = "-" if antes is None else str(antes)
+            despues_txt = "-" if despues is None else str(despues)
+            lineas.append(f"  {nombre}: {antes_txt} -> {despues_txt}")
+        lineas.append("")
+
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("\n".join(lineas) + "\n")
@@ -0,0 +1,155 @@
+"""Detección de hoteles casi duplicados en el registro.
+
+El mismo hotel aparece a veces con el nombre escrito de formas distintas
+("HOTEL SOL", "SOL S.L.", "Hotel Sol, S.L."). Comparar todas las parejas es
+cuadrático, así que solo se comparan los hoteles del mismo bloque (mismo CP
+y misma localidad normalizada) y, dentro de cada bloque, solo las parejas
+que comparten algún trigrama del nombre, usando un índice invertido. La
+similitud es el coeficiente de Dice sobre los trigramas del nombre.
+"""
+
+import csv
+import re
+
+from delta_registro import CAMPOS_VISIBLES
+from normalizacion import VACIOS, nombre_clave, normalizar_ciudad
+
+# Similitud mínima (Dice sobre trigramas) para proponer una fusión
+UMBRAL_SIMILITUD = 0.85
+
+# Palabras que no distinguen a un hotel de otro (formas jurídicas, "HOTEL")
+_PALABRAS_VACIAS = {"HOTEL", "SL", "SLU", "SA", "SAU", "CB", "SLL"}
+
+
+def nombre_comparable(nombre):
+    """Nombre normalizado sin puntuación, formas jurídicas ni 'HOTEL'."""
+    s = nombre_clave(nombre).replace(".", "")
+    s = re.sub(r"[^\w ]", " ", s)
+    return " ".join(p for p in s.split() if p not in _PALABRAS_VACIAS)
+
+
+def _trigramas(texto):
+    t = f" {texto} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+def _parejas_bloque(miembros, umbral):
+    """Parejas (pos_a, pos_b, similitud) de un bloque que superan `umbral`.
+
+    Cada nombre solo se compara con los anteriores que comparten trigramas
+    con él; el número de trigramas comunes sale del propio índice, así que
+    no hace falta ninguna comparación de cadenas.
+    """
+    gramas = [_trigramas(comp) for _pos, comp in miembros]
+    indice = {}
+    parejas = []
+    for i, g in enumerate(gramas):
+        comunes = {}
+        for t in g:
+            for j in indice.get(t, ()):
+                comunes[j] = comunes.get(j, 0) + 1
+            indice.setdefault(t, []).append(i)
+        for j, n in comunes.items():
+            similitud = 2 * n / (len(g) + len(gramas[j]))
+            if similitud >= umbral:
+                parejas.append((miembros[j][0], miembros[i][0], similitud))
+    return parejas
+
+
+def parejas_similares(df, umbral=UMBRAL_SIMILITUD):
+    """Parejas de filas (posiciones en `df`) con nombre casi igual dentro del
+    mismo CP y localidad."""
+    bloques = {}
+    for pos, (cp, loc, nombre) in enumerate(
+        zip(df["CP"], df["LOCALIDAD"], df["NOMBRE DE EMPRESA"])
+    ):
+        comp = nombre_comparable(nombre)
+        if comp:
+            bloques.setdefault((str(cp), normalizar_ciudad(loc)), []).append((pos, comp))
+    parejas = []
+    for miembros in bloques.values():
+        if len(miembros) > 1:
+            parejas.extend(_parejas_bloque(miembros, umbral))
+    return parejas
+
+
+def agrupar_parejas(parejas):
+    """Une las parejas en grupos (componentes conexas), cada uno ordenado."""
+    padre = {}
+
+    def raiz(x):
+        while padre.get(x, x) != x:
+            padre[x] = padre.get(padre[x], padre[x])
+            x = padre[x]
+        return x
+
+    for a, b, _sim in parejas:
+        ra, rb = raiz(a), raiz(b)
+        if ra != rb:
+            padre[max(ra, rb)] = min(ra, rb)
+    grupos = {}
+    for a, b, _sim in parejas:
+        for x in (a, b):
+            grupos.setdefault(raiz(x), set()).add(x)
+    return [sorted(g) for _r, g in sorted(grupos.items())]
+
+
+def sugerencias_fusion(df, umbral=UMBRAL_SIMILITUD):
+    """Grupos de posibles duplicados con una propuesta de qué fila conservar.
+
+    Devuelve una lista de grupos; cada grupo es una lista de dicts con la
+    posición de la fila, la similitud máxima con el resto del grupo y la
+    propuesta ("conservar" para la fila con `N. REGISTRO` y más campos
+    rellenos, "fusionar" para las demás).
+    """
+    parejas = parejas_similares(df, umbral)
+    mejor = {}
+    for a, b, sim in parejas:
+        mejor[a] = max(mejor.get(a, 0.0), sim)
+        mejor[b] = max(mejor.get(b, 0.0), sim)
+
+    # Solo se leen los valores de las filas implicadas, columna a columna
+    implicadas = sorted(mejor)
+    columnas = [c for c in CAMPOS_VISIBLES if c in df.columns]
+    valores = {
+        c: dict(zip(
+            implicadas,
+            (str(v).strip() for v in df[c].iloc[implicadas].astype(object).fillna("")),
+        ))
+        for c in columnas
+    }
+
+    def _prioridad(pos):
+        con_registro = "N. REGISTRO" in valores and valores["N. REGISTRO"][pos] not in VACIOS
+        rellenos = sum(1 for c in columnas if valores[c][pos] not in VACIOS)
+        return (con_registro, rellenos, -pos)
+
+    sugerencias = []
+    for grupo in agrupar_parejas(parejas):
+        conservar = max(grupo, key=_prioridad)
+        sugerencias.append([
+            {
+                "pos": pos,
+                "similitud": mejor[pos],
+                "propuesta": "conservar" if pos == conservar else "fusionar",
+            }
+            for pos in grupo
+        ])
+    return sugerencias
+
+
+def escribir_sugerencias(ruta, df, sugerencias):
+    """CSV (separado por ';', como lo abre Excel en español) con un bloque
+    de filas por grupo de posibles duplicados."""
+    columnas = [c for c in ("ID", "NOMBRE DE EMPRESA", "N. REGISTRO", "DIRECCION",
+                            "CP", "LOCALIDAD", "PROVINCIA") if c in df.columns]
+    posiciones = [s["pos"] for grupo in sugerencias for s in grupo]
+    filas = df[columnas].iloc[posiciones].fillna("").itertuples(index=False, name=None)
+    with open(ruta, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["GRUPO", "PROPUESTA", "SIMILITUD"] + columnas)
+        for n, grupo in enumerate(sugerencias, start=1):
+            for s in grupo:
+                w.writerow(
+                    [n, s["propuesta"], f"{s['similitud']:.2f}"] + list(next(filas))
+                )
@@ -0,0 +1,203 @@
+"""Compilación por lotes de varias ediciones con una sola carga del registro.
+
+Cada edición es un dict con:
+    nombre       identificador para el informe
+    salida       ruta del PDF
+    maquetacion  (opcional) constantes de `excel.CONSTANTES_EDITABLES` a
+                 cambiar: páginas opcionales, tamaño, columnas, tipografías...
+    filtros      (opcional) filtros de `guias.filtrar_registro` para
+                 volúmenes regionales o temáticos
+
+El Excel se lee, normaliza y ordena una vez. Las ediciones que comparten
+maquetación (misma `huella_maquetacion`) comparten también las medidas de
+los hoteles, sus bloques ya partidos en líneas y la caché de anchos de
+texto: se mide una vez por maquetación
+y luego cada edición se construye en su propio proceso, en paralelo.
+
+Uso:
+    python ediciones.py                 # las EDICIONES de este fichero
+    python ediciones.py lote.json -j 4  # lista de ediciones en JSON
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import excel
+from guias import filtrar_registro
+
+EDICIONES = [
+    {"nombre": "completa", "salida": "catalogo_hoteles.pdf"},
+    {
+        "nombre": "completa con portada",
+        "salida": "catalogo_hoteles_portada.pdf",
+        "maquetacion": {"SHOW_PORTADA": True, "SHOW_SEGUNDA_PAGINA": True},
+    },
+    {
+        "nombre": "Andalucía",
+        "salida": "catalogo_hoteles_andalucia.pdf",
+        "filtros": {"comunidad": "Andalucia"},
+    },
+    {
+        "nombre": "Canarias y Baleares",
+        "salida": "catalogo_hoteles_islas.pdf",
+        "filtros": {"comunidad": ["Canarias", "Islas Baleares"]},
+    },
+    {
+        # 8.5" x 11": cuatro columnas y letra algo mayor
+        "nombre": "gran formato",
+        "salida": "catalogo_hoteles_gran_formato.pdf",
+        "maquetacion": {
+            "TRIM_WIDTH": 215.9,
+            "TRIM_HEIGHT": 279.4,
+            "COLS": 4,
+            "FONT_CABECERA": 10.5,
+            "FONT_LOCALIDAD": 7.2,
+            "FONT_NOMBRE": 6.6,
+            "FONT_CAT": 5.9,
+            "FONT_DETALLE": 5.9,
+            "line_height": 3.0,
+            "COLS_INDICE": 5,
+        },
+    },
+]
+
+# Valores de fábrica, para que cada tarea parta de ellos aunque el proceso
+# trabajador haya construido antes otra edición.
+_MAQUETACION_BASE = {k: getattr(excel, k) for k in excel.CONSTANTES_EDITABLES}
+
+# Estado compartido de los procesos trabajadores (heredado con fork)
+_REGISTRO = None
+_MEDIDAS = {}
+
+
+def _aplicar(edicion):
+    excel.configurar_maquetacion(**{**_MAQUETACION_BASE, **edicion.get("maquetacion", {})})
+
+
+def _iniciar_trabajador(registro, medidas, anchos, bloques):
+    global _REGISTRO, _MEDIDAS
+    _REGISTRO = registro
+    _MEDIDAS = medidas
+    excel.ANCHOS_TEXTO.update(anchos)
+    excel.BLOQUES_HOTEL.update(bloques)
+
+
+def _medir(edicion, indices):
+    """Mide las filas `indices` con la maquetación de `edicion`. Devuelve
+    las medidas y lo que se ha llenado de las cachés de anchos y bloques."""
+    _aplicar(edicion)
+    filas = _REGISTRO[_REGISTRO.index.isin(indices)]
+    return excel.medir_registros(filas), excel.ANCHOS_TEXTO, excel.BLOQUES_HOTEL
+
+
+def _construir(edicion, huella):
+    inicio = time.perf_counter()
+    _aplicar(edicion)
+    filas = filtrar_registro(_REGISTRO, **edicion.get("filtros", {}))
+    medidas = dict(_MEDIDAS.get(huella, {}))
+    prov_pages, _paginas = excel.paginar_provincias(filas, medidas)
+    libro = excel.construir_libro(filas, prov_pages, edicion["salida"])
+    return {
+        "nombre": edicion.get("nombre", edicion["salida"]),
+        "salida": edicion["salida"],
+        "hoteles": len(filas),
+        "paginas": libro["paginas"],
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def _contexto():
+    # Con fork los trabajadores heredan el registro y las medidas sin copiarlos
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def compilar_ediciones(ediciones, ruta_excel=excel.EXCEL_FILE, trabajadores=None):
+    """Construye todas las `ediciones` y devuelve una lista de resultados
+    (nombre, salida, hoteles, páginas y segundos de cada una) más los tiempos
+    comunes de carga y medición. Sin ediciones no lee ni construye nada."""
+    if not ediciones:
+        return [], {}
+    trabajadores = trabajadores or os.cpu_count() or 1
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    registro = excel.cargar_registro(ruta_excel)
+    tiempos["carga"] = time.perf_counter() - inicio
+
+    # Agrupar por maquetación: filas a medir de cada grupo
+    grupos = {}
+    huellas = []
+    for edicion in ediciones:
+        _aplicar(edicion)
+        huella = excel.huella_maquetacion()
+        filas = filtrar_registro(registro, **edicion.get("filtros", {}))
+        grupo = grupos.setdefault(huella, [edicion, set()])
+        grupo[1].update(filas.index)
+        huellas.append(huella)
+    _aplicar({})
+
+    inicio = time.perf_counter()
+    medidas = {}
+    anchos = {}
+    bloques = {}
+    with ProcessPoolExecutor(
+        max_workers=min(trabajadores, len(grupos)),
+        mp_context=_contexto(),
+        initializer=_iniciar_trabajador,
+        initargs=(registro, {}, {}, {}),
+    ) as pool:
+        futuros = {
+            huella: pool.submit(_medir, edicion, sorted(indices))
+            for huella, (edicion, indices) in grupos.items()
+        }
+        for huella, futuro in futuros.items():
+            medidas[huella], anchos_grupo, bloques_grupo = futuro.result()
+            anchos.update(anchos_grupo)
+            bloques.update(bloques_grupo)
+    tiempos["medicion"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=min(trabajadores, len(ediciones)),
+        mp_context=_contexto(),
+        initializer=_iniciar_trabajador,
+        initargs=(registro, medidas, anchos, bloques),
+    ) as pool:
+        futuros = [pool.submit(_construir, e, h) for e, h in zip(ediciones, huellas)]
+        resultados = [f.result() for f in futuros]
+    tiempos["ediciones"] = time.perf_counter() - inicio
+    return resultados, tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila varias ediciones del catálogo.")
+    parser.add_argument("lote", nargs="?", help="JSON con la lista de ediciones")
+    parser.add_argument("-j", "--trabajadores", type=int, default=None)
+    parser.add_argument("--excel", default=excel.EXCEL_FILE)
+    args = parser.parse_args()
+
+    ediciones = EDICIONES
+    if args.lote:
+        with open(args.lote, encoding="utf-8") as f:
+            ediciones = json.load(f)
+
+    resultados, tiempos = compilar_ediciones(ediciones, args.excel, args.trabajadores)
+    print(
+        f"Carga y orden: {tiempos['carga']:.1f} s  |  medición: {tiempos['medicion']:.1f} s"
+        f"  |  ediciones: {tiempos['ediciones']:.1f} s"
+    )
+    for r in resultados:
+        print(
+            f"  {r['nombre']:<24} {r['hoteles']:>6} hoteles {r['paginas']:>5} págs."
+            f" {r['segundos']:>7.1f} s  → {r['salida']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
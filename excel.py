@@ -1,13 +1,78 @@
+import argparse
+import hashlib
+import io
 import math
+import multiprocessing
+import os
+import queue
 import re
-import unicodedata
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from itertools import groupby
 
+import numpy as np
 import pandas as pd
-from fpdf import FPDF
+from fpdf import FPDF, FPDF_VERSION
+from fpdf.enums import PDFResourceType
+from fpdf.syntax import Name, PDFArray, PDFContentStream
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+import cache_compilacion
+from delta_registro import (
+    calcular_delta,
+    cargar_instantanea,
+    diferencias_indice,
+    escribir_informe,
+    guardar_instantanea,
+    huellas_registro,
+)
+from duplicados import escribir_sugerencias, sugerencias_fusion
+from exportacion import DestinoCSV, DestinoHTML, DestinoJSONL
+from imagenes import preparar_imagen
+from indice_consulta import escribir_indice
+from normalizacion import limpiar_nombre_hotel, normalizar_ciudad, normalizar_provincia
+from progreso import Progreso, salida_jsonl
+
+try:
+    import pikepdf
+except ImportError:  # solo hace falta para el perfil web
+    pikepdf = None
 
 EXCEL_FILE = "excel1.xlsx"
 PDF_FILE = "catalogo_hoteles.pdf"
 
+# Instantánea de la última compilación (huellas de cada hotel y páginas de
+# cada provincia) e informe de cambios respecto a ella para los editores.
+SNAPSHOT_FILE = "catalogo_hoteles.estado.json.gz"
+INFORME_CAMBIOS_FILE = "cambios_registro.txt"
+
+# Posibles hoteles duplicados (mismo CP y localidad, nombre casi igual)
+DUPLICADOS_FILE = "duplicados_sugeridos.csv"
+
+# Índice binario de consulta (hotel/población → página) junto al PDF
+INDICE_FILE = "catalogo_hoteles.idx"
+
+# Perfiles de salida. "imprenta" es el PDF de siempre para KDP (sin flujos de
+# objetos ni linealización). "web" es el mismo libro con flujos de objetos,
+# compresión máxima y linealizado, para que el navegador muestre la primera
+# página y salte a los índices sin descargarlo entero (requiere pikepdf).
+# Poner PDF_WEB_FILE = None para no generarlo.
+PDF_WEB_FILE = "catalogo_hoteles_web.pdf"
+# Nivel de zlib del perfil web. Es un ajuste global de pikepdf y no se puede
+# leer, así que tras guardar se vuelve al de fábrica (-1, el de zlib).
+NIVEL_FLATE_WEB = 9
+NIVEL_FLATE_FABRICA = -1
+
+# Salidas de texto con los mismos textos y páginas que el libro, escritas en
+# la misma pasada que el PDF (ver exportacion.py): feed JSON-lines, CSV con
+# las páginas y web estática por provincias. Poner None para no generar alguna.
+JSONL_FILE = "catalogo_hoteles.jsonl"
+CSV_PAGINAS_FILE = "catalogo_hoteles_paginas.csv"
+CARPETA_HTML = "catalogo_html"
+
 # Controla si se incluye la portada (portada.jpg). Poner False para saltarla.
 SHOW_PORTADA = False
 
@@ -15,14 +80,19 @@ SHOW_PORTADA = False
 # Poner True para volver a mostrarla; False para que el PDF empiece por el índice.
 SHOW_SEGUNDA_PAGINA = False
 
+# Modo de memoria reducida: el registro se guarda con tipos compactos
+# (ver `compactar_registro`). El PDF sale idéntico.
+MODO_COMPACTO = False
+
+# Salida reproducible: fecha de creación fija (la de SOURCE_DATE_EPOCH si
+# está definida) e /ID derivado del contenido en los dos perfiles, así que
+# las mismas entradas dan siempre los mismos bytes.
+DETERMINISTA = False
+FECHA_DETERMINISTA = datetime(2000, 1, 1, tzinfo=timezone.utc)
 
-def normalizar_provincia(nombre):
-    """Normaliza provincia para ordenamiento alfabético sin tildes."""
-    if not isinstance(nombre, str):
-        nombre = str(nombre)
-    nfkd = unicodedata.normalize("NFKD", nombre)
-    sin_tildes = "".join(c for c in nfkd if not unicodedata.combining(c))
-    return sin_tildes.upper()
+# Caché de compilaciones completas (ver cache_compilacion.py): si no ha
+# cambiado ninguna entrada se copian las salidas guardadas sin maquetar.
+USAR_CACHE = True
 
 
 # Diccionario de capitales por provincia (claves normalizadas sin tildes)
@@ -85,13 +155,32 @@ CAPITALES = {
     "TENERIFE": "Santa Cruz de Tenerife",
 }
 
-df = pd.read_excel(EXCEL_FILE)
-df["CP"] = df["CP"].apply(lambda x: str(int(x)).zfill(5) if not pd.isnull(x) else "")
-df = df.replace("?", "")
-
-# Renombrar provincias para usar las denominaciones oficiales actuales
-df["PROVINCIA"] = df["PROVINCIA"].replace({"ÁLAVA": "ARABA"})
-
+# Provincias de cada comunidad autónoma (mismas claves normalizadas que
+# CAPITALES), para las guías y volúmenes regionales
+COMUNIDADES = {
+    "ANDALUCIA": {"ALMERIA", "CADIZ", "CORDOBA", "GRANADA", "HUELVA", "JAEN", "MALAGA", "SEVILLA"},
+    "ARAGON": {"HUESCA", "TERUEL", "ZARAGOZA"},
+    "ASTURIAS": {"ASTURIAS"},
+    "ISLASBALEARES": {"ISLASBALEARES"},
+    "CANARIAS": {"LASPALMAS", "SANTACRUZDETENERIFE", "TENERIFE"},
+    "CANTABRIA": {"CANTABRIA"},
+    "CASTILLALAMANCHA": {"ALBACETE", "CIUDADREAL", "CUENCA", "GUADALAJARA", "TOLEDO"},
+    "CASTILLAYLEON": {
+        "AVILA", "BURGOS", "LEON", "PALENCIA", "SALAMANCA", "SEGOVIA", "SORIA",
+        "VALLADOLID", "ZAMORA",
+    },
+    "CATALUNA": {"BARCELONA", "GERONA", "GIRONA", "LLEIDA", "TARRAGONA"},
+    "COMUNIDADVALENCIANA": {"ALICANTE", "CASTELLON", "VALENCIA"},
+    "EXTREMADURA": {"BADAJOZ", "CACERES"},
+    "GALICIA": {"ACORUNA", "LUGO", "OURENSE", "PONTEVEDRA"},
+    "MADRID": {"MADRID"},
+    "MURCIA": {"MURCIA"},
+    "NAVARRA": {"NAVARRA"},
+    "PAISVASCO": {"ARABA", "BIZKAIA", "VIZCAYA", "GIPUZKOA", "GUIPUZCOA"},
+    "LARIOJA": {"LARIOJA"},
+    "CEUTA": {"CEUTA"},
+    "MELILLA": {"MELILLA"},
+}
 
 # Extraer valor numérico de la clasificación para ordenar por estrellas (5->0)
 def extraer_estrellas(val):
@@ -105,20 +194,6 @@ def extraer_estrellas(val):
     return 0
 
 
-df["ESTRELLAS"] = df["CLASIFICACION HOTEL"].apply(extraer_estrellas)
-
-
-# Crear función de normalización robusta para localidades/capitales
-def normalizar_ciudad(nombre):
-    if not isinstance(nombre, str):
-        nombre = str(nombre)
-    nfkd = unicodedata.normalize("NFKD", nombre)
-    sin_tildes = "".join(c for c in nfkd if not unicodedata.combining(c))
-    s = sin_tildes.replace("/", " ").replace("-", " ")
-    s = " ".join(s.split())
-    return s.upper()
-
-
 # Crear columna ES_CAPITAL: True si la localidad es la capital de su provincia
 def es_capital(row):
     provincia_norm = normalizar_provincia(row.get("PROVINCIA", "")).replace(" ", "")
@@ -146,29 +221,144 @@ def es_capital(row):
     return loc_norm == cap_norm
 
 
-df["ES_CAPITAL"] = df.apply(es_capital, axis=1)
-
 # Columna auxiliar para ordenar por nombre limpio (sin "HOTEL" al inicio, sin tildes)
 def _nombre_orden(x):
-    s = str(x).strip()
-    if s.upper().startswith("HOTEL"):
-        s = s[5:].strip()
-    if s.upper().endswith("S.L."):
-        s = s[:-4].strip()
-    elif s.upper().endswith("S.L"):
-        s = s[:-3].strip()
-    return normalizar_provincia(s)
-
-df["NOMBRE_ORDEN"] = df["NOMBRE DE EMPRESA"].apply(_nombre_orden)
-
-# Ordenar por: provincia → ES_CAPITAL (True primero) → localidad → estrellas descendentes → nombre alfabético
-df = df.sort_values(
-    by=["PROVINCIA", "ES_CAPITAL", "LOCALIDAD", "ESTRELLAS", "NOMBRE_ORDEN"],
-    key=lambda col: (
-        col.map(normalizar_provincia) if col.name in ["PROVINCIA", "LOCALIDAD"] else col
-    ),
-    ascending=[True, False, True, False, True],
-)
+    return normalizar_provincia(limpiar_nombre_hotel(x))
+
+
+def cargar_registro(ruta=EXCEL_FILE, compacto=None):
+    """Lee el Excel, normaliza los campos y lo deja en el orden del catálogo.
+    En modo compacto solo se leen las columnas que usa el libro."""
+    compacto = MODO_COMPACTO if compacto is None else compacto
+    usecols = (lambda c: c in COLUMNAS_REGISTRO) if compacto else None
+    return preparar_registro(pd.read_excel(ruta, usecols=usecols), compacto)
+
+
+def preparar_registro(df, compacto=None):
+    """Normaliza y ordena un registro recién leído (modifica `df`). Con
+    `compacto` (por defecto MODO_COMPACTO) lo pasa además a tipos compactos
+    con `compactar_registro`."""
+    df["CP"] = df["CP"].apply(lambda x: str(int(x)).zfill(5) if not pd.isnull(x) else "")
+    # Solo se reescriben las columnas que tienen algún "?" (sin copiar el resto)
+    for columna in df.columns:
+        if df[columna].dtype != "int64":
+            vacios = df[columna] == "?"
+            if vacios.any():
+                df[columna] = df[columna].mask(vacios, "")
+
+    # Renombrar provincias para usar las denominaciones oficiales actuales
+    df["PROVINCIA"] = df["PROVINCIA"].replace({"ÁLAVA": "ARABA"})
+
+    df["ESTRELLAS"] = df["CLASIFICACION HOTEL"].apply(extraer_estrellas)
+    # ES_CAPITAL depende solo del par (provincia, localidad): una vez por par
+    capitales = {}
+    es_cap = []
+    for par in zip(df["PROVINCIA"], df["LOCALIDAD"]):
+        es = capitales.get(par)
+        if es is None:
+            es = capitales[par] = es_capital({"PROVINCIA": par[0], "LOCALIDAD": par[1]})
+        es_cap.append(es)
+    df["ES_CAPITAL"] = es_cap
+    df["NOMBRE_ORDEN"] = df["NOMBRE DE EMPRESA"].apply(_nombre_orden)
+
+    anadir_rangos(df)
+
+    # Ordenar por: provincia → ES_CAPITAL (True primero) → localidad → estrellas descendentes → nombre alfabético
+    # Un rango entero por criterio y un solo lexsort (estable: a igualdad se
+    # conserva el orden del Excel). La última clave es la principal.
+    orden = np.lexsort((
+        rango_denso(df["NOMBRE_ORDEN"]),
+        -df["ESTRELLAS"].to_numpy(),
+        rango_denso(df["LOCALIDAD"], normalizar_provincia),
+        ~df["ES_CAPITAL"].to_numpy(bool),
+        df["RANGO_PROVINCIA"].to_numpy(),
+    ))
+    # Se reordena el registro ya compactado si toca, con una sola copia
+    if MODO_COMPACTO if compacto is None else compacto:
+        df = compactar_registro(df)
+    return df.take(orden)
+
+
+def anadir_rangos(df):
+    """Columnas de rango de los índices alfabéticos (ver `ordenar_por_rango`).
+    Dependen de todo el registro: si se prepara por trozos, se recalculan
+    sobre el registro completo."""
+    df["RANGO_PROVINCIA"] = rango_denso(df["PROVINCIA"], normalizar_provincia)
+    df["RANGO_HOTEL"] = rango_denso(
+        df["NOMBRE DE EMPRESA"], lambda n: limpiar_nombre_hotel(str(n).strip()).lower()
+    )
+    df["RANGO_POBLACION"] = rango_denso(
+        df["LOCALIDAD"], lambda l: normalizar_ciudad(str(l).strip())
+    )
+
+
+def rango_denso(serie, clave=None):
+    """Rango entero (0, 1, 2...) de cada valor de `serie` en el orden de
+    `clave(valor)`; valores con la misma clave comparten rango. La clave se
+    calcula una sola vez por valor distinto."""
+    codigos, valores = pd.factorize(serie, use_na_sentinel=False)
+    claves = [clave(v) for v in valores] if clave is not None else list(valores)
+    posicion = {c: i for i, c in enumerate(sorted(set(claves)))}
+    return np.array([posicion[c] for c in claves], dtype=np.int32)[codigos]
+
+
+def ordenar_por_rango(claves, filas, columna, columna_rango, clave_fila=None):
+    """`claves` (en orden de primera aparición, como las de `hotel_pages`)
+    ordenadas por el rango que `preparar_registro` guardó en `columna_rango`,
+    sin volver a comparar textos. `clave_fila` convierte el valor de
+    `columna` de cada fila en su clave. A igual rango se conserva el orden
+    de `claves`, igual que con `sorted`."""
+    rangos = {}
+    for valor, rango in zip(filas[columna], filas[columna_rango]):
+        rangos.setdefault(clave_fila(valor) if clave_fila else valor, rango)
+    claves = list(claves)
+    orden = np.argsort(np.array([rangos[c] for c in claves], dtype=np.int64), kind="stable")
+    return [claves[i] for i in orden]
+
+
+# Columnas del registro que usa el libro (el resto del Excel sobra una vez
+# ordenado) y las que se repiten tanto que conviene guardar como categoría.
+COLUMNAS_REGISTRO = [
+    "ID", "NOMBRE DE EMPRESA", "N. REGISTRO", "DIRECCION", "CP", "LOCALIDAD",
+    "PROVINCIA", "TELEFONO1", "SITIO WEB", "CLASIFICACION HOTEL",
+    "NRO. HABITACIONES", "MODALIDAD", "ESTRELLAS",
+    "RANGO_PROVINCIA", "RANGO_HOTEL", "RANGO_POBLACION",
+]
+COLUMNAS_CATEGORIA = ["PROVINCIA", "LOCALIDAD", "MODALIDAD", "CLASIFICACION HOTEL"]
+
+
+def compactar_registro(df):
+    """Versión de `df` con el mínimo de memoria y el mismo
+    contenido impreso: solo COLUMNAS_REGISTRO, categorías para los campos muy
+    repetidos, enteros pequeños para estrellas y habitaciones y textos
+    internados (una sola copia de cada cadena repetida)."""
+    df = df[[c for c in COLUMNAS_REGISTRO if c in df.columns]]
+    for columna in COLUMNAS_CATEGORIA:
+        if columna in df.columns:
+            df[columna] = df[columna].astype("category")
+    df["ESTRELLAS"] = df["ESTRELLAS"].astype("int8")
+
+    # Habitaciones: entero si todas las cifras se imprimen igual ("25" → 25);
+    # lo demás ("-", vacío) no se imprime y queda como <NA>.
+    hab = df["NRO. HABITACIONES"].astype(str).str.strip()
+    cifras = hab.str.fullmatch(r"[1-9]\d{0,4}")
+    vacias = hab.isin(["", "-", "nan", "NaN", "None"])
+    if (cifras | vacias).all():
+        df["NRO. HABITACIONES"] = pd.to_numeric(hab.where(cifras), errors="coerce").astype("UInt16")
+
+    for columna in df.columns:
+        if df[columna].dtype == "str" or df[columna].dtype == object:
+            df[columna] = [sys.intern(v) if isinstance(v, str) else v for v in df[columna]]
+    return df
+
+
+# Caché de anchos de texto compartida por todos los PDF del proceso: las dos
+# pasadas, las guías y las ediciones con la misma tipografía miden una y otra
+# vez las mismas cadenas.
+ANCHOS_TEXTO = {}
+
+# Índice del primer Form XObject de `PDF.plantilla` (/I10000, /I10001...)
+BASE_PLANTILLAS = 10000
 
 
 # --- PDF ---
@@ -177,6 +367,126 @@ class PDF(FPDF):
         # Tamaño de página nativo 6" x 9" (KDP paperback)
         super().__init__(orientation="P", unit="mm", format=(PAGE_WIDTH, PAGE_HEIGHT))
         self.set_margins(MARGIN_GUTTER, Y_TOP, MARGIN_OUTER + BLEED)
+        self.plantillas = {}
+        # Navegación del perfil web (ver `navegacion_web`): el PDF de imprenta
+        # no lleva esquema ni enlaces
+        self.esquema = []
+        self.enlaces = []
+        if sincronizar_fuente():
+            for estilo in ("", "B", "I"):
+                self.add_font(FUENTE, estilo, FUENTES_TTF.get(estilo, FUENTES_TTF[""]))
+
+    def plantilla(self, clave, dibujar, dx=0.0):
+        """Dibuja un elemento fijo (sin texto) como Form XObject reutilizable.
+
+        La primera vez se ejecuta `dibujar()` y lo que escribe en la página se
+        guarda como plantilla `clave`; después cada página solo lleva una
+        referencia desplazada `dx` mm en horizontal. fpdf2 no tiene API
+        pública para plantillas, así que se usa la misma lista de formularios
+        que emplea para sus grupos de fusión.
+        """
+        indice = self.plantillas.get(clave)
+        if indice is None:
+            contenido = self.pages[self.page].contents
+            inicio = len(contenido)
+            with self.local_context():
+                dibujar()
+            operadores = bytes(contenido[inicio:])
+            del contenido[inicio:]
+            formulario = PDFContentStream(contents=operadores, compress=self.compress)
+            formulario.type = Name("XObject")
+            formulario.subtype = Name("Form")
+            formulario.b_box = PDFArray([0, 0, round(self.w_pt, 2), round(self.h_pt, 2)])
+            formulario._registered = False
+            # Lejos de los índices de las imágenes (1, 2, ...)
+            indice = self.plantillas[clave] = BASE_PLANTILLAS + len(self.plantillas)
+            self._resource_catalog.form_xobjects.append((indice, formulario))
+        self._resource_catalog.add(PDFResourceType.X_OBJECT, indice, self.page)
+        self._out(f"q 1 0 0 1 {dx * self.k:.2f} 0 cm /I{indice} Do Q")
+
+    def textos_en_bloque(self, textos, h):
+        """Escribe una lista de (x, y, texto) en un solo objeto de texto, con
+        la fuente y el color actuales. Cada texto queda donde lo pondría
+        `cell(w, h, texto, align="L")` en (x, y), sin el coste de una celda
+        por línea. Solo para textos de una línea sin marcado."""
+        fuente = self.current_font
+        self._resource_catalog.add(PDFResourceType.FONT, fuente.i, self.page)
+        k = self.k
+        ops = [f"q {self.text_color.serialize().lower()} BT /F{fuente.i} {self.font_size_pt:.2f} Tf"]
+        for x, y, texto in textos:
+            # Posición absoluta (Tm), con el mismo redondeo que el Td de `cell`
+            ops.append(
+                f"1 0 0 1 {(x + self.c_margin) * k:.2f} "
+                f"{(self.h - y - 0.5 * h - 0.3 * self.font_size) * k:.2f} Tm "
+                f"{fuente.encode_text(self.normalize_text(texto))}"
+            )
+        ops.append("ET Q")
+        self._out(" ".join(ops))
+
+    def marcador(self, titulo, nivel=0):
+        """Anota una entrada del esquema en la posición actual: `nivel` 0
+        para secciones y provincias, 1 para las localidades de la provincia
+        anterior."""
+        self.esquema.append((titulo, nivel, self.page_no(), round(self.h_pt - self.y * self.k, 2)))
+
+    def enlaces_en_bloque(self, enlaces):
+        """Anota en la página actual un enlace interno por cada (x, y, w, h,
+        página): el rectángulo, en puntos del PDF, lleva a lo alto de esa
+        página."""
+        k = self.k
+        alto = self.h_pt
+        self.enlaces.extend(
+            (self.page_no(), (round(x * k, 2), round(alto - (y + h) * k, 2),
+                         round((x + w) * k, 2), round(alto - y * k, 2)), pagina)
+            for x, y, w, h, pagina in enlaces
+        )
+
+    def _fuente(self, estilo):
+        """Objeto fuente de FUENTE en `estilo`, sin cambiar la fuente activa."""
+        fuente = self.fonts.get(FUENTE.lower() + estilo)
+        if fuente is None:
+            estado = (self.font_family, self.font_style, self.font_size_pt,
+                      self.current_font, self.current_font_is_set_on_page)
+            self.set_font(FUENTE, estilo)
+            fuente = self.current_font
+            (self.font_family, self.font_style, self.font_size_pt,
+             self.current_font, self.current_font_is_set_on_page) = estado
+        return fuente
+
+    def dibujar_bloque(self, x, y, bloque, h):
+        """Dibuja un `BloqueHotel` con su esquina en (x, y), con el color de
+        texto actual, y devuelve la y final: la misma que dejarían sus
+        `multi_cell` con alto de línea `h`. Va entre q/Q con sus propias
+        fuentes, así que la fuente que fpdf cree activa en la página sigue
+        siéndolo."""
+        k = self.k
+        x_texto = f"{(x + self.c_margin) * k:.2f}"
+        ops = [f"q {self.text_color.serialize().lower()} BT"]
+        for estilo, size, lineas in bloque.tramos:
+            fuente = self._fuente(estilo)
+            self._resource_catalog.add(PDFResourceType.FONT, fuente.i, self.page)
+            ops.append(f"/F{fuente.i} {size:.2f} Tf")
+            alto_fuente = size / k
+            for linea in lineas:
+                if linea:
+                    # Mismo redondeo que el Td de cada línea de `multi_cell`
+                    ops.append(
+                        f"1 0 0 1 {x_texto} "
+                        f"{(self.h - y - 0.5 * h - 0.3 * alto_fuente) * k:.2f} Tm "
+                        f"{fuente.encode_text(linea)}"
+                    )
+                y += h
+        ops.append("ET Q")
+        self._out(" ".join(ops))
+        self.set_xy(x, y)
+        return y
+
+    def get_string_width(self, s, normalized=False, markdown=False):
+        clave = (self.font_family, self.font_style, self.font_size_pt, s, normalized, markdown)
+        w = ANCHOS_TEXTO.get(clave)
+        if w is None:
+            w = ANCHOS_TEXTO[clave] = super().get_string_width(s, normalized, markdown)
+        return w
 
     def header(self):
         # Márgenes simétricos: el medianil cambia de lado en cada página
@@ -188,7 +498,7 @@ class PDF(FPDF):
             return
 
         # Encabezado por provincia
-        self.set_font("Helvetica", "B", FONT_CABECERA)
+        self.set_font(FUENTE, "B", FONT_CABECERA)
         self.set_text_color(*AZUL_PORTADA)
         # Agregar "(cont)" si esta es una página de continuación
         provincia_text = f"PROVINCIA DE {self.provincia_actual.upper()}"
@@ -202,11 +512,14 @@ class PDF(FPDF):
             align="C",
         )
 
-        # Línea superior decorativa
+        # Línea superior decorativa (igual en todas las páginas: plantilla)
+        self.plantilla("linea_cabecera", self._linea_cabecera, dx=izq)
+        self.set_text_color(0, 0, 0)
+
+    def _linea_cabecera(self):
         self.set_draw_color(180, 180, 180)
         self.set_line_width(0.2)
-        self.line(izq, Y_LINEA, PAGE_WIDTH - der, Y_LINEA)
-        self.set_text_color(0, 0, 0)
+        self.line(0, Y_LINEA, CONTENT_WIDTH, Y_LINEA)
 
     def footer(self):
         if getattr(self, "provincia_actual", "") is None:
@@ -216,7 +529,7 @@ class PDF(FPDF):
             return
         izq = x_contenido(self.page_no())
         self.set_xy(izq, Y_PIE)
-        self.set_font("Helvetica", "I", 7)
+        self.set_font(FUENTE, "I", 7)
         self.set_text_color(128)
         self.cell(0, 4.5, f"{self.page_no()}", align="C")
         self.set_text_color(0, 0, 0)
@@ -251,18 +564,6 @@ def calcular_altura_bloque(pdf, lineas_list, ancho_efectivo, alto_linea):
     return total_altura
 
 
-def limpiar_nombre_hotel(nombre):
-    """Elimina la palabra 'HOTEL' al inicio y 'S.L.' al final si existen."""
-    nombre_clean = str(nombre).strip()
-    if nombre_clean.upper().startswith("HOTEL"):
-        nombre_clean = nombre_clean[5:].strip()
-    if nombre_clean.upper().endswith("S.L."):
-        nombre_clean = nombre_clean[:-4].strip()
-    elif nombre_clean.upper().endswith("S.L"):
-        nombre_clean = nombre_clean[:-3].strip()
-    return nombre_clean
-
-
 # Palabras que deben ir en minúscula cuando aparecen en medio de una dirección
 _PREPOSICIONES = {
     "De", "Del", "O", "Y", "A", "E", "En", "Con", "Por", "Para", "Sin",
@@ -299,8 +600,9 @@ def corregir_preposiciones(texto):
 #       155.575 x 234.95 mm  =  6.125" x 9.25"
 # IMPORTANTE: al subirlo hay que marcar la opción "Con sangrado / Bleed".
 #
-# Márgenes (medidos desde el corte final) exigidos por KDP para 501-828 págs:
-#   - Medianil (margen interior, junto al lomo): 0.875" = 22.23 mm
+# Márgenes (medidos desde el corte final) exigidos por KDP:
+#   - Medianil (margen interior, junto al lomo): crece con el nº de páginas,
+#     de 0.375" (hasta 150 págs) a 0.875" (701-828 págs); ver MEDIANIL_KDP
 #   - Margen exterior / superior / inferior:     mínimo 0.25" = 6.35 mm
 # Usamos 0.5" (12.7 mm) en exterior/superior/inferior por seguridad.
 #
@@ -335,6 +637,39 @@ Y_BOTTOM = PAGE_HEIGHT - BLEED - MARGIN_BOTTOM
 # Compatibilidad con el resto del código (márgenes "simétricos" de referencia)
 MARGIN = MARGIN_OUTER
 
+# Medianil mínimo de KDP según el nº de páginas del volumen: (hasta N págs, mm).
+# Por encima de MAX_PAGINAS_KDP el libro no se puede imprimir en un volumen.
+MEDIANIL_KDP = [
+    (150, 9.525),   # 0.375"
+    (300, 12.7),    # 0.5"
+    (500, 15.875),  # 0.625"
+    (700, 19.05),   # 0.75"
+    (828, 22.225),  # 0.875"
+]
+MAX_PAGINAS_KDP = MEDIANIL_KDP[-1][0]
+HOLGURA_MEDIANIL = 0.25  # margen de seguridad sobre el mínimo de KDP
+
+
+def medianil_kdp(paginas):
+    """Medianil mínimo (mm) que exige KDP para un libro de `paginas`."""
+    for hasta, medianil in MEDIANIL_KDP:
+        if paginas <= hasta:
+            return medianil
+    raise ValueError(f"{paginas} páginas superan el máximo de KDP ({MAX_PAGINAS_KDP})")
+
+
+def margenes_para_paginas(paginas):
+    """(medianil, exterior) para un volumen de `paginas`.
+
+    La suma de ambos márgenes no cambia, así que el ancho de la mancha y de
+    las columnas tampoco: la paginación medida sigue valiendo y solo se
+    desplaza la mancha hacia fuera. Igual que arriba, se busca el reparto más
+    simétrico que no baje del mínimo de KDP (con 594 págs da 19.3 / 17.1).
+    """
+    suma = MARGIN_GUTTER + MARGIN_OUTER
+    medianil = max(medianil_kdp(paginas) + HOLGURA_MEDIANIL, suma / 2)
+    return medianil, suma - medianil
+
 
 def margenes_pagina(page_no):
     """Devuelve (margen_izquierdo, margen_derecho) sobre el papel CON sangrado.
@@ -382,6 +717,37 @@ FONT_NOMBRE = 6.1
 FONT_CAT = 5.5
 FONT_DETALLE = 5.5
 
+# Familia tipográfica. Por defecto Helvetica (fuente core: no se incrusta,
+# pero solo admite latin-1 y `_enc` descarta el resto: "ŀ", "€", comillas
+# tipográficas...). Con FUENTES_TTF (estilo → ruta .ttf) se pasa al modo
+# Unicode: fpdf2 incrusta solo los glifos usados (subconjunto) y las medidas
+# de texto pasan por la misma caché ANCHOS_TEXTO. Los estilos que falten
+# usan el fichero del estilo normal. FUENTE, la familia con que se dibuja, se
+# deriva de FUENTES_TTF (ver `fuente_configurada`): no se asigna a mano.
+FUENTES_TTF = None
+FUENTES_DEJAVU = {
+    "": "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "B": "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+}
+FUENTE = "Helvetica"
+
+
+def fuente_configurada():
+    """Familia que corresponde a FUENTES_TTF: "Texto", la TTF que registra
+    cada `PDF`, o Helvetica."""
+    return "Texto" if FUENTES_TTF else "Helvetica"
+
+
+def sincronizar_fuente():
+    """Pone en FUENTE la familia de `fuente_configurada` y devuelve si el
+    modo es Unicode. Se llama donde cambia la configuración
+    (`configurar_maquetacion`) y al crear cada `PDF`, así que basta con
+    asignar FUENTES_TTF, en este módulo o desde fuera, antes de maquetar."""
+    global FUENTE
+    FUENTE = fuente_configurada()
+    return bool(FUENTES_TTF)
+
+
 line_height = 2.8
 # Pequeño colchón para que ninguna línea toque el borde de la mancha
 ancho_texto = COLUMN_WIDTH - 1.5
@@ -401,7 +767,10 @@ def formatear_clasificacion(val):
 
 
 def _enc(s):
-    """Codifica a latin-1 (fuentes core de FPDF)."""
+    """Codifica a latin-1 (fuentes core de FPDF). En modo Unicode (FUENTES_TTF)
+    solo cambia los separadores de línea/párrafo Unicode por espacios."""
+    if FUENTES_TTF:
+        return str(s).replace("\u2028", " ").replace("\u2029", " ")
     return str(s).encode("latin-1", "ignore").decode("latin-1")
 
 
@@ -478,11 +847,11 @@ def _dibujar_separador(pdf, x0, ancho, y):
 
 
 def _tamano_fuente_ajustado(pdf, lineas, ancho_util, size_max=13, size_min=6):
-    """Mayor tamaño de fuente (Helvetica Bold) con el que TODAS las líneas
+    """Mayor tamaño de fuente (negrita) con el que TODAS las líneas
     caben en `ancho_util`."""
     size = size_max
     while size > size_min:
-        pdf.set_font("Helvetica", "B", size)
+        pdf.set_font(FUENTE, "B", size)
         if all(pdf.get_string_width(_enc(l)) <= ancho_util for l in lineas):
             return size
         size -= 0.5
@@ -504,11 +873,6 @@ def dibujar_portada_seccion(pdf, lineas_es, lineas_en, page_number_display):
         pdf.paginas_sin_pie = set()
     pdf.paginas_sin_pie.add(pdf.page_no())
 
-    # Fondo azul a sangre completa (incluida la zona de sangrado)
-    pdf.set_fill_color(*AZUL_PORTADA)
-    pdf.rect(0, 0, PAGE_WIDTH, PAGE_HEIGHT, "F")
-    pdf.set_text_color(255, 255, 255)
-
     # El texto se centra respecto al ÁREA DE CORTE (lo que queda del papel tras
     # guillotinar), no respecto a la mancha: así se ve perfectamente centrado.
     # El ancho útil se limita al medianil por ambos lados, de modo que el
@@ -518,8 +882,19 @@ def dibujar_portada_seccion(pdf, lineas_es, lineas_en, page_number_display):
     ancho = TRIM_WIDTH
     alto = TRIM_HEIGHT
 
+    # Fondo azul a sangre completa (incluida la zona de sangrado) y separador
+    # decorativo en el centro vertical de la mancha: iguales en todas las
+    # portadas del mismo lado, se dibujan una vez como plantilla.
+    def _fondo():
+        pdf.set_fill_color(*AZUL_PORTADA)
+        pdf.rect(0, 0, PAGE_WIDTH, PAGE_HEIGHT, "F")
+        _dibujar_separador(pdf, x0, ancho, y0 + alto * 0.505)
+
+    pdf.plantilla(("portada", x0), _fondo)
+    pdf.set_text_color(255, 255, 255)
+
     # Número de página arriba a la derecha, dentro de los márgenes
-    pdf.set_font("Helvetica", "", 9)
+    pdf.set_font(FUENTE, "", 9)
     pdf.set_xy(x_contenido(pdf.page_no()) + CONTENT_WIDTH - 20, Y_TOP + 4)
     pdf.cell(15, 6, str(page_number_display), align="R")
 
@@ -528,19 +903,16 @@ def dibujar_portada_seccion(pdf, lineas_es, lineas_en, page_number_display):
     alt = size * 0.62  # alto de línea proporcional al cuerpo
 
     # Bloque español (centrado alrededor del 30% de la mancha)
-    pdf.set_font("Helvetica", "B", size)
+    pdf.set_font(FUENTE, "B", size)
     y_es = y0 + alto * 0.30 - (len(lineas_es) * alt) / 2
     pdf.set_xy(x0, y_es)
     for linea in lineas_es:
         pdf.set_x(x0)
         pdf.cell(ancho, alt, _enc(linea), align="C", new_x="LEFT", new_y="NEXT")
 
-    # Separador decorativo en el centro vertical de la mancha
-    _dibujar_separador(pdf, x0, ancho, y0 + alto * 0.505)
-
     # Bloque inglés (centrado alrededor del 68% de la mancha)
     pdf.set_text_color(255, 255, 255)
-    pdf.set_font("Helvetica", "B", size)
+    pdf.set_font(FUENTE, "B", size)
     y_en = y0 + alto * 0.68 - (len(lineas_en) * alt) / 2
     pdf.set_xy(x0, y_en)
     for linea in lineas_en:
@@ -599,38 +971,39 @@ PORTADA_POBLACIONES_EN = [
 ]
 
 
-# Obtener lista única de provincias en orden alfabético (sin tildes)
-provincias_unicas = sorted(df["PROVINCIA"].unique().tolist(), key=normalizar_provincia)
-
-# Estructura para guardar índice de provincias y sus páginas
-indice_provincias = []
-
-# Rellenar indice_provincias con capitales del diccionario
-for prov in provincias_unicas:
-    prov_normalizada = normalizar_provincia(prov).replace(" ", "")
-    capital = CAPITALES.get(prov_normalizada, "-")
-    indice_provincias.append({"provincia": prov, "capital": capital, "pagina": None})
-
 # ---------------------------------------------------------------------------
-# ESTRATEGIA DE DOBLE RENDER (índices 100% exactos)
+# ESTRATEGIA DE DOBLE PASADA (índices 100% exactos)
 # ---------------------------------------------------------------------------
 # El índice de provincias necesita los números de página REALES del catálogo,
 # pero debe aparecer ANTES del catálogo en el PDF. En vez de *estimar* las
-# alturas (lo que desincronizaba el índice del PDF real), renderizamos el
-# catálogo DOS VECES con exactamente el mismo código:
-#   Pasada 1 → a un PDF temporal, solo para capturar las páginas reales.
-#   Pasada 2 → al PDF final, ya con los números de página correctos.
-# Como el render es idéntico y va precedido del mismo nº de páginas fijas,
-# la paginación coincide al 100%.
+# alturas (lo que desincronizaba el índice del PDF real), el catálogo se
+# pagina dos veces con exactamente la misma lógica:
+#   Pasada 1 → simulación sin dibujar: se mide UNA vez cada hotel (líneas
+#              reales en que `multi_cell` parte cada texto y altura estimada
+#              para los saltos) y se repite el algoritmo de colocación de
+#              `render_catalogo` sumando esas alturas. Las provincias sin
+#              cambios desde la última compilación reutilizan las páginas
+#              guardadas en la instantánea.
+#   Pasada 2 → render al PDF final, ya con los números de página correctos.
+# Como las alturas medidas son las mismas que avanza `multi_cell` y van
+# precedidas del mismo nº de páginas fijas, la paginación coincide al 100%.
 # ---------------------------------------------------------------------------
 
 
-def render_catalogo(pdf):
-    """Dibuja TODO el catálogo por provincias en `pdf`.
+def render_catalogo(pdf, filas, paginas_fila=None, progreso=None, destinos=()):
+    """Dibuja en `pdf` el catálogo por provincias de `filas` (el registro ya
+    ordenado por `cargar_registro`, o un subconjunto suyo).
 
     Devuelve (prov_pages, hotel_pages, loc_pages): la página REAL de la primera
-    aparición de cada provincia, hotel (nombre limpio) y localidad.
+    aparición de cada provincia, hotel (nombre limpio) y localidad. Si se pasa
+    el dict `paginas_fila`, se rellena además con la página de cada fila.
+    `progreso` recibe un avance (y comprueba la cancelación) en cada provincia.
+    Cada destino de `destinos` (ver exportacion.py) recibe cada hotel con
+    sus líneas y su página en cuanto queda colocado.
     """
+    progreso = progreso or Progreso()
+    n_provincias = sum(1 for _ in groupby(filas["PROVINCIA"].astype(str)))
+    n_provincia = 0
     prov_pages = {}
     hotel_pages = {}
     loc_pages = {}
@@ -640,6 +1013,7 @@ def render_catalogo(pdf):
         base = x_contenido(page_no)
         return [base + i * PASO_COLUMNA for i in range(COLS)]
 
+    huella = huella_maquetacion()
     x_positions = columnas(1)
     pdf.provincia_actual = ""
     y_actual = [Y_START] * COLS
@@ -647,18 +1021,25 @@ def render_catalogo(pdf):
     localidad_anterior = ""
     current_col = 0
 
-    for idx, row in df.iterrows():
+    for n_fila, (idx, row) in enumerate(filas.iterrows()):
         provincia = str(row["PROVINCIA"])
         localidad = str(row["LOCALIDAD"])
         hotel_name = str(row["NOMBRE DE EMPRESA"]).strip()
 
         # CAMBIO DE PROVINCIA → NUEVA PÁGINA Y RESET DE ALTURAS
         if provincia != provincia_anterior:
+            n_provincia += 1
+            progreso.avance(
+                "render", n_fila, len(filas),
+                provincia=provincia, n=n_provincia, de=n_provincias,
+                paginas=pdf.page_no(),
+            )
             provincia_anterior = provincia
             localidad_anterior = ""
             pdf.provincia_actual = provincia
             pdf.provincia_continuacion = False
             pdf.add_page()
+            pdf.marcador(provincia)
             x_positions = columnas(pdf.page_no())
             current_col = 0
             y_actual = [Y_START] * COLS
@@ -667,28 +1048,16 @@ def render_catalogo(pdf):
 
         hotel_name_display = limpiar_nombre_hotel(hotel_name)
 
-        _d = construir_lineas_hotel(row)
-        linea_cat = _d["cat"]
-        linea_nombre = _d["nombre"]
-        linea_reg = _d["reg"]
-        linea_dir = _d["dir"]
-        linea_loc = _d["loc"]
-        linea_tel = _d["tel"]
-        linea_web = _d["web"]
-        lineas_hotel = [
-            linea_nombre, linea_cat, linea_reg,
-            linea_dir, linea_loc, linea_tel, linea_web,
-        ]
-
-        # Altura estimada del hotel (solo para decidir salto de columna/página)
-        pdf.set_font("Helvetica", "", FONT_NOMBRE)
-        altura_hotel = calcular_altura_bloque(
-            pdf, [_l for _l in lineas_hotel if _l], ancho_texto, line_height
-        )
+        # Bloque ya partido en líneas (y su altura estimada, solo para
+        # decidir salto de columna/página)
+        lineas = construir_lineas_hotel(row)
+        bloque = bloque_hotel(lineas, huella)
+        altura_hotel = bloque.altura
 
         hay_cambio_localidad = localidad != localidad_anterior
         altura_localidad = 0
         if hay_cambio_localidad:
+            pdf.set_font(FUENTE, "", FONT_NOMBRE)
             altura_localidad = (
                 calcular_altura_linea(pdf, localidad.upper(), COLUMN_WIDTH, line_height) + 4
             )
@@ -713,6 +1082,8 @@ def render_catalogo(pdf):
         # ---- REGISTRAR HOTEL CON SU PÁGINA REAL (ya resuelto el salto de página) ----
         if hotel_name_display and hotel_name_display not in hotel_pages:
             hotel_pages[hotel_name_display] = pdf.page_no()
+        if paginas_fila is not None:
+            paginas_fila[idx] = pdf.page_no()
 
         # TÍTULO DE LOCALIDAD
         if hay_cambio_localidad:
@@ -721,7 +1092,8 @@ def render_catalogo(pdf):
             if localidad not in loc_pages:
                 loc_pages[localidad] = pdf.page_no()
             pdf.set_xy(x, y_pos)
-            pdf.set_font("Helvetica", "B", FONT_LOCALIDAD)
+            pdf.marcador(localidad.upper(), nivel=1)
+            pdf.set_font(FUENTE, "B", FONT_LOCALIDAD)
             pdf.set_text_color(*AZUL_ACENTO)
             pdf.multi_cell(COLUMN_WIDTH, line_height, _enc(localidad.upper()), border=0, align="L")
             y_pos = pdf.get_y()
@@ -729,7 +1101,7 @@ def render_catalogo(pdf):
         elif localidad_cont:
             y_pos = y_pos + 1
             pdf.set_xy(x_positions[0], y_pos)
-            pdf.set_font("Helvetica", "B", FONT_LOCALIDAD)
+            pdf.set_font(FUENTE, "B", FONT_LOCALIDAD)
             pdf.set_text_color(*AZUL_ACENTO)
             pdf.multi_cell(COLUMN_WIDTH, line_height, _enc(localidad.upper() + " (cont.)"), border=0, align="L")
             cont_y = pdf.get_y()
@@ -739,218 +1111,313 @@ def render_catalogo(pdf):
             x = x_positions[current_col]
 
         # TEXTO DEL HOTEL
-        pdf.set_xy(x, y_pos)
         pdf.set_text_color(0, 0, 0)
-        if linea_cat:
-            pdf.set_font("Helvetica", "B", FONT_CAT)
-            pdf.multi_cell(ancho_texto, line_height, linea_cat, border=0, align="L")
-        pdf.set_x(x)
-        pdf.set_font("Helvetica", "B", FONT_NOMBRE)
-        pdf.multi_cell(ancho_texto, line_height, linea_nombre, border=0, align="L")
-        pdf.set_font("Helvetica", "", FONT_DETALLE)
-        if linea_reg:
-            pdf.set_x(x)
-            pdf.multi_cell(ancho_texto, line_height, linea_reg, border=0, align="L")
-        if linea_dir:
-            pdf.set_x(x)
-            pdf.multi_cell(ancho_texto, line_height, linea_dir, border=0, align="L")
-        pdf.set_x(x)
-        pdf.multi_cell(ancho_texto, line_height, linea_loc, border=0, align="L")
-        if linea_tel:
-            pdf.set_x(x)
-            pdf.multi_cell(ancho_texto, line_height, linea_tel, border=0, align="L")
-        if linea_web:
-            pdf.set_x(x)
-            pdf.multi_cell(ancho_texto, line_height, linea_web, border=0, align="L")
-
-        y_actual[current_col] = pdf.get_y() + 2
+        y_actual[current_col] = pdf.dibujar_bloque(x, y_pos, bloque, line_height) + 2
+        for destino in destinos:
+            destino.hotel(idx, provincia, localidad, lineas, pdf.page_no())
 
     return prov_pages, hotel_pages, loc_pages
 
 
-# ---- PASADA 1: render de medición (a un PDF temporal) ----
-# Páginas fijas antes del catálogo: [portada opc.] + [intro opc.] + índice + portada azul.
-paginas_fijas_antes = (
-    (1 if SHOW_PORTADA else 0)
-    + (1 if SHOW_SEGUNDA_PAGINA else 0)
-    + 2  # índice de provincias + portada azul del catálogo
+# --- MEDIDAS DE CADA HOTEL (para paginar sin dibujar) ---
+# `altura` y `altura_localidad` son las estimaciones con las que
+# `render_catalogo` decide los saltos de columna/página; las `lineas_*` son
+# las líneas reales en que `multi_cell` parte el bloque del hotel y el título
+# de su localidad (normal y "(cont.)"), que es lo que avanza el cursor.
+MedidaHotel = namedtuple(
+    "MedidaHotel",
+    "altura lineas altura_localidad lineas_localidad lineas_localidad_cont",
 )
 
-_scratch = PDF()
-_scratch.set_auto_page_break(auto=False)
-_scratch.set_font("Helvetica", "", 9)
-_scratch.provincia_actual = None  # sin cabecera/pie en las páginas fijas dummy
-for _ in range(paginas_fijas_antes):
-    _scratch.add_page()
-prov_pages_real, _hotel_pages_m, _loc_pages_m = render_catalogo(_scratch)
-del _scratch
-
-# Índice de provincias con las páginas REALES
-for item in indice_provincias:
-    prov = item["provincia"]
-    if prov in prov_pages_real:
-        item["pagina"] = prov_pages_real[prov]
-
-# ---- PASADA 2: generar el PDF completo en orden correcto ----
-
-# --- CREAR PDF FINAL ---
-pdf = PDF()
-pdf.set_auto_page_break(auto=False)
-pdf.set_font("Helvetica", "", 9)
-pdf.set_text_color(0, 0, 0)
-pdf.provincia_continuacion = False
-
-# Añadir portada a toda la página si existe
-if SHOW_PORTADA:
-    try:
-        pdf.add_page()
-        PAGE_W = pdf.w
-        PAGE_H = pdf.h
-        pdf.image("portada.jpg", x=0, y=0, w=PAGE_W, h=PAGE_H)
-    except Exception as e:
-        print(f"No se pudo cargar portada.jpg: {e}")
-
-# Añadir página de presentación (Segunda-pagina.jpg) solo si está activada
-if SHOW_SEGUNDA_PAGINA:
-    try:
+
+def _partir_multi_cell(pdf, estilo, size, ancho, texto):
+    """Líneas en que `multi_cell` partiría `texto` (sin dibujar nada)."""
+    pdf.set_font(FUENTE, estilo, size)
+    return pdf.multi_cell(ancho, line_height, texto, border=0, align="L",
+                          dry_run=True, output="LINES")
+
+
+def _lineas_multi_cell(pdf, estilo, size, ancho, texto):
+    """Nº de líneas en que `multi_cell` partiría `texto` (sin dibujar nada)."""
+    return len(_partir_multi_cell(pdf, estilo, size, ancho, texto))
+
+
+# PDF de medición (nunca se guarda), uno por maquetación: así las fuentes TTF
+# se cargan una vez por proceso y no una vez por provincia.
+_PDFS_MEDICION = {}
+
+
+def _pdf_medicion(huella=None):
+    huella = huella or huella_maquetacion()
+    pdf = _PDFS_MEDICION.get(huella)
+    if pdf is None:
+        pdf = _PDFS_MEDICION[huella] = PDF()
+        pdf.set_auto_page_break(auto=False)
+        pdf.provincia_actual = None
         pdf.add_page()
-        PAGE_W = pdf.w
-        PAGE_H = pdf.h
-        pdf.image("Segunda-pagina.jpg", x=0, y=0, w=PAGE_W, h=PAGE_H)
-    except Exception as e:
-        print(f"No se pudo cargar Segunda-pagina.jpg: {e}")
-
-# --- PÁGINA DE ÍNDICE 1: PROVINCIAS Y SUS CAPITALES ---
-pdf.provincia_actual = None
-pdf.add_page()
-
-X_IDX = x_contenido(pdf.page_no())
-
-# Número de página arriba a la derecha (estilo foto)
-pdf.set_font("Helvetica", "", 9)
-pdf.set_text_color(0, 0, 0)
-pdf.set_xy(X_IDX + CONTENT_WIDTH - 15, Y_TOP)
-pdf.cell(15, 6, str(pdf.page_no()), align="R")
-
-# Cabecera "ÍNDICE 1  -  INDEX 1"
-pdf.set_xy(X_IDX, Y_TOP + 1)
-pdf.set_font("Helvetica", "B", 10)
-pdf.cell(CONTENT_WIDTH, 6, _enc("ÍNDICE 1     -     INDEX 1"), align="C", new_x="LEFT", new_y="NEXT")
-pdf.ln(1)
-pdf.set_font("Helvetica", "B", 11)
-pdf.cell(CONTENT_WIDTH, 6, _enc("PROVINCIAS DE ESPAÑA Y SUS CAPITALES"), new_x="LEFT", new_y="NEXT", align="C")
-pdf.set_font("Helvetica", "B", 9)
-pdf.cell(CONTENT_WIDTH, 5, "PROVINCES OF SPAIN AND THEIR CAPITALS", new_x="LEFT", new_y="NEXT", align="C")
-pdf.ln(3)
-
-usable_width_prov = CONTENT_WIDTH
-separation_prov = 5
-table_width_prov = (usable_width_prov - separation_prov) / 2
-col_widths_prov = [table_width_prov * 0.41, table_width_prov * 0.45, table_width_prov * 0.14]
-x_left_prov = X_IDX
-x_right_prov = X_IDX + table_width_prov + separation_prov
-
-n_prov = len(indice_provincias)
-mid_prov = (n_prov + 1) // 2
-left_items_prov = indice_provincias[:mid_prov]
-right_items_prov = indice_provincias[mid_prov:]
-while len(left_items_prov) < len(right_items_prov):
-    left_items_prov.append({"provincia": "", "capital": "", "pagina": None})
-while len(right_items_prov) < len(left_items_prov):
-    right_items_prov.append({"provincia": "", "capital": "", "pagina": None})
-
-# Alto de fila calculado para repartir las provincias por toda la página
-_alto_disp_prov = Y_LIMIT - pdf.get_y()
-row_h_prov = min(7.0, _alto_disp_prov / (len(left_items_prov) + 1))
-
-pdf.set_font("Helvetica", "B", 7)
-y_header_prov = pdf.get_y()
-for _x_tabla in (x_left_prov, x_right_prov):
-    pdf.set_xy(_x_tabla, y_header_prov)
-    pdf.cell(col_widths_prov[0], row_h_prov, "PROVINCIAS", border=1, align="C")
-    pdf.cell(col_widths_prov[1], row_h_prov, "CAPITALES", border=1, align="C")
-    pdf.cell(col_widths_prov[2], row_h_prov, _enc("Pág."), border=1, align="C")
-pdf.set_y(y_header_prov + row_h_prov)
+    else:
+        # Como si se creara: FUENTE, la de FUENTES_TTF
+        sincronizar_fuente()
+    return pdf
+
+
+# --- BLOQUES DE HOTEL ---
+# Cada bloque se parte en líneas una sola vez, con el PDF de medición, y se
+# guarda relativo a su esquina (0, 0): la altura estimada con la que se
+# decide el salto de columna, el nº de líneas y los tramos (estilo, tamaño,
+# líneas) que dibujar. Colocarlo es solo trasladarlo (`PDF.dibujar_bloque`).
+# La clave es el contenido del bloque y la huella de maquetación (fuentes y
+# medidas), así que sirve para la medición, el dibujo y las demás ediciones
+# del mismo proceso.
+BloqueHotel = namedtuple("BloqueHotel", "altura lineas tramos")
+BLOQUES_HOTEL = {}
+
+
+def bloque_hotel(lineas, huella=None):
+    """`BloqueHotel` de las `lineas` de `construir_lineas_hotel`."""
+    huella = huella or huella_maquetacion()
+    clave = (huella,) + tuple(lineas[c] for c in ("cat", "nombre", "reg", "dir", "loc", "tel", "web"))
+    bloque = BLOQUES_HOTEL.get(clave)
+    if bloque is not None:
+        return bloque
+
+    pdf = _pdf_medicion(huella)
+    pdf.set_font(FUENTE, "", FONT_NOMBRE)
+    altura = calcular_altura_bloque(
+        pdf,
+        [lineas[c] for c in ("nombre", "cat", "reg", "dir", "loc", "tel", "web") if lineas[c]],
+        ancho_texto, line_height,
+    )
+    # Orden y fuentes del bloque; "nombre" y "loc" se dibujan aunque estén vacías
+    tramos = []
+    for estilo, size, claves in (
+        ("B", FONT_CAT, ("cat",)),
+        ("B", FONT_NOMBRE, ("nombre",)),
+        ("", FONT_DETALLE, ("reg", "dir", "loc", "tel", "web")),
+    ):
+        partes = []
+        for c in claves:
+            if lineas[c] or c in ("nombre", "loc"):
+                partes.extend(_partir_multi_cell(pdf, estilo, size, ancho_texto, lineas[c]))
+        if partes:
+            tramos.append((estilo, size, tuple(partes)))
+    bloque = BLOQUES_HOTEL[clave] = BloqueHotel(
+        altura, sum(len(p) for _e, _s, p in tramos), tuple(tramos)
+    )
+    return bloque
 
-# Helper: imprime una celda ajustando el tamaño de fuente si el texto
-# no cabe en el ancho disponible. Empieza en `font_size_default` y baja
-# hasta `font_size_min` en pasos de 0.5 hasta encontrar uno que quepa
-# (con un pequeño padding interno). Si ni al mínimo cabe, usa el mínimo.
-def cell_ajustada(pdf, w, h, txt, align, font_family="Helvetica", font_style="",
-                  font_size_default=7, font_size_min=4.5, padding=1.0):
-    txt_safe = txt.encode("latin-1", "ignore").decode("latin-1")
-    ancho_util = w - padding * 2
-    size = font_size_default
-    while size >= font_size_min:
-        pdf.set_font(font_family, font_style, size)
-        if pdf.get_string_width(txt_safe) <= ancho_util:
-            break
-        size -= 0.5
-    pdf.cell(w, h, txt_safe, border=1, align=align)
-    # Restaurar tamaño por defecto para celdas siguientes
-    pdf.set_font(font_family, font_style, font_size_default)
 
+def medir_registros(filas, medidas=None):
+    """Mide los hoteles de `filas` que no estén ya en `medidas`.
 
-for i in range(len(left_items_prov)):
-    left_p = left_items_prov[i]
-    right_p = right_items_prov[i] if i < len(right_items_prov) else {"provincia": "", "capital": "", "pagina": None}
-    prov_l = left_p["provincia"]
-    prov_r = right_p["provincia"]
-    if not prov_l and not prov_r:
-        continue
-    y_p = pdf.get_y()
-    capital_l = left_p["capital"]
-    page_l = str(left_p["pagina"]) if left_p["pagina"] is not None else "..."
-
-    # FILA IZQUIERDA
-    pdf.set_xy(x_left_prov, y_p)
-    cell_ajustada(pdf, col_widths_prov[0], row_h_prov, prov_l, "L")
-    cell_ajustada(pdf, col_widths_prov[1], row_h_prov, capital_l, "L")
-    cell_ajustada(pdf, col_widths_prov[2], row_h_prov, page_l, "C")
-
-    capital_r = right_p["capital"]
-    page_r = str(right_p["pagina"]) if right_p["pagina"] is not None else "..."
-
-    # FILA DERECHA
-    pdf.set_xy(x_right_prov, y_p)
-    cell_ajustada(pdf, col_widths_prov[0], row_h_prov, prov_r, "L")
-    cell_ajustada(pdf, col_widths_prov[1], row_h_prov, capital_r, "L")
-    cell_ajustada(pdf, col_widths_prov[2], row_h_prov, page_r, "C")
-
-    pdf.set_y(y_p + row_h_prov)
-
-# --- PORTADA AZUL DEL CATÁLOGO (antes de las provincias) ---
-pdf.provincia_actual = None
-pdf.add_page()
-dibujar_portada_seccion(
-    pdf,
-    PORTADA_CATALOGO_ES,
-    PORTADA_CATALOGO_EN,
-    pdf.page_no(),
-)
+    Devuelve (y rellena) el dict `medidas`: índice de fila → `MedidaHotel`.
+    Las medidas no dependen de la página ni de la columna, así que sirven
+    para cualquier subconjunto del registro mientras no cambie la maquetación.
+    """
+    if medidas is None:
+        medidas = {}
+    huella = huella_maquetacion()
+    pdf = _pdf_medicion(huella)
+    localidades = {}
+
+    for idx, row in filas.iterrows():
+        if idx in medidas:
+            continue
+        localidad = str(row["LOCALIDAD"])
+        bloque = bloque_hotel(construir_lineas_hotel(row), huella)
 
-# --- GENERAR CATÁLOGO (pasada 2, render final; páginas idénticas a la pasada 1) ---
-prov_pages_final, hotel_pages, loc_pages = render_catalogo(pdf)
-
-# --- PORTADA ÍNDICE ALFABÉTICO DE HOTELES (estilo minimalista) ---
-pdf.provincia_actual = None
-pdf.add_page()
-dibujar_portada_seccion(
-    pdf,
-    PORTADA_HOTELES_ES,
-    PORTADA_HOTELES_EN,
-    pdf.page_no(),
-)
+        if localidad not in localidades:
+            pdf.set_font(FUENTE, "", FONT_NOMBRE)
+            altura_loc = (
+                calcular_altura_linea(pdf, localidad.upper(), COLUMN_WIDTH, line_height) + 4
+            )
+            localidades[localidad] = (
+                altura_loc,
+                _lineas_multi_cell(pdf, "B", FONT_LOCALIDAD, COLUMN_WIDTH,
+                                   _enc(localidad.upper())),
+                _lineas_multi_cell(pdf, "B", FONT_LOCALIDAD, COLUMN_WIDTH,
+                                   _enc(localidad.upper() + " (cont.)")),
+            )
+
+        medidas[idx] = MedidaHotel(bloque.altura, bloque.lineas, *localidades[localidad])
+    return medidas
+
+
+def simular_catalogo(filas, medidas, primera_pagina=1):
+    """Pagina `filas` con el mismo algoritmo que `render_catalogo`, pero sin
+    dibujar: solo suma las alturas de `medidas`.
+
+    Devuelve (prov_pages, hotel_pages, loc_pages, paginas_fila, ultima_pagina)
+    suponiendo que la primera provincia empieza en `primera_pagina`.
+    """
+    prov_pages = {}
+    hotel_pages = {}
+    loc_pages = {}
+    paginas_fila = {}
+
+    pagina = primera_pagina - 1
+    y_actual = [Y_START] * COLS
+    provincia_anterior = ""
+    localidad_anterior = ""
+    current_col = 0
+
+    for idx, provincia, localidad, hotel_name in zip(
+        filas.index,
+        map(str, filas["PROVINCIA"]),
+        map(str, filas["LOCALIDAD"]),
+        filas["NOMBRE DE EMPRESA"],
+    ):
+        if provincia != provincia_anterior:
+            provincia_anterior = provincia
+            localidad_anterior = ""
+            pagina += 1
+            current_col = 0
+            y_actual = [Y_START] * COLS
+            if provincia not in prov_pages:
+                prov_pages[provincia] = pagina
+
+        m = medidas[idx]
+        hay_cambio_localidad = localidad != localidad_anterior
+        altura_localidad = m.altura_localidad if hay_cambio_localidad else 0
+        altura_total_requerida = altura_localidad + m.altura + 2
+        localidad_cont = False
+
+        if y_actual[current_col] + altura_total_requerida > Y_LIMIT:
+            current_col += 1
+            if current_col >= COLS:
+                if not hay_cambio_localidad:
+                    localidad_cont = True
+                pagina += 1
+                current_col = 0
+                y_actual = [Y_START] * COLS
+
+        y_pos = y_actual[current_col]
+
+        hotel_name_display = limpiar_nombre_hotel(str(hotel_name).strip())
+        if hotel_name_display and hotel_name_display not in hotel_pages:
+            hotel_pages[hotel_name_display] = pagina
+        paginas_fila[idx] = pagina
+
+        # El cursor avanza línea a línea, igual que en `multi_cell`
+        if hay_cambio_localidad:
+            y_pos = y_pos + 1
+            localidad_anterior = localidad
+            if localidad not in loc_pages:
+                loc_pages[localidad] = pagina
+            for _ in range(m.lineas_localidad):
+                y_pos += line_height
+            y_actual[current_col] = y_pos
+        elif localidad_cont:
+            y_pos = y_pos + 1
+            for _ in range(m.lineas_localidad_cont):
+                y_pos += line_height
+            for _c in range(COLS):
+                y_actual[_c] = y_pos
+
+        for _ in range(m.lineas):
+            y_pos += line_height
+        y_actual[current_col] = y_pos + 2
+
+    return prov_pages, hotel_pages, loc_pages, paginas_fila, pagina
+
+
+def huella_maquetacion():
+    """Huella de las constantes que deciden dónde cae cada hotel. Si cambia,
+    las páginas guardadas de cada provincia ya no sirven."""
+    valores = (
+        PAGE_WIDTH, PAGE_HEIGHT, COLS, SEP_COLUMNAS, COLUMN_WIDTH, Y_START,
+        Y_LIMIT, FONT_CABECERA, FONT_LOCALIDAD, FONT_NOMBRE, FONT_CAT,
+        FONT_DETALLE, line_height, ancho_texto, FACTOR_SEGURIDAD_ANCHO,
+        fuente_configurada(), FUENTES_TTF and sorted(FUENTES_TTF.items()),
+    )
+    return hashlib.blake2b(repr(valores).encode(), digest_size=8).hexdigest()
+
+
+def tramos_provincia(filas):
+    """Divide `filas` en tramos consecutivos de la misma provincia, que es
+    justo donde `render_catalogo` abre página nueva."""
+    tramos = []
+    inicio = 0
+    for provincia, grupo in groupby(filas["PROVINCIA"].astype(str)):
+        n = sum(1 for _ in grupo)
+        tramos.append((provincia, filas.iloc[inicio:inicio + n]))
+        inicio += n
+    return tramos
+
+
+def paginas_fijas_antes():
+    """Páginas fijas antes del catálogo: [portada opc.] + [intro opc.] +
+    índice de provincias + portada azul del catálogo."""
+    return (
+        (1 if SHOW_PORTADA else 0)
+        + (1 if SHOW_SEGUNDA_PAGINA else 0)
+        + 2  # índice de provincias + portada azul del catálogo
+    )
 
-# --- INICIAR ÍNDICE ALFABÉTICO DE HOTELES ---
-pdf.provincia_actual = None
-pdf.add_page()
+
+def paginar_provincias(filas, medidas, paginas_previas=None, provincias_cambiadas=(),
+                       progreso=None):
+    """PASADA 1: página REAL en que empieza cada provincia del libro.
+
+    `paginas_previas` (provincia → páginas de cada tramo) permite saltarse la
+    medición y simulación de las provincias que no están en
+    `provincias_cambiadas`. Devuelve (prov_pages, paginas_provincia).
+    """
+    progreso = progreso or Progreso()
+    progreso.inicio("paginacion", len(filas))
+    paginas_previas = paginas_previas or {}
+    tramos = tramos_provincia(filas)
+    n_tramos = {}
+    for provincia, _filas in tramos:
+        n_tramos[provincia] = n_tramos.get(provincia, 0) + 1
+
+    prov_pages = {}
+    paginas_provincia = {}  # provincia → páginas de cada uno de sus tramos
+    pagina_siguiente = paginas_fijas_antes() + 1
+    filas_hechas = 0
+    for n, (provincia, tramo) in enumerate(tramos, start=1):
+        progreso.avance(
+            "paginacion", filas_hechas, len(filas),
+            provincia=provincia, n=n, de=len(tramos),
+        )
+        filas_hechas += len(tramo)
+        previas = paginas_previas.get(provincia)
+        hechas = paginas_provincia.setdefault(provincia, [])
+        if (
+            provincia not in provincias_cambiadas
+            and previas is not None
+            and len(previas) == n_tramos[provincia]
+        ):
+            n_paginas = previas[len(hechas)]
+        else:
+            medir_registros(tramo, medidas)
+            n_paginas = simular_catalogo(tramo, medidas)[4]
+        hechas.append(n_paginas)
+        if provincia not in prov_pages:
+            prov_pages[provincia] = pagina_siguiente
+        pagina_siguiente += n_paginas
+    progreso.fin("paginacion", paginas=pagina_siguiente - 1)
+    return prov_pages, paginas_provincia
+
+
+def paginas_tramos_dibujados(filas, paginas_fila):
+    """Páginas que ocupa cada tramo de provincia en el libro ya dibujado, a
+    partir de la página de cada fila (`paginas_fila` de `construir_libro`).
+    Mismo formato que las `paginas_provincia` de `paginar_provincias`."""
+    paginas = {}
+    for provincia, tramo in tramos_provincia(filas):
+        paginas.setdefault(provincia, []).append(
+            paginas_fila[tramo.index[-1]] - paginas_fila[tramo.index[0]] + 1
+        )
+    return paginas
 
 
 # --- Cabecera común de las páginas de índice alfabético ---
 # Los índices finales van muy compactos (4 columnas) para no inflar el
 # número total de páginas del libro.
 FONT_TITULO_INDICE = 7.5
+ALTO_TITULO_INDICE = 4.5  # alto de cada uno de los dos títulos
+SEP_CABECERA_INDICE = 1.5  # hueco entre los títulos y la primera fila
 FONT_INDICE = 5.0
 ROW_H_INDICE = 2.9
 COLS_INDICE = 4
@@ -958,188 +1425,1142 @@ SEP_INDICE = 2.5
 Y_LIMIT_INDICE = Y_LIMIT
 
 
+# Constantes que una edición puede cambiar (tamaño, márgenes, rejilla,
+# tipografías y páginas opcionales). El resto se deriva de ellas.
+CONSTANTES_EDITABLES = {
+    "SHOW_PORTADA", "SHOW_SEGUNDA_PAGINA",
+    "TRIM_WIDTH", "TRIM_HEIGHT", "BLEED",
+    "MARGIN_GUTTER", "MARGIN_OUTER", "MARGIN_TOP", "MARGIN_BOTTOM",
+    "COLS", "SEP_COLUMNAS",
+    "FONT_CABECERA", "FONT_LOCALIDAD", "FONT_NOMBRE", "FONT_CAT", "FONT_DETALLE",
+    "line_height", "FACTOR_SEGURIDAD_ANCHO", "FUENTES_TTF",
+    "FONT_TITULO_INDICE", "ALTO_TITULO_INDICE", "SEP_CABECERA_INDICE",
+    "FONT_INDICE", "ROW_H_INDICE", "COLS_INDICE", "SEP_INDICE",
+}
+
+
+def configurar_maquetacion(**valores):
+    """Cambia constantes de `CONSTANTES_EDITABLES` y recalcula las derivadas
+    con las mismas fórmulas de arriba. Afecta a todo el proceso, así que cada
+    edición se construye en su propio proceso (ver ediciones.py)."""
+    g = globals()
+    for nombre, valor in valores.items():
+        if nombre not in CONSTANTES_EDITABLES:
+            raise ValueError(f"Constante de maquetación desconocida: {nombre}")
+        g[nombre] = valor
+
+    g["PAGE_WIDTH"] = TRIM_WIDTH + BLEED
+    g["PAGE_HEIGHT"] = TRIM_HEIGHT + 2 * BLEED
+    g["CONTENT_WIDTH"] = TRIM_WIDTH - MARGIN_GUTTER - MARGIN_OUTER
+    g["CONTENT_HEIGHT"] = TRIM_HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+    g["Y_TOP"] = BLEED + MARGIN_TOP
+    g["Y_BOTTOM"] = PAGE_HEIGHT - BLEED - MARGIN_BOTTOM
+    g["MARGIN"] = MARGIN_OUTER
+    g["COLUMN_WIDTH"] = (CONTENT_WIDTH - (COLS - 1) * SEP_COLUMNAS) / COLS
+    g["PASO_COLUMNA"] = COLUMN_WIDTH + SEP_COLUMNAS
+    g["Y_LINEA"] = Y_TOP + 6.5
+    g["Y_START"] = Y_TOP + 9.5
+    g["Y_PIE"] = Y_BOTTOM - 4.5
+    g["Y_LIMIT"] = Y_PIE - 1.0
+    g["ancho_texto"] = COLUMN_WIDTH - 1.5
+    g["Y_LIMIT_INDICE"] = Y_LIMIT
+    sincronizar_fuente()
+
+
 def cabecera_indice(pdf, titulo_es, titulo_en):
     """Imprime los dos títulos bilingües y deja el cursor bajo ellos."""
     x = x_contenido(pdf.page_no())
     pdf.set_xy(x, Y_TOP)
-    pdf.set_font("Helvetica", "B", FONT_TITULO_INDICE)
+    pdf.set_font(FUENTE, "B", FONT_TITULO_INDICE)
     pdf.set_text_color(0, 0, 0)
-    pdf.cell(CONTENT_WIDTH, 4.5, _enc(titulo_es), new_x="LEFT", new_y="NEXT", align="C")
-    pdf.cell(CONTENT_WIDTH, 4.5, _enc(titulo_en), new_x="LEFT", new_y="NEXT", align="C")
-    pdf.ln(1.5)
+    pdf.cell(CONTENT_WIDTH, ALTO_TITULO_INDICE, _enc(titulo_es), new_x="LEFT", new_y="NEXT", align="C")
+    pdf.cell(CONTENT_WIDTH, ALTO_TITULO_INDICE, _enc(titulo_en), new_x="LEFT", new_y="NEXT", align="C")
+    pdf.ln(SEP_CABECERA_INDICE)
     return pdf.get_y()
 
 
+def y_bajo_cabecera_indice():
+    """Y en que `cabecera_indice` deja el cursor, sin dibujarla: los mismos
+    avances, sumados en el mismo orden."""
+    return Y_TOP + ALTO_TITULO_INDICE + ALTO_TITULO_INDICE + SEP_CABECERA_INDICE
+
+
+def filas_columna_indice():
+    """Y de cada fila de una columna de índice alfabético, desde donde la
+    deja `cabecera_indice` y con una fila de ROW_H_INDICE por entrada. Es
+    igual en todas las páginas del índice."""
+    y = y_bajo_cabecera_indice()
+    posiciones = []
+    while not y + ROW_H_INDICE > Y_LIMIT_INDICE:
+        posiciones.append(y)
+        y += ROW_H_INDICE
+    return posiciones or [y]
+
+
+def paginas_indice(n_entradas):
+    """Páginas que ocupa un índice alfabético de `n_entradas` (una fila por
+    entrada), con los mismos avances de cursor que `render_indice_alfabetico`."""
+    por_pagina = len(filas_columna_indice()) * COLS_INDICE
+    return max(1, math.ceil(n_entradas / por_pagina))
+
+
+def paginas_libro(paginas_catalogo, n_entradas):
+    """Total de páginas del libro: fijas + catálogo + una sección por índice
+    alfabético de `INDICES`, con su portada azul. `n_entradas` es el nº de
+    entradas de cada índice, en el orden de `INDICES`."""
+    return (
+        paginas_fijas_antes()
+        + paginas_catalogo
+        + sum(1 + paginas_indice(n) for n in n_entradas)
+    )
+
+
 TITULO_HOTELES_ES = "Hoteles legalmente autorizados existentes en España, por orden alfabético."
 TITULO_HOTELES_EN = "Hotels legally authorized existing in Spain, in alphabetical order."
 TITULO_POB_ES = "Poblaciones de España con hoteles legalmente autorizados, por orden alfabético."
 TITULO_POB_EN = "Spanish towns with legally authorized hotels, in alphabetical order."
 
-# Títulos (sin línea separadora)
-y_start_index = cabecera_indice(pdf, TITULO_HOTELES_ES, TITULO_HOTELES_EN)
 
-# Lista de hoteles ordenada
-hoteles_lista = sorted(hotel_pages.keys(), key=lambda x: x.lower())
-
-# Configuración: columnas verticales
-COLS_INDEX = COLS_INDICE
-col_width_index = (CONTENT_WIDTH - (COLS_INDEX - 1) * SEP_INDICE) / COLS_INDEX
-row_height_index = ROW_H_INDICE  # Ajustado para tipografía pequeña
-y_limit_index = Y_LIMIT_INDICE
+# Helper: imprime una celda ajustando el tamaño de fuente si el texto
+# no cabe en el ancho disponible. Empieza en `font_size_default` y baja
+# hasta `font_size_min` en pasos de 0.5 hasta encontrar uno que quepa
+# (con un pequeño padding interno). Si ni al mínimo cabe, usa el mínimo.
+def cell_ajustada(pdf, w, h, txt, align, font_family=None, font_style="",
+                  font_size_default=7, font_size_min=4.5, padding=1.0):
+    font_family = font_family or FUENTE
+    txt_safe = _enc(txt)
+    ancho_util = w - padding * 2
+    size = font_size_default
+    while size >= font_size_min:
+        pdf.set_font(font_family, font_style, size)
+        if pdf.get_string_width(txt_safe) <= ancho_util:
+            break
+        size -= 0.5
+    pdf.cell(w, h, txt_safe, border=1, align=align)
+    # Restaurar tamaño por defecto para celdas siguientes
+    pdf.set_font(font_family, font_style, font_size_default)
 
 
 # ---- FUNCIÓN DE FORMATO (tipografía 6pt equivalente) ----
-def format_index_entry(pdf, name, page, max_width):
-    encoded_name = name.encode("latin-1", "ignore").decode("latin-1")
+def medidor_texto(pdf):
+    """Función texto → ancho equivalente a `pdf.get_string_width` con la
+    fuente actual. Con las fuentes base suma directamente la tabla de anchos
+    (enteros) con la misma aritmética que fpdf2, sin trocear el texto; con
+    TTF o espaciado especial usa `get_string_width`."""
+    fuente = pdf.current_font
+    if pdf.is_ttf_font or pdf.font_stretching != 100 or pdf.char_spacing:
+        return pdf.get_string_width
+    anchos = fuente.cw
+    tamano = pdf.font_size_pt
+    k = pdf.k
+
+    def ancho(texto):
+        return sum(anchos[c] for c in texto) * tamano * 0.001 / k
+    return ancho
+
+
+def format_index_entry(pdf, name, page, max_width, ancho=None):
+    """Línea "nombre ..... página" que cabe en `max_width`. `ancho` es la
+    función de medida (por defecto `medidor_texto(pdf)`)."""
+    ancho = ancho or medidor_texto(pdf)
+    encoded_name = _enc(name)
     page_str = str(page)
 
     # Reservar espacio para número de página
-    space_reserved = pdf.get_string_width(page_str) + 1.0
+    space_reserved = ancho(page_str) + 1.0
     max_name_width = max_width - space_reserved - 1.5
 
     # Truncado si hace falta
-    while pdf.get_string_width(encoded_name) > max_name_width:
+    while ancho(encoded_name) > max_name_width:
         encoded_name = encoded_name[:-1].rstrip()
         if len(encoded_name) <= 2:
             break
-    if pdf.get_string_width(encoded_name) > max_name_width:
+    if ancho(encoded_name) > max_name_width:
         encoded_name = encoded_name[:-2] + ".."
 
     # Puntos
     space_left = (
         max_width
-        - pdf.get_string_width(encoded_name)
-        - pdf.get_string_width(page_str)
+        - ancho(encoded_name)
+        - ancho(page_str)
         - 1
     )
-    dot_count = max(2, int(space_left / pdf.get_string_width(".")))
+    dot_count = max(2, int(space_left / ancho(".")))
 
     return f"{encoded_name} {'.' * dot_count} {page_str}"
 
 
-# ---- IMPRIMIR ÍNDICE EN COLUMNAS VERTICALES ----
-pdf.set_font("Helvetica", "", FONT_INDICE)
-pdf.set_text_color(0, 0, 0)
-
-pdf.set_y(y_start_index)
-
-
 def columnas_indice(page_no, n_cols, ancho_col):
     base = x_contenido(page_no)
     return [base + i * (ancho_col + SEP_INDICE) for i in range(n_cols)]
 
 
-x_cols = columnas_indice(pdf.page_no(), COLS_INDEX, col_width_index)
-y_cols = [y_start_index] * COLS_INDEX
+# Un índice alfabético del final del libro: etapa de progreso, títulos de
+# sus páginas, textos de su portada azul y entrada en el esquema. Para añadir
+# otro índice basta con declararlo y ponerlo en `INDICES` con la función que
+# da sus entradas: el render, la previsión de páginas y el total del libro
+# recorren esa lista.
+IndiceAlfabetico = namedtuple(
+    "IndiceAlfabetico",
+    ["etapa", "titulo_es", "titulo_en", "portada_es", "portada_en", "marcador"],
+)
 
-hotel_idx = 0
-current_col = 0
-page_count = 0
 
-while hotel_idx < len(hoteles_lista):
+def render_indice_alfabetico(pdf, indice, entradas, progreso=None):
+    """Portada azul y páginas de `indice` con `entradas`, lista ya ordenada
+    de (texto, página), en COLS_INDICE columnas verticales.
 
-    # Verificar si necesita página nueva (cualquier columna sobrepasa límite)
-    if y_cols[current_col] + row_height_index > y_limit_index and hotel_idx < len(
-        hoteles_lista
-    ):
+    Como cada columna tiene siempre las mismas filas, todas las líneas y
+    sus posiciones se calculan antes de dibujar y cada página se escribe de
+    una vez con `PDF.textos_en_bloque`, con un enlace por fila a la página
+    de la entrada (`PDF.enlaces_en_bloque`). La sección entra en el esquema
+    del perfil web. Devuelve las páginas de la sección (`portada`, `primera`,
+    `ultima`), las mismas que da `prever_indice`.
+    """
+    progreso = progreso or Progreso()
+    pdf.provincia_actual = None
+    pdf.add_page()
+    pdf.marcador(indice.marcador)
+    portada = pdf.page_no()
+    dibujar_portada_seccion(pdf, indice.portada_es, indice.portada_en, portada)
+    progreso.inicio(indice.etapa, len(entradas))
+
+    ancho_col = (CONTENT_WIDTH - (COLS_INDICE - 1) * SEP_INDICE) / COLS_INDICE
+    medicion = _pdf_medicion()
+    medicion.set_font(FUENTE, "", FONT_INDICE)
+    ancho = medidor_texto(medicion)
+    lineas = [
+        format_index_entry(medicion, texto, pagina, ancho_col - 2, ancho)
+        for texto, pagina in entradas
+    ]
+    ys = filas_columna_indice()
+    por_columna = len(ys)
+    por_pagina = por_columna * COLS_INDICE
+
+    for inicio in range(0, max(1, len(lineas)), por_pagina):
+        pdf.add_page()
+        cabecera_indice(pdf, indice.titulo_es, indice.titulo_en)
+        if inicio:
+            progreso.avance(indice.etapa, inicio, len(lineas), paginas=pdf.page_no())
+        pdf.set_font(FUENTE, "", FONT_INDICE)
+        pdf.set_text_color(0, 0, 0)
+        xs = columnas_indice(pdf.page_no(), COLS_INDICE, ancho_col)
+        filas_pagina = [
+            (xs[n // por_columna], ys[n % por_columna], linea, pagina)
+            for n, (linea, (_texto, pagina)) in enumerate(
+                zip(lineas[inicio:inicio + por_pagina], entradas[inicio:inicio + por_pagina])
+            )
+        ]
+        pdf.textos_en_bloque([(x, y, linea) for x, y, linea, _p in filas_pagina], ROW_H_INDICE)
+        pdf.enlaces_en_bloque(
+            (x, y, ancho_col, ROW_H_INDICE, pagina) for x, y, _l, pagina in filas_pagina
+        )
+    progreso.fin(indice.etapa, paginas=pdf.page_no())
+    return {"portada": portada, "primera": portada + 1, "ultima": pdf.page_no()}
+
+
+def prever_indice(n_entradas, portada):
+    """Páginas de un índice alfabético de `n_entradas` cuya portada azul cae
+    en la página `portada`, sin dibujarlo: `portada`, `primera`, `ultima` y
+    `por_pagina`. La entrada n-ésima (desde 0) va en la página
+    `primera + n // por_pagina`."""
+    por_pagina = len(filas_columna_indice()) * COLS_INDICE
+    return {
+        "portada": portada,
+        "primera": portada + 1,
+        "ultima": portada + paginas_indice(n_entradas),
+        "por_pagina": por_pagina,
+    }
+
+
+def paginas_poblacion(loc_pages):
+    """Mapa población → página, con las variantes de una localidad (espacios
+    sobrantes) fusionadas en su primera aparición."""
+    # loc_pages usa la localidad tal cual aparece; normalizamos la clave para
+    # fusionar variantes por espacios/mayúsculas y quedarnos con la 1ª página.
+    poblacion_pages = {}
+    for _loc, _pg in loc_pages.items():
+        _clave = str(_loc).strip()
+        if _clave and _clave not in poblacion_pages:
+            poblacion_pages[_clave] = _pg
+    return poblacion_pages
+
+
+def entradas_hoteles(filas, hotel_pages, loc_pages):
+    """Entradas (texto, página) del índice de hoteles, ya ordenadas."""
+    hoteles_lista = ordenar_por_rango(
+        hotel_pages, filas, "NOMBRE DE EMPRESA", "RANGO_HOTEL",
+        lambda n: limpiar_nombre_hotel(str(n).strip()),
+    )
+    return [(h, hotel_pages[h]) for h in hoteles_lista]
+
+
+def entradas_poblaciones(filas, hotel_pages, loc_pages):
+    """Entradas (texto, página) del índice de poblaciones, ordenadas
+    alfabéticamente (sin tildes)."""
+    poblacion_pages = paginas_poblacion(loc_pages)
+    poblaciones_lista = ordenar_por_rango(
+        poblacion_pages, filas, "LOCALIDAD", "RANGO_POBLACION", lambda l: str(l).strip()
+    )
+    return [(p, poblacion_pages[p]) for p in poblaciones_lista]
+
+
+def entradas_previstas(filas):
+    """Entradas de cada índice de `INDICES` (en su orden) para el libro de
+    `filas`, sin maquetar: los textos, en el mismo orden en que el render
+    registra hoteles y localidades, y None como página."""
+    hotel_pages = {}
+    for nombre in filas["NOMBRE DE EMPRESA"]:
+        display = limpiar_nombre_hotel(str(nombre).strip())
+        if display:
+            hotel_pages.setdefault(display)
+    loc_pages = dict.fromkeys(map(str, filas["LOCALIDAD"]))
+    return [entradas(filas, hotel_pages, loc_pages) for _indice, entradas in INDICES]
+
+
+def prever_indices(filas, ultima_pagina_catalogo):
+    """Páginas de los índices alfabéticos del libro de `filas` cuyo catálogo
+    acaba en `ultima_pagina_catalogo`, sin maquetar ni medir nada: para cada
+    índice (por su etapa) lo que da `prever_indice` más `entradas`, texto →
+    página del índice en que aparece. Incluye también el total de
+    `paginas` del libro y sus `margenes` (medianil, exterior) de KDP.
+
+    Las entradas salen de `entradas_previstas`, así que coinciden con las
+    del libro.
+    """
+    prevision = {}
+    siguiente = ultima_pagina_catalogo + 1
+    for (indice, _entradas), entradas in zip(INDICES, entradas_previstas(filas)):
+        seccion = prever_indice(len(entradas), siguiente)
+        seccion["entradas"] = {
+            texto: seccion["primera"] + n // seccion["por_pagina"]
+            for n, (texto, _pagina) in enumerate(entradas)
+        }
+        prevision[indice.etapa] = seccion
+        siguiente = seccion["ultima"] + 1
+    prevision["paginas"] = siguiente - 1
+    prevision["margenes"] = margenes_para_paginas(siguiente - 1)
+    return prevision
+
+
+INDICE_HOTELES = IndiceAlfabetico(
+    "indice_hoteles", TITULO_HOTELES_ES, TITULO_HOTELES_EN,
+    PORTADA_HOTELES_ES, PORTADA_HOTELES_EN, "Índice de hoteles",
+)
+INDICE_POBLACIONES = IndiceAlfabetico(
+    "indice_poblaciones", TITULO_POB_ES, TITULO_POB_EN,
+    PORTADA_POBLACIONES_ES, PORTADA_POBLACIONES_EN, "Índice de poblaciones",
+)
+
+# Índices alfabéticos del libro, en el orden en que se dibujan, cada uno con
+# la función que da sus entradas (texto, página) a partir de `filas` y de las
+# páginas de hoteles y localidades del catálogo
+INDICES = (
+    (INDICE_HOTELES, entradas_hoteles),
+    (INDICE_POBLACIONES, entradas_poblaciones),
+)
+
+
+# Entrada del índice de provincias en el esquema (marcadores) del perfil web;
+# las provincias cuelgan al mismo nivel y sus localidades debajo de cada una.
+MARCADOR_PROVINCIAS = "Índice de provincias"
+
+
+def construir_indice_provincias(filas, prov_pages):
+    """Filas del índice 1: provincias en orden alfabético (sin tildes) con su
+    capital y la página REAL en que empiezan."""
+    provincias_unicas = ordenar_por_rango(
+        filas["PROVINCIA"].unique().tolist(), filas, "PROVINCIA", "RANGO_PROVINCIA"
+    )
+    indice_provincias = []
+    for prov in provincias_unicas:
+        prov_normalizada = normalizar_provincia(prov).replace(" ", "")
+        capital = CAPITALES.get(prov_normalizada, "-")
+        indice_provincias.append(
+            {"provincia": prov, "capital": capital, "pagina": prov_pages.get(prov)}
+        )
+    return indice_provincias
 
-        # Pasar a siguiente columna
-        current_col += 1
 
-        if current_col >= COLS_INDEX:
-            # Nueva página
+def _abrir_libro():
+    """PDF nuevo con las páginas de imagen opcionales del principio (portada
+    y presentación), listo para el índice de provincias."""
+    pdf = PDF()
+    pdf.set_auto_page_break(auto=False)
+    pdf.set_font(FUENTE, "", 9)
+    pdf.set_text_color(0, 0, 0)
+    pdf.provincia_continuacion = False
+
+    # Añadir portada a toda la página si existe
+    if SHOW_PORTADA:
+        try:
+            pdf.add_page()
+            PAGE_W = pdf.w
+            PAGE_H = pdf.h
+            pdf.image(preparar_imagen("portada.jpg", PAGE_W, PAGE_H), x=0, y=0, w=PAGE_W, h=PAGE_H)
+        except Exception as e:
+            print(f"No se pudo cargar portada.jpg: {e}")
+
+    # Añadir página de presentación (Segunda-pagina.jpg) solo si está activada
+    if SHOW_SEGUNDA_PAGINA:
+        try:
             pdf.add_page()
-            y_nueva = cabecera_indice(pdf, TITULO_HOTELES_ES, TITULO_HOTELES_EN)
-            pdf.set_font("Helvetica", "", FONT_INDICE)
+            PAGE_W = pdf.w
+            PAGE_H = pdf.h
+            pdf.image(preparar_imagen("Segunda-pagina.jpg", PAGE_W, PAGE_H), x=0, y=0, w=PAGE_W, h=PAGE_H)
+        except Exception as e:
+            print(f"No se pudo cargar Segunda-pagina.jpg: {e}")
+    return pdf
 
-            current_col = 0
-            x_cols = columnas_indice(pdf.page_no(), COLS_INDEX, col_width_index)
-            y_cols = [y_nueva] * COLS_INDEX
-            page_count += 1
-
-    # Imprimir hotel en columna actual
-    hotel = hoteles_lista[hotel_idx]
-    pagina = hotel_pages[hotel]
-    linea = format_index_entry(pdf, hotel, pagina, col_width_index - 2)
-
-    pdf.set_xy(x_cols[current_col], y_cols[current_col])
-    pdf.cell(col_width_index, row_height_index, linea, border=0, align="L")
-
-    y_cols[current_col] += row_height_index
-    hotel_idx += 1
-
-# --- PORTADA ÍNDICE ALFABÉTICO DE POBLACIONES (estilo minimalista) ---
-pdf.provincia_actual = None
-pdf.add_page()
-dibujar_portada_seccion(
-    pdf,
-    PORTADA_POBLACIONES_ES,
-    PORTADA_POBLACIONES_EN,
-    pdf.page_no(),
+
+def dibujar_indice_provincias(pdf, indice_provincias):
+    """Índice 1 (provincias, capitales y página) en la página actual. Cada
+    fila de la tabla enlaza con la primera página de su provincia."""
+    X_IDX = x_contenido(pdf.page_no())
+
+    # Número de página arriba a la derecha (estilo foto)
+    pdf.set_font(FUENTE, "", 9)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_xy(X_IDX + CONTENT_WIDTH - 15, Y_TOP)
+    pdf.cell(15, 6, str(pdf.page_no()), align="R")
+
+    # Cabecera "ÍNDICE 1  -  INDEX 1"
+    pdf.set_xy(X_IDX, Y_TOP + 1)
+    pdf.set_font(FUENTE, "B", 10)
+    pdf.cell(CONTENT_WIDTH, 6, _enc("ÍNDICE 1     -     INDEX 1"), align="C", new_x="LEFT", new_y="NEXT")
+    pdf.ln(1)
+    pdf.set_font(FUENTE, "B", 11)
+    pdf.cell(CONTENT_WIDTH, 6, _enc("PROVINCIAS DE ESPAÑA Y SUS CAPITALES"), new_x="LEFT", new_y="NEXT", align="C")
+    pdf.set_font(FUENTE, "B", 9)
+    pdf.cell(CONTENT_WIDTH, 5, "PROVINCES OF SPAIN AND THEIR CAPITALS", new_x="LEFT", new_y="NEXT", align="C")
+    pdf.ln(3)
+
+    usable_width_prov = CONTENT_WIDTH
+    separation_prov = 5
+    table_width_prov = (usable_width_prov - separation_prov) / 2
+    col_widths_prov = [table_width_prov * 0.41, table_width_prov * 0.45, table_width_prov * 0.14]
+    x_left_prov = X_IDX
+    x_right_prov = X_IDX + table_width_prov + separation_prov
+
+    n_prov = len(indice_provincias)
+    mid_prov = (n_prov + 1) // 2
+    left_items_prov = indice_provincias[:mid_prov]
+    right_items_prov = indice_provincias[mid_prov:]
+    while len(left_items_prov) < len(right_items_prov):
+        left_items_prov.append({"provincia": "", "capital": "", "pagina": None})
+    while len(right_items_prov) < len(left_items_prov):
+        right_items_prov.append({"provincia": "", "capital": "", "pagina": None})
+
+    # Alto de fila calculado para repartir las provincias por toda la página
+    _alto_disp_prov = Y_LIMIT - pdf.get_y()
+    row_h_prov = min(7.0, _alto_disp_prov / (len(left_items_prov) + 1))
+
+    pdf.set_font(FUENTE, "B", 7)
+    y_header_prov = pdf.get_y()
+    for _x_tabla in (x_left_prov, x_right_prov):
+        pdf.set_xy(_x_tabla, y_header_prov)
+        pdf.cell(col_widths_prov[0], row_h_prov, "PROVINCIAS", border=1, align="C")
+        pdf.cell(col_widths_prov[1], row_h_prov, "CAPITALES", border=1, align="C")
+        pdf.cell(col_widths_prov[2], row_h_prov, _enc("Pág."), border=1, align="C")
+    pdf.set_y(y_header_prov + row_h_prov)
+
+    enlaces = []
+    for i in range(len(left_items_prov)):
+        left_p = left_items_prov[i]
+        right_p = right_items_prov[i] if i < len(right_items_prov) else {"provincia": "", "capital": "", "pagina": None}
+        prov_l = left_p["provincia"]
+        prov_r = right_p["provincia"]
+        if not prov_l and not prov_r:
+            continue
+        y_p = pdf.get_y()
+        capital_l = left_p["capital"]
+        page_l = str(left_p["pagina"]) if left_p["pagina"] is not None else "..."
+
+        # FILA IZQUIERDA
+        pdf.set_xy(x_left_prov, y_p)
+        cell_ajustada(pdf, col_widths_prov[0], row_h_prov, prov_l, "L")
+        cell_ajustada(pdf, col_widths_prov[1], row_h_prov, capital_l, "L")
+        cell_ajustada(pdf, col_widths_prov[2], row_h_prov, page_l, "C")
+
+        capital_r = right_p["capital"]
+        page_r = str(right_p["pagina"]) if right_p["pagina"] is not None else "..."
+
+        # FILA DERECHA
+        pdf.set_xy(x_right_prov, y_p)
+        cell_ajustada(pdf, col_widths_prov[0], row_h_prov, prov_r, "L")
+        cell_ajustada(pdf, col_widths_prov[1], row_h_prov, capital_r, "L")
+        cell_ajustada(pdf, col_widths_prov[2], row_h_prov, page_r, "C")
+
+        for _x_tabla, _item in ((x_left_prov, left_p), (x_right_prov, right_p)):
+            if _item["pagina"] is not None:
+                enlaces.append((_x_tabla, y_p, table_width_prov, row_h_prov, _item["pagina"]))
+        pdf.set_y(y_p + row_h_prov)
+    pdf.enlaces_en_bloque(enlaces)
+
+
+def construir_libro(filas, prov_pages, ruta_pdf=PDF_FILE, ruta_web=None, progreso=None,
+                    destinos=()):
+    """PASADA 2: genera el PDF completo en orden correcto.
+
+    `prov_pages` son las páginas de inicio de cada provincia calculadas en la
+    pasada 1 (`paginar_provincias`). Devuelve un dict con los mapas de
+    páginas del render final (`prov_pages`, `hotel_pages`, `loc_pages`,
+    `poblacion_pages`, `paginas_fila`), las páginas de cada índice
+    alfabético (`indices`, ver `prever_indices`), el total de `paginas`, los
+    `segundos_render` y las `salidas` de cada perfil (ver `guardar_pdf`).
+    `progreso` (ver progreso.py) recibe los eventos de cada etapa y puede
+    cancelar la compilación entre provincias. Los `destinos` de texto se
+    escriben en la misma pasada que el render (ver `render_catalogo`).
+    """
+    progreso = progreso or Progreso()
+    inicio = time.perf_counter()
+    indice_provincias = construir_indice_provincias(filas, prov_pages)
+    pdf = _abrir_libro()
+
+    # --- PÁGINA DE ÍNDICE 1: PROVINCIAS Y SUS CAPITALES ---
+    pdf.provincia_actual = None
+    pdf.add_page()
+    pdf.marcador(MARCADOR_PROVINCIAS)
+    dibujar_indice_provincias(pdf, indice_provincias)
+
+    # --- PORTADA AZUL DEL CATÁLOGO (antes de las provincias) ---
+    pdf.provincia_actual = None
+    pdf.add_page()
+    dibujar_portada_seccion(
+        pdf,
+        PORTADA_CATALOGO_ES,
+        PORTADA_CATALOGO_EN,
+        pdf.page_no(),
+    )
+
+    # --- GENERAR CATÁLOGO (pasada 2, render final; páginas idénticas a la pasada 1) ---
+    paginas_fila = {}
+    progreso.inicio("render", len(filas))
+    prov_pages_final, hotel_pages, loc_pages = render_catalogo(
+        pdf, filas, paginas_fila=paginas_fila, progreso=progreso, destinos=destinos
+    )
+    progreso.fin("render", paginas=pdf.page_no())
+
+    return _cerrar_libro(
+        pdf, filas, prov_pages_final, hotel_pages, loc_pages, paginas_fila,
+        inicio, ruta_pdf, ruta_web, progreso,
+    )
+
+
+def _cerrar_libro(pdf, filas, prov_pages, hotel_pages, loc_pages, paginas_fila,
+                  inicio, ruta_pdf, ruta_web, progreso):
+    """Índices alfabéticos tras el catálogo ya dibujado, y salida del PDF.
+    Devuelve el dict de resultados de `construir_libro`."""
+    # --- ÍNDICES ALFABÉTICOS (hoteles, poblaciones...) ---
+    # Con las páginas REALES capturadas durante el render del catálogo.
+    indices = {
+        indice.etapa: render_indice_alfabetico(
+            pdf, indice, entradas(filas, hotel_pages, loc_pages), progreso
+        )
+        for indice, entradas in INDICES
+    }
+
+    segundos_render = time.perf_counter() - inicio
+    progreso.inicio("salida")
+    salidas = guardar_pdf(pdf, ruta_pdf, ruta_web)
+    progreso.fin("salida", **{perfil: d["bytes"] for perfil, d in salidas.items()})
+    return {
+        "prov_pages": prov_pages,
+        "hotel_pages": hotel_pages,
+        "loc_pages": loc_pages,
+        "poblacion_pages": paginas_poblacion(loc_pages),
+        "paginas_fila": paginas_fila,
+        "indices": indices,
+        "paginas": pdf.page_no(),
+        "segundos_render": segundos_render,
+        "salidas": salidas,
+    }
+
+
+# --- COMPILACIÓN EN CADENA ---
+# Con el Excel ya ordenado por provincias (exportaciones SQL, volcados
+# preordenados), cada provincia se puede dibujar en cuanto llegan sus filas:
+# un proceso lector lee y prepara el Excel provincia a provincia mientras el
+# principal dibuja las anteriores. El índice de provincias, que va delante,
+# se deja reservado y se dibuja al escribir el PDF, cuando ya se conocen sus
+# páginas, así que no hace falta la pasada 1.
+
+# Provincias preparadas que pueden esperar en la cola entre lector y render
+COLA_PROVINCIAS = 4
+# Segundos de espera en la cola entre comprobaciones de que el lector sigue vivo
+ESPERA_LECTOR = 1.0
+
+
+class RegistroDesordenado(ValueError):
+    """El Excel no viene ordenado por provincias en el orden del catálogo."""
+
+
+class LectorInterrumpido(RuntimeError):
+    """El proceso lector terminó sin llegar al final del Excel (matado por
+    falta de memoria, un error fuera de su `try`...)."""
+
+
+def _siguiente_tramo(cola, lector):
+    """Siguiente elemento que el `lector` pone en la `cola`, sin quedarse
+    esperando para siempre si el lector muere sin poner el final."""
+    while True:
+        try:
+            return cola.get(timeout=ESPERA_LECTOR)
+        except queue.Empty:
+            if lector.is_alive():
+                continue
+        # Lo que dejó antes de terminar ya está en la cola
+        try:
+            return cola.get(timeout=ESPERA_LECTOR)
+        except queue.Empty:
+            raise LectorInterrumpido(
+                f"El proceso lector terminó (código {lector.exitcode}) sin acabar el Excel"
+            ) from None
+
+
+def _valor_celda(valor):
+    """Valor de una celda igual que lo convierte `pd.read_excel` (openpyxl)
+    antes de pasarlo a su parser."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _preparar_tramo(cabecera, filas, inicio):
+    """Registro preparado de las `filas` (listas de valores) de un tramo,
+    con el mismo índice que tendrían en el Excel completo. Se compacta, si
+    toca, ya unido el registro completo."""
+    df = TextParser(filas, names=cabecera, header=None, dtype=object).read()
+    df.index = pd.RangeIndex(inicio, inicio + len(df))
+    return preparar_registro(df, compacto=False)
+
+
+def _leer_provincias(ruta, cola):
+    """Proceso lector: pone en `cola` el registro preparado de cada tramo de
+    filas consecutivas con la misma PROVINCIA en cuanto se completa, y al
+    final None. Si algo falla, pone la excepción."""
+    try:
+        libro = load_workbook(ruta, read_only=True, data_only=True)
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        cabecera = [_valor_celda(v) for v in next(filas)]
+        col_provincia = cabecera.index("PROVINCIA")
+        tramo = []
+        inicio = 0
+        vacias = []  # pd.read_excel descarta las filas vacías del final
+        for fila in filas:
+            valores = [_valor_celda(v) for v in fila[:len(cabecera)]]
+            valores += [""] * (len(cabecera) - len(valores))
+            if all(v == "" for v in valores):
+                vacias.append(valores)
+                continue
+            for valores_fila in vacias + [valores]:
+                if tramo and valores_fila[col_provincia] != tramo[-1][col_provincia]:
+                    cola.put(_preparar_tramo(cabecera, tramo, inicio))
+                    inicio += len(tramo)
+                    tramo = []
+                tramo.append(valores_fila)
+            vacias = []
+        if tramo:
+            cola.put(_preparar_tramo(cabecera, tramo, inicio))
+        libro.close()
+        cola.put(None)
+    except Exception as e:  # el proceso principal la vuelve a lanzar
+        cola.put(e)
+
+
+def construir_libro_en_cadena(ruta_excel=EXCEL_FILE, ruta_pdf=PDF_FILE, ruta_web=None,
+                              progreso=None, destinos=()):
+    """Lee, prepara y dibuja el libro provincia a provincia, solapando la
+    lectura del Excel con el dibujo. El PDF es el mismo que con
+    `cargar_registro` + `paginar_provincias` + `construir_libro`.
+
+    Devuelve (registro, libro): el registro completo (como `cargar_registro`)
+    y el dict de `construir_libro` con además `paginas_provincia` y
+    `segundos_primera_provincia`. Lanza `RegistroDesordenado` si una
+    provincia llega fuera del orden del catálogo (o partida en dos tramos);
+    entonces hay que compilar de la forma normal (con los `destinos` nuevos:
+    los que se pasaron ya han recibido hoteles). Lanza `LectorInterrumpido`
+    si el proceso lector muere sin llegar al final del Excel.
+    """
+    progreso = progreso or Progreso()
+    inicio = time.perf_counter()
+    cola = multiprocessing.Queue(maxsize=COLA_PROVINCIAS)
+    lector = multiprocessing.Process(
+        target=_leer_provincias, args=(ruta_excel, cola), daemon=True
+    )
+    lector.start()
+    registro = {}
+    try:
+        pdf = _abrir_libro()
+
+        # --- PÁGINA DE ÍNDICE 1: reservada, se dibuja al escribir el PDF ---
+        pdf.provincia_actual = None
+        pdf.add_page()
+        pdf.marcador(MARCADOR_PROVINCIAS)
+        def dibujar_reserva(pdf_, _esquema):
+            # Al escribir el PDF los márgenes son los de la última página
+            izq, der = margenes_pagina(pdf_.page_no())
+            pdf_.set_margins(izq, Y_TOP, der)
+            dibujar_indice_provincias(
+                pdf_, construir_indice_provincias(registro["filas"], prov_pages)
+            )
+
+        pdf.insert_toc_placeholder(dibujar_reserva)
+        # --- PORTADA AZUL DEL CATÁLOGO (la página que abre la reserva) ---
+        dibujar_portada_seccion(
+            pdf,
+            PORTADA_CATALOGO_ES,
+            PORTADA_CATALOGO_EN,
+            pdf.page_no(),
+        )
+
+        progreso.inicio("render")
+        tramos = []
+        prov_pages = {}
+        hotel_pages = {}
+        loc_pages = {}
+        paginas_fila = {}
+        paginas_provincia = {}
+        segundos_primera = None
+        clave_anterior = None
+        filas_hechas = 0
+        while True:
+            tramo = _siguiente_tramo(cola, lector)
+            if tramo is None:
+                break
+            if isinstance(tramo, Exception):
+                raise tramo
+            provincia = str(tramo["PROVINCIA"].iloc[0])
+            clave = normalizar_provincia(provincia)
+            if clave_anterior is not None and clave <= clave_anterior:
+                raise RegistroDesordenado(
+                    f"La provincia {provincia} llega fuera del orden del catálogo"
+                )
+            clave_anterior = clave
+            pagina_inicial = pdf.page_no()
+            prov_tramo, hoteles_tramo, localidades_tramo = render_catalogo(
+                pdf, tramo, paginas_fila=paginas_fila, destinos=destinos
+            )
+            for destino, origen in (
+                (prov_pages, prov_tramo),
+                (hotel_pages, hoteles_tramo),
+                (loc_pages, localidades_tramo),
+            ):
+                for clave_pagina, pagina in origen.items():
+                    destino.setdefault(clave_pagina, pagina)
+            paginas_provincia.setdefault(provincia, []).append(pdf.page_no() - pagina_inicial)
+            tramos.append(tramo)
+            filas_hechas += len(tramo)
+            if segundos_primera is None:
+                segundos_primera = time.perf_counter() - inicio
+            progreso.avance(
+                "render", filas_hechas,
+                provincia=provincia, n=len(tramos), paginas=pdf.page_no(),
+            )
+        progreso.fin("render", paginas=pdf.page_no())
+    finally:
+        if lector.is_alive():
+            lector.terminate()
+        lector.join()
+
+    if not tramos:
+        raise ValueError(f"{ruta_excel} no tiene hoteles")
+    filas = pd.concat(tramos)
+    anadir_rangos(filas)
+    if MODO_COMPACTO:
+        filas = compactar_registro(filas)
+    registro["filas"] = filas
+
+    libro = _cerrar_libro(
+        pdf, filas, prov_pages, hotel_pages, loc_pages, paginas_fila,
+        inicio, ruta_pdf, ruta_web, progreso,
+    )
+    libro["paginas_provincia"] = paginas_provincia
+    libro["segundos_primera_provincia"] = segundos_primera
+    return filas, libro
+
+
+def fecha_determinista():
+    """Fecha de creación de la salida reproducible."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+    return FECHA_DETERMINISTA
+
+
+def navegacion_web(doc, esquema, enlaces):
+    """Añade al documento pikepdf `doc` el esquema (provincia → localidad) y
+    los enlaces de los índices que el PDF anotó al dibujarse (ver
+    `PDF.marcador` y `PDF.enlaces_en_bloque`). Solo para el perfil web: en el
+    de imprenta no sirven y más que duplicarían su tamaño."""
+    paginas = doc.pages
+    with doc.open_outline() as esquema_doc:
+        for titulo, nivel, pagina, top in esquema:
+            entrada = pikepdf.OutlineItem(titulo, pagina - 1, "XYZ", left=0, top=top)
+            if nivel and esquema_doc.root:
+                esquema_doc.root[-1].children.append(entrada)
+            else:
+                esquema_doc.root.append(entrada)
+
+    por_pagina = {}
+    for origen, rect, destino in enlaces:
+        por_pagina.setdefault(origen, []).append((rect, destino))
+    alto = float(paginas[0].mediabox[3])
+    borde = pikepdf.Array([0, 0, 0])
+    destinos = {}  # página → /Dest a lo alto de ella, hecho una sola vez
+    for origen, lista in por_pagina.items():
+        pagina = paginas[origen - 1]
+        anotaciones = pikepdf.Array(pagina.obj.get("/Annots", []))
+        for rect, destino in lista:
+            dest = destinos.get(destino)
+            if dest is None:
+                dest = destinos[destino] = pikepdf.Array(
+                    [paginas[destino - 1].obj, pikepdf.Name.XYZ, 0, alto, None]
+                )
+            # Como objetos propios, y no dentro del diccionario de la página,
+            # se comprimen en los flujos de objetos (la linealización deja
+            # fuera las páginas)
+            anotaciones.append(doc.make_indirect(pikepdf.Dictionary(
+                Type=pikepdf.Name.Annot,
+                Subtype=pikepdf.Name.Link,
+                Rect=pikepdf.Array(rect),
+                Border=borde,
+                Dest=dest,
+            )))
+        pagina.obj.Annots = anotaciones
+
+
+def guardar_pdf(pdf, ruta_pdf, ruta_web=None):
+    """Escribe el perfil "imprenta" en `ruta_pdf` y, si se pide, el perfil
+    "web" en `ruta_web`. Devuelve perfil → {ruta, bytes, segundos}."""
+    salidas = {}
+    inicio = time.perf_counter()
+    if DETERMINISTA:
+        # fpdf2 calcula el /ID con el contenido, que ya no lleva la hora
+        pdf.set_creation_date(fecha_determinista())
+    datos = pdf.output()
+    with open(ruta_pdf, "wb") as f:
+        f.write(datos)
+    salidas["imprenta"] = {
+        "ruta": ruta_pdf,
+        "bytes": len(datos),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+    if ruta_web:
+        if pikepdf is None:
+            print(f"No se genera {ruta_web}: el perfil web necesita pikepdf")
+            return salidas
+        inicio = time.perf_counter()
+        pikepdf.settings.set_flate_compression_level(NIVEL_FLATE_WEB)
+        try:
+            with pikepdf.open(io.BytesIO(datos)) as doc:
+                navegacion_web(doc, pdf.esquema, pdf.enlaces)
+                doc.save(
+                    ruta_web,
+                    linearize=True,
+                    object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                    compress_streams=True,
+                    recompress_flate=True,
+                    deterministic_id=DETERMINISTA,
+                )
+        finally:
+            # Los demás guardados del proceso (otras ediciones, quien use
+            # este módulo) no heredan el nivel del perfil web
+            pikepdf.settings.set_flate_compression_level(NIVEL_FLATE_FABRICA)
+        salidas["web"] = {
+            "ruta": ruta_web,
+            "bytes": os.path.getsize(ruta_web),
+            "segundos": time.perf_counter() - inicio,
+        }
+    return salidas
+
+
+# Módulos del proyecto cuyo código, junto con este, entra en la clave de caché
+MODULOS_COMPILACION = (
+    "cache_compilacion", "delta_registro", "duplicados", "exportacion", "imagenes",
+    "indice_consulta", "normalizacion",
 )
 
-# --- INICIAR ÍNDICE ALFABÉTICO DE POBLACIONES ---
-pdf.provincia_actual = None
-pdf.add_page()
 
-# Títulos del índice de poblaciones
-y_start_pob_inicial = cabecera_indice(pdf, TITULO_POB_ES, TITULO_POB_EN)
+def huella_compilacion():
+    """Clave de `cache_compilacion` para compilar ahora: el Excel, las
+    imágenes y fuentes que se van a usar, el código y la configuración."""
+    ficheros = [EXCEL_FILE, os.path.abspath(__file__)]
+    ficheros += [sys.modules[m].__file__ for m in MODULOS_COMPILACION]
+    if SHOW_PORTADA:
+        ficheros.append("portada.jpg")
+    if SHOW_SEGUNDA_PAGINA:
+        ficheros.append("Segunda-pagina.jpg")
+    if FUENTES_TTF:
+        ficheros += [FUENTES_TTF[estilo] for estilo in sorted(FUENTES_TTF)]
+    configuracion = (
+        huella_maquetacion(),
+        sorted((nombre, repr(globals()[nombre])) for nombre in CONSTANTES_EDITABLES),
+        DETERMINISTA and fecha_determinista().isoformat(),
+        FPDF_VERSION, pd.__version__, pikepdf and pikepdf.__version__,
+    )
+    return cache_compilacion.huella_entradas(ficheros, configuracion)
 
-# Poblaciones → página REAL (capturada durante el render del catálogo).
-# loc_pages usa la localidad tal cual aparece; normalizamos la clave para
-# fusionar variantes por espacios/mayúsculas y quedarnos con la 1ª página.
-poblacion_pages = {}
-for _loc, _pg in loc_pages.items():
-    _clave = str(_loc).strip()
-    if _clave and _clave not in poblacion_pages:
-        poblacion_pages[_clave] = _pg
 
-# Lista de poblaciones ordenada alfabéticamente (sin tildes)
-poblaciones_lista = sorted(poblacion_pages.keys(), key=lambda x: normalizar_ciudad(x))
+def salidas_compilacion():
+    """Ficheros que deja una compilación, por su nombre en la caché. El
+    informe de cambios no se guarda: depende de la compilación anterior."""
+    rutas = [PDF_FILE, INDICE_FILE, DUPLICADOS_FILE, SNAPSHOT_FILE]
+    if PDF_WEB_FILE and pikepdf is not None:
+        rutas.append(PDF_WEB_FILE)
+    rutas += [ruta for ruta in (JSONL_FILE, CSV_PAGINAS_FILE, CARPETA_HTML) if ruta]
+    return {os.path.basename(ruta): ruta for ruta in rutas}
 
-# Configuración: columnas verticales (igual que el índice de hoteles)
-COLS_POB = COLS_INDICE
-col_width_pob = (CONTENT_WIDTH - (COLS_POB - 1) * SEP_INDICE) / COLS_POB
-row_height_pob = ROW_H_INDICE
-y_start_pob = y_start_pob_inicial
-y_limit_pob = Y_LIMIT_INDICE
 
-# ---- IMPRIMIR ÍNDICE DE POBLACIONES EN COLUMNAS VERTICALES ----
-pdf.set_font("Helvetica", "", FONT_INDICE)
-pdf.set_text_color(0, 0, 0)
-pdf.set_y(y_start_pob)
+def compilacion_en_cache(clave, instantanea_anterior):
+    """Sirve la compilación `clave` desde la caché si está: copia sus salidas
+    y rehace el informe de cambios comparando `instantanea_anterior` con la
+    instantánea guardada. Devuelve False si no hay entrada."""
+    inicio = time.perf_counter()
+    if not cache_compilacion.restaurar(clave, salidas_compilacion()):
+        return False
+    instantanea = cargar_instantanea(SNAPSHOT_FILE)
+    delta = calcular_delta(instantanea_anterior, instantanea["hoteles"])
+    escribir_informe(
+        INFORME_CAMBIOS_FILE,
+        delta,
+        instantanea_anterior,
+        instantanea["hoteles"],
+        diferencias_indice(instantanea_anterior and instantanea_anterior.get("indice_hoteles"),
+                           instantanea["indice_hoteles"]),
+        diferencias_indice(instantanea_anterior and instantanea_anterior.get("indice_poblaciones"),
+                           instantanea["indice_poblaciones"]),
+    )
+    print(
+        f"Entradas sin cambios: {PDF_FILE} y demás salidas copiadas de la caché "
+        f"en {(time.perf_counter() - inicio) * 1000:.0f} ms"
+    )
+    imprimir_cambios(delta)
+    return True
+
+
+def abrir_destinos():
+    """Destinos de texto de la compilación (ver exportacion.py)."""
+    return [
+        clase(ruta)
+        for ruta, clase in (
+            (JSONL_FILE, DestinoJSONL),
+            (CSV_PAGINAS_FILE, DestinoCSV),
+            (CARPETA_HTML, DestinoHTML),
+        )
+        if ruta
+    ]
 
-x_cols_pob = columnas_indice(pdf.page_no(), COLS_POB, col_width_pob)
-y_cols_pob = [y_start_pob] * COLS_POB
 
-pob_idx = 0
-current_col_pob = 0
+def descartar_destinos(destinos):
+    for destino in destinos:
+        destino.descartar()
 
-while pob_idx < len(poblaciones_lista):
 
-    if y_cols_pob[current_col_pob] + row_height_pob > y_limit_pob and pob_idx < len(
-        poblaciones_lista
-    ):
-        current_col_pob += 1
+def imprimir_cambios(delta):
+    print(
+        f"Cambios: +{len(delta['añadidos'])} -{len(delta['eliminados'])} "
+        f"~{len(delta['modificados'])} en {len(delta['provincias'])} provincias "
+        f"(informe en {INFORME_CAMBIOS_FILE})"
+    )
 
-        if current_col_pob >= COLS_POB:
-            pdf.add_page()
-            y_nueva_pob = cabecera_indice(pdf, TITULO_POB_ES, TITULO_POB_EN)
-            pdf.set_font("Helvetica", "", FONT_INDICE)
 
-            current_col_pob = 0
-            x_cols_pob = columnas_indice(pdf.page_no(), COLS_POB, col_width_pob)
-            y_cols_pob = [y_nueva_pob] * COLS_POB
+def main():
+    global DETERMINISTA, USAR_CACHE
+    parser = argparse.ArgumentParser(description="Genera el catálogo de hoteles en PDF.")
+    parser.add_argument(
+        "--progreso", metavar="RUTA",
+        help="escribe los eventos de progreso en JSON-lines ('-' = stderr)",
+    )
+    parser.add_argument(
+        "--en-cadena", action="store_true",
+        help="lee y dibuja a la vez, provincia a provincia (Excel ordenado por provincias)",
+    )
+    parser.add_argument(
+        "--determinista", action="store_true",
+        help="PDF reproducible byte a byte (fecha fija, ver SOURCE_DATE_EPOCH)",
+    )
+    parser.add_argument(
+        "--sin-cache", action="store_true",
+        help="compila aunque la caché tenga el resultado (y no lo guarda)",
+    )
+    args = parser.parse_args()
+    DETERMINISTA = DETERMINISTA or args.determinista
+    USAR_CACHE = USAR_CACHE and not args.sin_cache
+    destino = None
+    fichero_progreso = None
+    if args.progreso == "-":
+        destino = salida_jsonl(sys.stderr)
+    elif args.progreso:
+        fichero_progreso = open(args.progreso, "w", encoding="utf-8")
+        destino = salida_jsonl(fichero_progreso)
+    try:
+        compilar(Progreso(destino), en_cadena=args.en_cadena)
+    finally:
+        if fichero_progreso is not None:
+            fichero_progreso.close()
+
+
+def compilar(progreso=None, en_cadena=False):
+    """Compilación completa del catálogo (lo que hace `python excel.py`).
+    Con `en_cadena` el libro se construye con `construir_libro_en_cadena`
+    (o de la forma normal si el Excel no viene ordenado por provincias).
+    Con USAR_CACHE, si ninguna entrada ha cambiado desde una compilación
+    guardada en la caché se copian sus salidas en vez de maquetar."""
+    progreso = progreso or Progreso()
+    instantanea_anterior = cargar_instantanea(SNAPSHOT_FILE)
+    clave_cache = None
+    if USAR_CACHE:
+        progreso.inicio("cache")
+        clave_cache = huella_compilacion()
+        acierto = compilacion_en_cache(clave_cache, instantanea_anterior)
+        progreso.fin("cache", acierto=acierto)
+        if acierto:
+            return
+
+    df = libro = None
+    destinos = []
+    if en_cadena:
+        destinos = abrir_destinos()
+        try:
+            df, libro = construir_libro_en_cadena(
+                EXCEL_FILE, PDF_FILE, PDF_WEB_FILE, progreso, destinos
+            )
+        except RegistroDesordenado as e:
+            print(f"{e}: se compila sin cadena")
+            descartar_destinos(destinos)
+        except BaseException:
+            descartar_destinos(destinos)
+            raise
+    if df is None:
+        progreso.inicio("carga")
+        df = cargar_registro(EXCEL_FILE)
+        progreso.fin("carga", hoteles=len(df))
+
+    # Cambios respecto a la compilación anterior (añadidos/eliminados/modificados)
+    huellas_actuales = huellas_registro(df)
+    delta = calcular_delta(instantanea_anterior, huellas_actuales)
+
+    # Propuestas de fusión de duplicados para revisar. Se escriben con las
+    # demás salidas, cuando el libro ya está hecho: una compilación cancelada
+    # no deja ningún fichero cambiado
+    progreso.inicio("duplicados")
+    sugerencias_duplicados = sugerencias_fusion(df)
+    progreso.fin("duplicados", grupos=len(sugerencias_duplicados))
+
+    maquetacion_actual = huella_maquetacion()
+    if libro is None:
+        # ---- PASADA 1: paginación por provincias ----
+        # Solo se vuelven a medir las provincias con cambios respecto a la última
+        # compilación; el resto reutiliza las páginas guardadas en la instantánea.
+        paginas_previas = {}
+        if instantanea_anterior and instantanea_anterior.get("maquetacion") == maquetacion_actual:
+            paginas_previas = instantanea_anterior.get("provincias", {})
+        cambiadas = set(delta["provincias"])
+        while True:
+            prov_pages_real, paginas_provincia = paginar_provincias(
+                df, {}, paginas_previas, cambiadas, progreso
+            )
+
+            # Índices alfabéticos y total de páginas, previstos antes de dibujar
+            prevision = prever_indices(
+                df, paginas_fijas_antes() + sum(map(sum, paginas_provincia.values()))
+            )
+            secciones = ", ".join(
+                f"{indice.marcador.lower()} {prevision[indice.etapa]['primera']}-"
+                f"{prevision[indice.etapa]['ultima']}"
+                for indice, _entradas in INDICES
+            )
+            print(f"Libro previsto: {prevision['paginas']} páginas ({secciones})")
+
+            # ---- PASADA 2: generar el PDF completo en orden correcto ----
+            destinos = abrir_destinos()
+            try:
+                libro = construir_libro(df, prov_pages_real, PDF_FILE, PDF_WEB_FILE, progreso, destinos)
+            except BaseException:
+                descartar_destinos(destinos)
+                raise
+
+            # La huella de maquetación no cubre los cambios de código: las
+            # páginas reutilizadas de la instantánea se comprueban con las
+            # dibujadas y, si alguna no coincide, el índice de provincias
+            # está mal y se vuelven a paginar esas provincias.
+            dibujadas = paginas_tramos_dibujados(df, libro["paginas_fila"])
+            erroneas = {p for p, n in dibujadas.items() if n != paginas_provincia[p]}
+            reutilizadas = (erroneas & set(paginas_previas)) - cambiadas
+            if not reutilizadas:
+                break
+            print(
+                f"Aviso: las páginas guardadas de {len(reutilizadas)} provincias no "
+                f"coinciden con el libro ({', '.join(sorted(reutilizadas))}): se vuelven a paginar"
+            )
+            descartar_destinos(destinos)
+            cambiadas |= reutilizadas
+        if erroneas:
+            print(f"Aviso: la paginación simulada de {', '.join(sorted(erroneas))} "
+                  f"no coincide con el libro dibujado")
+        paginas_provincia = dibujadas
+        for etapa, paginas in libro["indices"].items():
+            previstas = prevision[etapa]
+            if (previstas["primera"], previstas["ultima"]) != (paginas["primera"], paginas["ultima"]):
+                print(f"Aviso: {etapa} ocupa {paginas['primera']}-{paginas['ultima']} "
+                      f"(previsto {previstas['primera']}-{previstas['ultima']})")
+    else:
+        paginas_provincia = libro["paginas_provincia"]
+        print(f"Compilación en cadena: primera provincia lista en "
+              f"{libro['segundos_primera_provincia']:.1f} s")
+    print("PDF generado con índice alfabético de 5 columnas verticales:", PDF_FILE)
+    print(f"  Render: {libro['segundos_render']:.1f} s")
+    for perfil, salida in libro["salidas"].items():
+        print(
+            f"  Perfil {perfil}: {salida['ruta']} "
+            f"({salida['bytes'] / 1e6:.2f} MB, {salida['segundos']:.1f} s)"
+        )
+    for destino in destinos:
+        destino.cerrar()
+        print(f"  Exportado: {destino.ruta}")
+    escribir_sugerencias(DUPLICADOS_FILE, df, sugerencias_duplicados)
+    print(
+        f"Posibles duplicados: {len(sugerencias_duplicados)} grupos "
+        f"(propuestas en {DUPLICADOS_FILE})"
+    )
 
-    poblacion = poblaciones_lista[pob_idx]
-    pagina_pob = poblacion_pages[poblacion]
-    linea_pob = format_index_entry(pdf, poblacion, pagina_pob, col_width_pob - 2)
+    # --- ÍNDICE BINARIO DE CONSULTA (mostrador de reservas / web) ---
+    paginas_fila = libro["paginas_fila"]
+    escribir_indice(
+        INDICE_FILE,
+        (
+            (limpiar_nombre_hotel(nombre), paginas_fila[idx], str(prov), str(loc).strip(), idx)
+            for idx, nombre, prov, loc in zip(
+                df.index, df["NOMBRE DE EMPRESA"], df["PROVINCIA"], df["LOCALIDAD"]
+            )
+        ),
+    )
 
-    pdf.set_xy(x_cols_pob[current_col_pob], y_cols_pob[current_col_pob])
-    pdf.cell(col_width_pob, row_height_pob, linea_pob, border=0, align="L")
+    # --- INFORME DE CAMBIOS E INSTANTÁNEA PARA LA PRÓXIMA COMPILACIÓN ---
+    escribir_informe(
+        INFORME_CAMBIOS_FILE,
+        delta,
+        instantanea_anterior,
+        huellas_actuales,
+        diferencias_indice(instantanea_anterior and instantanea_anterior.get("indice_hoteles"), libro["hotel_pages"]),
+        diferencias_indice(instantanea_anterior and instantanea_anterior.get("indice_poblaciones"), libro["poblacion_pages"]),
+    )
+    guardar_instantanea(
+        SNAPSHOT_FILE,
+        huellas_actuales,
+        paginas_provincia,
+        maquetacion_actual,
+        libro["hotel_pages"],
+        libro["poblacion_pages"],
+    )
+    imprimir_cambios(delta)
+    if clave_cache:
+        cache_compilacion.guardar(clave_cache, salidas_compilacion())
 
-    y_cols_pob[current_col_pob] += row_height_pob
-    pob_idx += 1
 
-pdf.output(PDF_FILE)
-print("PDF generado con índice alfabético de 5 columnas verticales:", PDF_FILE)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Salidas de texto del catálogo, escritas en la misma pasada que el PDF.
+
+`render_catalogo` entrega a cada destino, en orden de catálogo, cada hotel
+con las líneas que imprime (`construir_lineas_hotel`) y la página real en que
+queda. Los destinos escriben según llegan, sin guardar el registro:
+
+- `DestinoJSONL`: una línea JSON por hotel (feed para socios);
+- `DestinoCSV`: una fila por hotel con sus páginas, separada por ';';
+- `DestinoHTML`: web estática con un fichero por provincia, paginado como el
+  libro (una sección con ancla `#p<página>` por página), e `index.html`.
+
+Cada destino escribe en un temporal y solo lo pone en su sitio en
+`cerrar()`; `descartar()` lo borra (compilación cancelada o con error), así
+que nunca queda una salida a medias. La interfaz completa está en `Destino`.
+"""
+
+import csv
+import html
+import json
+import os
+import re
+import shutil
+from abc import ABC, abstractmethod
+
+from normalizacion import normalizar_ciudad
+
+# Campo de salida → clave de `construir_lineas_hotel`, en orden de impresión
+CAMPOS = (
+    ("categoria", "cat"),
+    ("nombre", "nombre"),
+    ("registro", "reg"),
+    ("direccion", "dir"),
+    ("poblacion", "loc"),
+    ("telefono", "tel"),
+    ("web", "web"),
+)
+
+
+class Destino(ABC):
+    """Interfaz de los destinos de texto.
+
+    `ruta` es la salida final, un fichero o una carpeta según el destino;
+    mientras se compila todo se escribe en `tmp` (`ruta` + ".tmp"), que se
+    crea al construir el destino. `render_catalogo` llama a `hotel` con cada
+    hotel en orden de catálogo y después la compilación llama exactamente a
+    uno de estos dos:
+
+    - `cerrar()`: termina el temporal, libera lo abierto y lo pone en `ruta`
+      de una vez, sustituyendo lo que hubiera;
+    - `descartar()`: libera lo abierto y borra el temporal sin tocar `ruta`
+      (compilación cancelada o con error).
+
+    La base sigue la página en que empieza cada localidad
+    (`pagina_localidad`), que `escribir` puede usar.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.tmp = ruta + ".tmp"
+        self.pagina_localidad = None
+        self._localidad = None
+
+    def hotel(self, fila, provincia, localidad, lineas, pagina):
+        if (provincia, localidad) != self._localidad:
+            self._localidad = (provincia, localidad)
+            self.pagina_localidad = pagina
+        self.escribir(fila, provincia, localidad, lineas, pagina)
+
+    @abstractmethod
+    def escribir(self, fila, provincia, localidad, lineas, pagina):
+        """Escribe en el temporal un hotel: su `fila` del registro, las
+        `lineas` de `construir_lineas_hotel` y la `pagina` en que queda."""
+
+    @abstractmethod
+    def cerrar(self):
+        """Publica el temporal en `ruta`."""
+
+    @abstractmethod
+    def descartar(self):
+        """Borra el temporal."""
+
+
+class DestinoFichero(Destino):
+    """Destino de un solo fichero de texto, abierto en `_f` con las opciones
+    de `open` que se pasen."""
+
+    def __init__(self, ruta, **abrir):
+        super().__init__(ruta)
+        self._f = open(self.tmp, "w", **abrir)
+
+    def cerrar(self):
+        self._f.close()
+        os.replace(self.tmp, self.ruta)
+
+    def descartar(self):
+        self._f.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+class DestinoJSONL(DestinoFichero):
+    def __init__(self, ruta):
+        super().__init__(ruta, encoding="utf-8")
+
+    def escribir(self, fila, provincia, localidad, lineas, pagina):
+        registro = {
+            "fila": int(fila),
+            "provincia": provincia,
+            "localidad": localidad,
+            "pagina": pagina,
+            "pagina_localidad": self.pagina_localidad,
+        }
+        for campo, clave in CAMPOS:
+            registro[campo] = lineas[clave]
+        self._f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+class DestinoCSV(DestinoFichero):
+    def __init__(self, ruta):
+        super().__init__(ruta, encoding="utf-8-sig", newline="")
+        self._w = csv.writer(self._f, delimiter=";")
+        self._w.writerow(
+            ["FILA", "PROVINCIA", "LOCALIDAD", "PAGINA", "PAGINA LOCALIDAD"]
+            + [campo.upper() for campo, _clave in CAMPOS]
+        )
+
+    def escribir(self, fila, provincia, localidad, lineas, pagina):
+        self._w.writerow(
+            [int(fila), provincia, localidad, pagina, self.pagina_localidad]
+            + [lineas[clave] for _campo, clave in CAMPOS]
+        )
+
+
+ESTILO_HTML = (
+    "body{font-family:Helvetica,Arial,sans-serif;max-width:60em;margin:auto;padding:1em}"
+    "h1,h3{color:#4098c1}section{border-top:1px solid #ccc}"
+    "h2{font-size:.8em;color:#888}article{margin:.6em 0}"
+    "article p{margin:0}.nombre{font-weight:bold}.cat{font-size:.9em}"
+)
+
+
+def _pagina_html(titulo, cuerpo):
+    return (
+        f'<!DOCTYPE html>\n<html lang="es">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{html.escape(titulo)}</title>\n<style>{ESTILO_HTML}</style>\n"
+        f"</head>\n<body>\n{cuerpo}"
+    )
+
+
+def nombre_fichero_provincia(provincia):
+    """'Santa Cruz de Tenerife' → 'santa-cruz-de-tenerife.html'."""
+    return re.sub(r"[^a-z0-9]+", "-", normalizar_ciudad(provincia).lower()).strip("-") + ".html"
+
+
+class DestinoHTML(Destino):
+    """Web estática en la carpeta `ruta` (el temporal es también una
+    carpeta). Cada provincia se cierra al llegar la siguiente, que es cuando
+    se conoce el enlace "siguiente"."""
+
+    def __init__(self, ruta):
+        super().__init__(ruta)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self._f = None
+        self._provincia = None
+        self._pagina = None
+        self._localidad_escrita = None
+        self._provincias = []  # (provincia, fichero, primera página, nº hoteles)
+
+    def escribir(self, fila, provincia, localidad, lineas, pagina):
+        if provincia != self._provincia:
+            self._abrir_provincia(provincia, pagina)
+        if pagina != self._pagina:
+            if self._pagina is not None:
+                self._f.write("</section>\n")
+            self._f.write(f'<section id="p{pagina}">\n<h2>Página {pagina}</h2>\n')
+            self._pagina = pagina
+            self._localidad_escrita = None
+        if localidad != self._localidad_escrita:
+            # Como en el libro: la localidad que sigue de la página anterior
+            # repite su título con "(cont.)"
+            titulo = localidad.upper()
+            if self.pagina_localidad != pagina:
+                titulo += " (cont.)"
+            self._f.write(f"<h3>{html.escape(titulo)}</h3>\n")
+            self._localidad_escrita = localidad
+
+        partes = [f'<article id="h{int(fila)}">']
+        for campo, clave in CAMPOS:
+            if lineas[clave]:
+                partes.append(f'<p class="{campo}">{html.escape(lineas[clave])}</p>')
+        partes.append("</article>\n")
+        self._f.write("".join(partes))
+        prov, fichero, primera, n = self._provincias[-1]
+        self._provincias[-1] = (prov, fichero, primera, n + 1)
+
+    def _abrir_provincia(self, provincia, pagina):
+        fichero = nombre_fichero_provincia(provincia)
+        self._cerrar_provincia(siguiente=(provincia, fichero))
+        anterior = self._provincias[-1] if self._provincias else None
+        self._provincias.append((provincia, fichero, pagina, 0))
+        self._provincia = provincia
+        self._pagina = None
+        self._localidad_escrita = None
+        self._f = open(os.path.join(self.tmp, fichero), "w", encoding="utf-8")
+        nav = '<a href="index.html">Provincias</a>'
+        if anterior:
+            nav += f' · <a href="{anterior[1]}">← {html.escape(anterior[0])}</a>'
+        self._f.write(_pagina_html(
+            f"Provincia de {provincia}",
+            f"<nav>{nav}</nav>\n<h1>Provincia de {html.escape(provincia)}</h1>\n",
+        ))
+
+    def _cerrar_provincia(self, siguiente=None):
+        if self._f is None:
+            return
+        self._f.write("</section>\n<nav>" if self._pagina is not None else "<nav>")
+        if siguiente:
+            self._f.write(f'<a href="{siguiente[1]}">{html.escape(siguiente[0])} →</a>')
+        self._f.write("</nav>\n</body>\n</html>\n")
+        self._f.close()
+        self._f = None
+
+    def cerrar(self):
+        self._cerrar_provincia()
+        filas = "".join(
+            f'<li><a href="{fichero}">{html.escape(provincia)}</a> '
+            f"— página {primera}, {n} hoteles</li>\n"
+            for provincia, fichero, primera, n in self._provincias
+        )
+        with open(os.path.join(self.tmp, "index.html"), "w", encoding="utf-8") as f:
+            f.write(_pagina_html(
+                "Catálogo de hoteles",
+                f"<h1>Catálogo de hoteles</h1>\n<ul>\n{filas}</ul>\n</body>\n</html>\n",
+            ))
+        shutil.rmtree(self.ruta, ignore_errors=True)
+        os.replace(self.tmp, self.ruta)
+
+    def descartar(self):
+        if self._f is not None:
+            self._f.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
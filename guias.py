@@ -0,0 +1,131 @@
+"""Mini-guías a la carta: "hoteles 5* de Andalucía", "hoteles de playa en Almería"...
+
+Una `SesionCatalogo` carga y normaliza el registro una sola vez y va
+guardando las medidas de cada hotel que maqueta. Cada guía filtra ese
+registro ya ordenado (filtrar no cambia el orden del catálogo), pagina con
+las medidas guardadas sin dibujar nada y genera un único render: un PDF
+completo con su índice de provincias, portadas azules e índices alfabéticos.
+
+Uso desde la línea de órdenes:
+
+    python guias.py --comunidad Andalucia --estrellas 5 -o guia_andalucia_5.pdf
+    python guias.py --provincia Almería --modalidad playa -o guia_playa_almeria.pdf
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from excel import (
+    COMUNIDADES,
+    EXCEL_FILE,
+    cargar_registro,
+    construir_libro,
+    normalizar_ciudad,
+    normalizar_provincia,
+    paginar_provincias,
+)
+
+
+def _lista(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, (list, tuple, set)):
+        return list(valor)
+    return [valor]
+
+
+def _clave_provincia(nombre):
+    return normalizar_provincia(nombre).replace(" ", "").replace("-", "")
+
+
+def filtrar_registro(df, provincia=None, comunidad=None, estrellas=None,
+                     modalidad=None, localidad=None):
+    """Filas de `df` que cumplen TODOS los filtros dados.
+
+    Cada filtro admite un valor o una lista de valores (basta con que
+    coincida uno). Provincias, comunidades y localidades se comparan sin
+    tildes ni mayúsculas; `estrellas` compara con la columna ESTRELLAS y
+    `modalidad` busca el texto dentro de MODALIDAD ("playa" incluye
+    "Playa y golf").
+    """
+    mascara = pd.Series(True, index=df.index)
+
+    provincias = set()
+    for p in _lista(provincia) or []:
+        provincias.add(_clave_provincia(p))
+    for c in _lista(comunidad) or []:
+        clave = _clave_provincia(c)
+        if clave not in COMUNIDADES:
+            raise ValueError(f"Comunidad desconocida: {c}")
+        provincias |= COMUNIDADES[clave]
+    if provincias:
+        mascara &= df["PROVINCIA"].map(_clave_provincia).isin(provincias)
+
+    if estrellas is not None:
+        mascara &= df["ESTRELLAS"].isin([int(e) for e in _lista(estrellas)])
+
+    if modalidad is not None:
+        buscadas = [normalizar_ciudad(m) for m in _lista(modalidad)]
+        mod = df["MODALIDAD"].astype(object).fillna("").map(normalizar_ciudad)
+        mascara &= mod.map(lambda m: any(b in m for b in buscadas))
+
+    if localidad is not None:
+        buscadas = {normalizar_ciudad(l) for l in _lista(localidad)}
+        mascara &= df["LOCALIDAD"].map(normalizar_ciudad).isin(buscadas)
+
+    return df[mascara]
+
+
+class SesionCatalogo:
+    """Registro normalizado y medidas de maquetación listos para reutilizar
+    entre guías (p. ej. dentro de un servicio que atiende a comerciales)."""
+
+    def __init__(self, ruta=EXCEL_FILE, df=None):
+        self.df = cargar_registro(ruta) if df is None else df
+        self.medidas = {}
+
+    def guia(self, ruta_pdf, progreso=None, **filtros):
+        """Genera la guía filtrada en `ruta_pdf`. Devuelve el resultado de
+        `construir_libro` (mapas de páginas y nº total de páginas).
+
+        `progreso` es un `progreso.Progreso`: eventos de avance y, con su
+        `TokenCancelacion`, la posibilidad de abortar la guía entre provincias.
+        """
+        filas = filtrar_registro(self.df, **filtros)
+        if filas.empty:
+            raise ValueError("Ningún hotel cumple los filtros de la guía")
+        prov_pages, _paginas = paginar_provincias(filas, self.medidas, progreso=progreso)
+        return construir_libro(filas, prov_pages, ruta_pdf, progreso=progreso)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una mini-guía filtrada del catálogo.")
+    parser.add_argument("--provincia", action="append")
+    parser.add_argument("--comunidad", action="append")
+    parser.add_argument("--estrellas", action="append", type=int)
+    parser.add_argument("--modalidad", action="append")
+    parser.add_argument("--localidad", action="append")
+    parser.add_argument("--excel", default=EXCEL_FILE)
+    parser.add_argument("-o", "--salida", default="guia_hoteles.pdf")
+    args = parser.parse_args()
+
+    sesion = SesionCatalogo(args.excel)
+    inicio = time.perf_counter()
+    libro = sesion.guia(
+        args.salida,
+        provincia=args.provincia,
+        comunidad=args.comunidad,
+        estrellas=args.estrellas,
+        modalidad=args.modalidad,
+        localidad=args.localidad,
+    )
+    print(
+        f"Guía generada: {args.salida} ({len(libro['paginas_fila'])} hoteles, "
+        f"{libro['paginas']} páginas, {time.perf_counter() - inicio:.2f} s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
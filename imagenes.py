@@ -0,0 +1,64 @@
+"""Imágenes a página completa (portada, presentación) listas para incrustar.
+
+`pdf.image()` mete el fichero tal cual: un PNG de 1.7 MB o un JPEG con más
+resolución de la que se imprime inflan el PDF y cada compilación los vuelve a
+decodificar. Aquí cada imagen se reescala a `DPI_IMAGENES` para el tamaño de
+la página (sangrado incluido), se pasa a JPEG RGB y se guarda en
+`CARPETA_CACHE` con el hash del original en el nombre: en las compilaciones
+siguientes basta con leer el original para calcular el hash. fpdf2 incrusta
+los JPEG sin recomprimirlos.
+
+Nunca se amplía una imagen: si el original tiene menos resolución que la
+pedida, solo se recomprime.
+"""
+
+import hashlib
+import os
+
+from PIL import Image
+
+CARPETA_CACHE = ".cache_imagenes"
+DPI_IMAGENES = 300
+CALIDAD_JPEG = 85
+
+
+def _pixeles(mm, dpi):
+    return max(1, round(mm / 25.4 * dpi))
+
+
+def preparar_imagen(ruta, ancho_mm, alto_mm, dpi=DPI_IMAGENES, calidad=CALIDAD_JPEG,
+                    carpeta=CARPETA_CACHE):
+    """Ruta del JPEG reescalado de `ruta` para ocupar `ancho_mm` x `alto_mm`.
+
+    Lanza las mismas excepciones que abrir la imagen si `ruta` no existe o no
+    es una imagen válida.
+    """
+    with open(ruta, "rb") as f:
+        h = hashlib.blake2b(f.read(), digest_size=8)
+    ancho_px = _pixeles(ancho_mm, dpi)
+    alto_px = _pixeles(alto_mm, dpi)
+    h.update(f"{ancho_px}x{alto_px}q{calidad}".encode())
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    destino = os.path.join(carpeta, f"{base}-{h.hexdigest()}.jpg")
+    if os.path.exists(destino):
+        return destino
+
+    with Image.open(ruta) as img:
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            fondo = Image.new("RGB", img.size, (255, 255, 255))
+            fondo.paste(img, mask=img.getchannel("A"))
+            img = fondo
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        # Solo reducir: la página estira la imagen igual que antes
+        if img.width > ancho_px or img.height > alto_px:
+            img = img.resize(
+                (min(img.width, ancho_px), min(img.height, alto_px)),
+                Image.Resampling.LANCZOS,
+            )
+        os.makedirs(carpeta, exist_ok=True)
+        temporal = destino + ".tmp"
+        img.save(temporal, "JPEG", quality=calidad, optimize=True, dpi=(dpi, dpi))
+    os.replace(temporal, destino)
+    return destino
@@ -0,0 +1,243 @@
+"""Índice binario de consulta "¿en qué página está el hotel X / el pueblo Y?".
+
+La compilación escribe junto al PDF un fichero compacto con las claves
+normalizadas ordenadas, la página, la provincia y la fila del Excel de cada
+hotel, y las localidades con sus hoteles. El lector lo abre con `mmap` y
+responde búsquedas exactas y por prefijo con búsqueda binaria, sin cargar
+pandas ni el Excel.
+
+Formato (little-endian, registros de tamaño fijo):
+
+    cabecera   CABECERA
+    provincias n_prov × PROVINCIA    (referencia al texto)
+    localidad  n_loc  × LOCALIDAD    (ordenadas por clave normalizada)
+    hoteles    n_hot  × HOTEL        (ordenados por clave normalizada)
+    hot_loc    n_hot  × uint32       (índices de hotel agrupados por localidad)
+    textos     UTF-8 concatenado     (claves y nombres, sin repetir)
+"""
+
+import mmap
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from normalizacion import nombre_clave, normalizar_ciudad
+
+MAGIA = b"QHIX"
+VERSION_INDICE = 1
+
+# magia, versión, n_prov, n_loc, n_hot, off_prov, off_loc, off_hot, off_hot_loc, off_textos
+CABECERA = struct.Struct("<4sHxxIIIIIIII")
+PROVINCIA = struct.Struct("<IH")
+# clave (off, len), nombre (off, len), página, provincia, primer hotel, nº hoteles
+LOCALIDAD = struct.Struct("<IHIHHHII")
+# clave (off, len), nombre (off, len), página, provincia, localidad, fila del Excel
+HOTEL = struct.Struct("<IHIHHHII")
+HOT_LOC = struct.Struct("<I")
+
+Hotel = namedtuple("Hotel", "nombre pagina provincia localidad fila")
+Poblacion = namedtuple("Poblacion", "nombre pagina provincia hoteles")
+
+
+def escribir_indice(ruta, hoteles):
+    """Escribe el índice a partir de tuplas (nombre, página, provincia,
+    localidad, fila) en orden de catálogo. `fila` es la fila del hotel en el
+    Excel original (0 = primera fila de datos)."""
+    textos = bytearray()
+    posiciones = {}
+
+    def _texto(s):
+        b = s.encode("utf-8")
+        if b not in posiciones:
+            posiciones[b] = len(textos)
+            textos.extend(b)
+        return posiciones[b], len(b)
+
+    provincias = []
+    id_provincia = {}
+    localidades = {}  # (clave, provincia) → [nombre, página, [hoteles]]
+    registros = []
+    for nombre, pagina, provincia, localidad, fila in hoteles:
+        if provincia not in id_provincia:
+            id_provincia[provincia] = len(provincias)
+            provincias.append(provincia)
+        prov = id_provincia[provincia]
+        clave_loc = (normalizar_ciudad(localidad), prov)
+        loc = localidades.setdefault(clave_loc, [str(localidad).strip(), pagina, []])
+        loc[1] = min(loc[1], pagina)
+        loc[2].append(len(registros))
+        registros.append((nombre_clave(nombre), nombre, pagina, prov, clave_loc, fila))
+
+    # Orden final: por clave (bytes UTF-8, igual que compara el lector)
+    orden_loc = sorted(localidades, key=lambda c: (c[0].encode("utf-8"), c[1]))
+    id_loc = {c: i for i, c in enumerate(orden_loc)}
+    orden_hot = sorted(
+        range(len(registros)), key=lambda i: (registros[i][0].encode("utf-8"), i)
+    )
+    id_hot = {viejo: nuevo for nuevo, viejo in enumerate(orden_hot)}
+
+    bloque_prov = b"".join(PROVINCIA.pack(*_texto(p)) for p in provincias)
+
+    bloque_loc = bytearray()
+    bloque_hot_loc = bytearray()
+    n_hot_loc = 0
+    for c in orden_loc:
+        nombre_loc, pagina_loc, miembros = localidades[c]
+        bloque_loc += LOCALIDAD.pack(
+            *_texto(c[0]), *_texto(nombre_loc), pagina_loc, c[1], n_hot_loc, len(miembros)
+        )
+        for i in miembros:
+            bloque_hot_loc += HOT_LOC.pack(id_hot[i])
+        n_hot_loc += len(miembros)
+
+    bloque_hot = bytearray()
+    for i in orden_hot:
+        clave, nombre, pagina, prov, clave_loc, fila = registros[i]
+        bloque_hot += HOTEL.pack(
+            *_texto(clave), *_texto(nombre), pagina, prov, id_loc[clave_loc], fila
+        )
+
+    off_prov = CABECERA.size
+    off_loc = off_prov + len(bloque_prov)
+    off_hot = off_loc + len(bloque_loc)
+    off_hot_loc = off_hot + len(bloque_hot)
+    off_textos = off_hot_loc + len(bloque_hot_loc)
+    cabecera = CABECERA.pack(
+        MAGIA, VERSION_INDICE, len(provincias), len(orden_loc), len(orden_hot),
+        off_prov, off_loc, off_hot, off_hot_loc, off_textos,
+    )
+    tmp = ruta + ".tmp"
+    with open(tmp, "wb") as f:
+        for bloque in (cabecera, bloque_prov, bloque_loc, bloque_hot, bloque_hot_loc, textos):
+            f.write(bloque)
+    os.replace(tmp, ruta)
+
+
+class IndiceCatalogo:
+    """Lector del índice binario mapeado en memoria.
+
+    Las búsquedas ignoran tildes, mayúsculas y, en los hoteles, el "HOTEL"
+    inicial y el "S.L." final, igual que el catálogo impreso.
+    """
+
+    def __init__(self, ruta):
+        with open(ruta, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magia, version, self._n_prov, self._n_loc, self._n_hot, self._off_prov,
+         self._off_loc, self._off_hot, self._off_hot_loc, self._off_textos
+         ) = CABECERA.unpack_from(self._mm, 0)
+        if magia != MAGIA or version != VERSION_INDICE:
+            self._mm.close()
+            raise ValueError(f"{ruta} no es un índice de catálogo válido")
+        self._provincias = [
+            self._texto(*PROVINCIA.unpack_from(self._mm, self._off_prov + i * PROVINCIA.size))
+            for i in range(self._n_prov)
+        ]
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _texto(self, off, largo):
+        inicio = self._off_textos + off
+        return self._mm[inicio:inicio + largo].decode("utf-8")
+
+    def _clave(self, base, estructura, i):
+        off, largo = struct.unpack_from("<IH", self._mm, base + i * estructura.size)
+        inicio = self._off_textos + off
+        return self._mm[inicio:inicio + largo]
+
+    def _primero(self, base, estructura, n, clave):
+        """Primera posición cuya clave es >= `clave` (búsqueda binaria)."""
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._clave(base, estructura, mid) < clave:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _rango(self, base, estructura, n, clave, prefijo):
+        i = self._primero(base, estructura, n, clave)
+        while i < n:
+            k = self._clave(base, estructura, i)
+            if not (k.startswith(clave) if prefijo else k == clave):
+                break
+            yield i
+            i += 1
+
+    def _hotel(self, i):
+        _ko, _kl, off, largo, pagina, prov, loc, fila = HOTEL.unpack_from(
+            self._mm, self._off_hot + i * HOTEL.size
+        )
+        loc_off, loc_largo = struct.unpack_from(
+            "<IH", self._mm, self._off_loc + loc * LOCALIDAD.size + 6
+        )
+        return Hotel(
+            self._texto(off, largo), pagina, self._provincias[prov],
+            self._texto(loc_off, loc_largo), fila,
+        )
+
+    def _poblacion(self, i):
+        _ko, _kl, off, largo, pagina, prov, _primero, n = LOCALIDAD.unpack_from(
+            self._mm, self._off_loc + i * LOCALIDAD.size
+        )
+        return Poblacion(self._texto(off, largo), pagina, self._provincias[prov], n)
+
+    def hotel(self, nombre):
+        """Hoteles cuyo nombre coincide exactamente (puede haber varios)."""
+        clave = nombre_clave(nombre).encode("utf-8")
+        return [self._hotel(i) for i in self._rango(self._off_hot, HOTEL, self._n_hot, clave, False)]
+
+    def hoteles_con_prefijo(self, prefijo, limite=50):
+        clave = nombre_clave(prefijo).encode("utf-8")
+        res = []
+        for i in self._rango(self._off_hot, HOTEL, self._n_hot, clave, True):
+            if len(res) >= limite:
+                break
+            res.append(self._hotel(i))
+        return res
+
+    def poblacion(self, nombre):
+        """Localidades con ese nombre (una por provincia en que aparezca)."""
+        clave = normalizar_ciudad(nombre).encode("utf-8")
+        return [self._poblacion(i) for i in self._rango(self._off_loc, LOCALIDAD, self._n_loc, clave, False)]
+
+    def poblaciones_con_prefijo(self, prefijo, limite=50):
+        clave = normalizar_ciudad(prefijo).encode("utf-8")
+        res = []
+        for i in self._rango(self._off_loc, LOCALIDAD, self._n_loc, clave, True):
+            if len(res) >= limite:
+                break
+            res.append(self._poblacion(i))
+        return res
+
+    def hoteles_de_poblacion(self, nombre):
+        """Todos los hoteles de la localidad `nombre`, en orden de catálogo."""
+        clave = normalizar_ciudad(nombre).encode("utf-8")
+        res = []
+        for i in self._rango(self._off_loc, LOCALIDAD, self._n_loc, clave, False):
+            primero, n = struct.unpack_from(
+                "<II", self._mm, self._off_loc + i * LOCALIDAD.size + 16
+            )
+            for k in range(primero, primero + n):
+                (h,) = HOT_LOC.unpack_from(self._mm, self._off_hot_loc + k * HOT_LOC.size)
+                res.append(self._hotel(h))
+        return res
+
+
+if __name__ == "__main__":
+    # Uso: python indice_consulta.py catalogo_hoteles.idx "texto a buscar"
+    ruta, consulta = sys.argv[1], " ".join(sys.argv[2:])
+    with IndiceCatalogo(ruta) as indice:
+        for h in indice.hoteles_con_prefijo(consulta):
+            print(f"HOTEL     {h.nombre} ({h.localidad}, {h.provincia}) ... pág. {h.pagina}")
+        for p in indice.poblaciones_con_prefijo(consulta):
+            print(f"POBLACIÓN {p.nombre} ({p.provincia}, {p.hoteles} hoteles) ... pág. {p.pagina}")
@@ -0,0 +1,75 @@
+"""Informe de memoria del registro: modo normal frente a MODO_COMPACTO.
+
+Genera un registro sintético de N filas (por defecto 100 000) a partir de
+las del Excel real, con nombres y direcciones variados, y mide con
+tracemalloc la memoria retenida y los picos de leerlo y de prepararlo
+(`preparar_registro`) en cada modo.
+
+Uso:
+    python memoria.py            # 100 000 filas
+    python memoria.py -n 250000
+"""
+
+import argparse
+import gc
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from excel import COLUMNAS_REGISTRO, EXCEL_FILE, preparar_registro
+
+
+def registro_sintetico(n, ruta_excel=EXCEL_FILE, semilla=0):
+    """CSV (texto) con `n` filas con el formato del Excel original."""
+    base = pd.read_excel(ruta_excel)
+    rng = np.random.default_rng(semilla)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    sufijo = pd.Series(rng.integers(1, 1000, n)).astype(str)
+    df["ID"] = np.arange(1, n + 1)
+    df["NOMBRE DE EMPRESA"] = df["NOMBRE DE EMPRESA"].astype(str) + " " + sufijo
+    df["DIRECCION"] = df["DIRECCION"].astype(str) + ", " + sufijo
+    return df.to_csv(index=False)
+
+
+def medir(texto_csv, compacto):
+    """(MB retenidos, MB de pico al leer, MB de pico al preparar, segundos)
+    del registro. Leerlo de texto crea una cadena por celda, como
+    `pd.read_excel`; en modo compacto se leen solo COLUMNAS_REGISTRO, igual
+    que `cargar_registro`."""
+    usecols = (lambda c: c in COLUMNAS_REGISTRO) if compacto else None
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    df = pd.read_csv(io.StringIO(texto_csv), dtype={"TELEFONO1": object}, usecols=usecols)
+    _actual, pico_lectura = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    df = preparar_registro(df, compacto)
+    segundos = time.perf_counter() - inicio
+    gc.collect()
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del df
+    return actual / 1e6, pico_lectura / 1e6, pico / 1e6, segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la memoria del registro normal y compacto.")
+    parser.add_argument("-n", "--filas", type=int, default=100_000)
+    parser.add_argument("--excel", default=EXCEL_FILE)
+    args = parser.parse_args()
+
+    texto = registro_sintetico(args.filas, args.excel)
+    print(f"Registro sintético: {args.filas} filas")
+    for nombre, compacto in (("normal", False), ("compacto", True)):
+        retenida, pico_lectura, pico, segundos = medir(texto, compacto)
+        print(
+            f"  {nombre:<9} retenida {retenida:7.1f} MB  pico lectura {pico_lectura:7.1f} MB"
+            f"  pico preparación {pico:7.1f} MB  {segundos:5.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Normalización de los textos del registro.
+
+Las reglas con que se ordenan provincias y hoteles, se comparan localidades y
+se limpian los nombres están solo aquí: la maquetación (excel.py), las
+claves del delta entre compilaciones, la detección de duplicados, el índice
+de consulta y las exportaciones las importan de este módulo, así que un
+cambio en una regla llega a todos a la vez.
+"""
+
+import unicodedata
+
+# Valores de celda que cuentan como vacíos
+VACIOS = ("", "-", "nan", "NaN", "?", "None", "<NA>")
+
+
+def _sin_tildes(texto):
+    nfkd = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in nfkd if not unicodedata.combining(c))
+
+
+def normalizar_provincia(nombre):
+    """Normaliza provincia para ordenamiento alfabético sin tildes."""
+    if not isinstance(nombre, str):
+        nombre = str(nombre)
+    return _sin_tildes(nombre).upper()
+
+
+def normalizar_ciudad(nombre):
+    """Mayúsculas, sin tildes, con '/' y '-' como espacios y los espacios
+    colapsados: para comparar localidades, capitales y claves."""
+    if not isinstance(nombre, str):
+        nombre = str(nombre)
+    s = _sin_tildes(nombre).replace("/", " ").replace("-", " ")
+    return " ".join(s.split()).upper()
+
+
+def limpiar_nombre_hotel(nombre):
+    """Elimina la palabra 'HOTEL' al inicio y 'S.L.' al final si existen."""
+    nombre_clean = str(nombre).strip()
+    if nombre_clean.upper().startswith("HOTEL"):
+        nombre_clean = nombre_clean[5:].strip()
+    if nombre_clean.upper().endswith("S.L."):
+        nombre_clean = nombre_clean[:-4].strip()
+    elif nombre_clean.upper().endswith("S.L"):
+        nombre_clean = nombre_clean[:-3].strip()
+    return nombre_clean
+
+
+def nombre_clave(nombre):
+    """Nombre sin 'HOTEL' inicial ni 'S.L.' final, normalizado."""
+    return normalizar_ciudad(limpiar_nombre_hotel(nombre))
@@ -0,0 +1,91 @@
+"""Eventos de progreso y cancelación de compilaciones largas.
+
+Un `Progreso` recibe las llamadas de la compilación (inicio y fin de cada
+etapa, avance de provincias/páginas/entradas de índice) y las convierte en
+eventos dict con ritmo y tiempo restante estimado:
+
+    {"evento": "avance", "etapa": "render", "hecho": 5210, "total": 12404,
+     "por_segundo": 248.1, "eta_s": 29.0, "segundos": 21.0, "paginas": 250,
+     "provincia": "MADRID", "n": 31, "de": 52}
+
+Los eventos van a una función (`destino`) o, con `salida_jsonl`, a un
+fichero como una línea JSON cada uno. Con un `TokenCancelacion` otro hilo
+(p. ej. un servicio que atiende peticiones) puede abortar la compilación: la
+siguiente comprobación, como mucho al cambiar de provincia, lanza
+`CompilacionCancelada` antes de escribir ningún fichero de salida.
+"""
+
+import json
+import threading
+import time
+
+
+class CompilacionCancelada(Exception):
+    """La compilación se abortó con `TokenCancelacion.cancelar()`."""
+
+
+class TokenCancelacion:
+    def __init__(self):
+        self._evento = threading.Event()
+
+    def cancelar(self):
+        self._evento.set()
+
+    @property
+    def cancelado(self):
+        return self._evento.is_set()
+
+
+def salida_jsonl(fichero):
+    """Destino que escribe cada evento como una línea JSON en `fichero`."""
+    def escribir(evento):
+        fichero.write(json.dumps(evento, ensure_ascii=False) + "\n")
+        fichero.flush()
+    return escribir
+
+
+class Progreso:
+    """Emisor de eventos. Sin `destino` ni `cancelacion` no hace nada, así que
+    las funciones lo crean vacío cuando no se les pasa ninguno."""
+
+    def __init__(self, destino=None, cancelacion=None):
+        self.destino = destino
+        self.cancelacion = cancelacion
+        self._inicios = {}
+
+    def comprobar(self):
+        if self.cancelacion is not None and self.cancelacion.cancelado:
+            raise CompilacionCancelada("Compilación cancelada")
+
+    def _emitir(self, evento, etapa, **datos):
+        if self.destino is not None:
+            self.destino({"evento": evento, "etapa": etapa, **datos})
+
+    def inicio(self, etapa, total=None):
+        self.comprobar()
+        self._inicios[etapa] = time.perf_counter()
+        self._emitir("inicio", etapa, total=total)
+
+    def avance(self, etapa, hecho, total=None, **datos):
+        """`hecho` de `total` unidades de la etapa (filas, entradas...)."""
+        self.comprobar()
+        if self.destino is None:
+            return
+        segundos = time.perf_counter() - self._inicios.get(etapa, time.perf_counter())
+        por_segundo = hecho / segundos if segundos > 0 else None
+        eta = None
+        if total is not None and por_segundo:
+            eta = round((total - hecho) / por_segundo, 1)
+        self._emitir(
+            "avance", etapa,
+            hecho=hecho,
+            total=total,
+            por_segundo=por_segundo and round(por_segundo, 1),
+            eta_s=eta,
+            segundos=round(segundos, 2),
+            **datos,
+        )
+
+    def fin(self, etapa, **datos):
+        segundos = time.perf_counter() - self._inicios.pop(etapa, time.perf_counter())
+        self._emitir("fin", etapa, segundos=round(segundos, 2), **datos)
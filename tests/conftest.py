@@ -0,0 +1,46 @@
+"""Registro pequeño y carpeta de trabajo para las pruebas.
+
+El registro son las filas de unas pocas provincias de `excel1.xlsx` (con
+capital, varias localidades, modalidades y provincias de un solo hotel), así
+que cada compilación de prueba tarda segundos y no minutos.
+"""
+
+import os
+import shutil
+import sys
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import excel  # noqa: E402
+
+PROVINCIAS_PRUEBA = ["ALMERÍA", "CEUTA", "MELILLA", "SORIA"]
+
+
+@pytest.fixture(scope="session")
+def excel_pequeno(tmp_path_factory):
+    """Ruta de un Excel con las filas de PROVINCIAS_PRUEBA, en el orden
+    original (no ordenado por provincias)."""
+    df = pd.read_excel(os.path.join(RAIZ, excel.EXCEL_FILE))
+    df = df[df["PROVINCIA"].isin(PROVINCIAS_PRUEBA)]
+    ruta = tmp_path_factory.mktemp("registro") / "excel1.xlsx"
+    df.to_excel(ruta, index=False)
+    return str(ruta)
+
+
+@pytest.fixture(scope="session")
+def registro(excel_pequeno):
+    """El registro pequeño ya preparado por `cargar_registro`."""
+    return excel.cargar_registro(excel_pequeno)
+
+
+@pytest.fixture
+def carpeta(tmp_path, excel_pequeno, monkeypatch):
+    """Carpeta de trabajo con el registro pequeño como `excel1.xlsx`: las
+    salidas de `excel.compilar` (rutas relativas) quedan dentro."""
+    shutil.copy(excel_pequeno, tmp_path / excel.EXCEL_FILE)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+import cache_compilacion
+import excel
+
+
+def _escribir(ruta, texto):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto)
+
+
+def _leer(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_huella_entradas(tmp_path):
+    ruta = str(tmp_path / "datos.txt")
+    _escribir(ruta, "uno")
+    clave = cache_compilacion.huella_entradas([ruta], ("COLS", 3))
+    assert cache_compilacion.huella_entradas([ruta], ("COLS", 3)) == clave
+    assert cache_compilacion.huella_entradas([ruta], ("COLS", 2)) != clave
+    _escribir(ruta, "dos")
+    assert cache_compilacion.huella_entradas([ruta], ("COLS", 3)) != clave
+    os.remove(ruta)
+    assert cache_compilacion.huella_entradas([ruta], ("COLS", 3)) != clave
+
+
+def test_guardar_restaurar_y_podar(tmp_path):
+    carpeta = str(tmp_path / "cache")
+    salida = str(tmp_path / "salida.txt")
+    _escribir(salida, "libro 0")
+    assert not cache_compilacion.restaurar("a0", {"salida.txt": salida}, carpeta)
+
+    for n in range(3):
+        _escribir(salida, f"libro {n}")
+        cache_compilacion.guardar(f"a{n}", {"salida.txt": salida}, carpeta, max_entradas=2)
+        # Marcas de tiempo distintas aunque el sistema de ficheros sea basto
+        os.utime(os.path.join(carpeta, f"a{n}"), (n, n))
+    assert sorted(os.listdir(carpeta)) == ["a1", "a2"]
+
+    assert cache_compilacion.restaurar("a1", {"salida.txt": salida}, carpeta)
+    assert _leer(salida) == "libro 1"
+    assert not cache_compilacion.restaurar("a0", {"salida.txt": salida}, carpeta)
+    assert _leer(salida) == "libro 1"
+
+
+def test_compilar_sin_cambios_no_maqueta(carpeta, monkeypatch):
+    monkeypatch.setattr(excel, "DETERMINISTA", True)
+    excel.compilar()
+    with open(excel.PDF_FILE, "rb") as f:
+        pdf = f.read()
+    os.remove(excel.PDF_FILE)
+
+    def sin_maquetar(*_args, **_kwargs):
+        raise AssertionError("se ha maquetado con la compilación en caché")
+
+    monkeypatch.setattr(excel, "construir_libro", sin_maquetar)
+    excel.compilar()
+    with open(excel.PDF_FILE, "rb") as f:
+        assert f.read() == pdf
+
+    # Otra maquetación es otra clave: ya no vale la entrada guardada
+    monkeypatch.setattr(excel, "COLS", 2)
+    with pytest.raises(AssertionError):
+        excel.compilar()
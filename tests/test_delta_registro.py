@@ -0,0 +1,60 @@
+import gzip
+import json
+
+import pandas as pd
+
+import excel
+from delta_registro import (
+    calcular_delta,
+    cargar_instantanea,
+    guardar_instantanea,
+    huellas_registro,
+)
+
+
+def test_delta_ida_y_vuelta(tmp_path, registro):
+    """Una instantánea guardada y leída detecta exactamente los hoteles
+    añadidos, eliminados y modificados, y sus provincias."""
+    ruta = str(tmp_path / "estado.json.gz")
+    guardar_instantanea(ruta, huellas_registro(registro), {"CEUTA": [1]}, "m", {}, {})
+    anterior = cargar_instantanea(ruta)
+    assert anterior["provincias"] == {"CEUTA": [1]}
+    assert calcular_delta(anterior, huellas_registro(registro))["provincias"] == set()
+
+    nuevo = registro.copy()
+    ceuta = nuevo.index[nuevo["PROVINCIA"] == "CEUTA"]
+    soria = nuevo.index[nuevo["PROVINCIA"] == "SORIA"]
+    nuevo["TELEFONO1"] = nuevo["TELEFONO1"].astype(object)
+    nuevo.loc[ceuta[0], "TELEFONO1"] = "956 000 000"
+    nuevo = nuevo.drop(soria[0])
+    extra = registro.loc[[soria[1]]].copy()
+    extra["N. REGISTRO"] = "NUEVO-1"
+    nuevo = pd.concat([nuevo, extra])
+
+    delta = calcular_delta(anterior, huellas_registro(nuevo))
+    assert len(delta["modificados"]) == 1
+    assert len(delta["eliminados"]) == 1
+    assert delta["añadidos"] == {"R:NUEVO-1"}
+    assert delta["provincias"] == {"CEUTA", "SORIA"}
+
+
+def test_paginas_guardadas_erroneas_se_corrigen(carpeta, monkeypatch):
+    """Si la instantánea trae páginas de provincia que ya no son ciertas (con
+    la misma huella de maquetación), el libro sale igual que sin ella."""
+    monkeypatch.setattr(excel, "USAR_CACHE", False)
+    monkeypatch.setattr(excel, "DETERMINISTA", True)
+    excel.compilar()
+    with open(excel.PDF_FILE, "rb") as f:
+        correcto = f.read()
+
+    with gzip.open(excel.SNAPSHOT_FILE, "rt", encoding="utf-8") as f:
+        datos = json.load(f)
+    buenas = json.loads(json.dumps(datos["provincias"]))
+    datos["provincias"]["CEUTA"][0] += 3
+    with gzip.open(excel.SNAPSHOT_FILE, "wt", encoding="utf-8") as f:
+        json.dump(datos, f)
+
+    excel.compilar()
+    with open(excel.PDF_FILE, "rb") as f:
+        assert f.read() == correcto
+    assert cargar_instantanea(excel.SNAPSHOT_FILE)["provincias"] == buenas
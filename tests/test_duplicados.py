@@ -0,0 +1,43 @@
+import pandas as pd
+
+from duplicados import escribir_sugerencias, nombre_comparable, sugerencias_fusion
+
+
+def _registro(filas):
+    return pd.DataFrame(
+        filas, columns=["NOMBRE DE EMPRESA", "N. REGISTRO", "CP", "LOCALIDAD", "PROVINCIA"]
+    )
+
+
+def test_nombre_comparable():
+    assert nombre_comparable("Hotel Sol, S.L.") == "SOL"
+    assert nombre_comparable("HOTEL PLAYA-MAR S.A.") == "PLAYA MAR"
+
+
+def test_agrupa_solo_dentro_del_mismo_cp_y_localidad():
+    df = _registro([
+        ["HOTEL MIRAMAR PLAYA", "H-1", "04001", "Almería", "ALMERÍA"],
+        ["Miramar Playa S.L.", "", "04001", "ALMERIA", "ALMERÍA"],
+        ["HOTEL MIRAMAR PLAYAS", "", "04001", "Almería", "ALMERÍA"],
+        ["HOTEL MIRAMAR PLAYA", "H-9", "04720", "Aguadulce", "ALMERÍA"],  # otro CP
+        ["HOTEL LOS ÁLAMOS", "H-2", "04001", "Almería", "ALMERÍA"],
+    ])
+    sugerencias = sugerencias_fusion(df)
+    assert len(sugerencias) == 1
+    grupo = sugerencias[0]
+    assert [s["pos"] for s in grupo] == [0, 1, 2]
+    # Se conserva la fila con N. REGISTRO
+    assert [s["propuesta"] for s in grupo] == ["conservar", "fusionar", "fusionar"]
+    assert all(s["similitud"] >= 0.85 for s in grupo)
+
+
+def test_csv_de_sugerencias(tmp_path):
+    df = _registro([
+        ["HOTEL SOL", "H-1", "04001", "Almería", "ALMERÍA"],
+        ["SOL S.L.", "", "04001", "Almería", "ALMERÍA"],
+    ])
+    ruta = tmp_path / "duplicados.csv"
+    escribir_sugerencias(ruta, df, sugerencias_fusion(df))
+    lineas = ruta.read_text(encoding="utf-8-sig").splitlines()
+    assert lineas[0].startswith("GRUPO;PROPUESTA;SIMILITUD")
+    assert len(lineas) == 3
@@ -0,0 +1,76 @@
+import os
+
+import excel
+import ediciones
+from ediciones import compilar_ediciones
+
+
+def test_lote_de_ediciones(carpeta):
+    ediciones = [
+        {"nombre": "completa", "salida": "completa.pdf"},
+        {"nombre": "Andalucía", "salida": "andalucia.pdf", "filtros": {"comunidad": "Andalucia"}},
+        {
+            "nombre": "dos columnas",
+            "salida": "dos_columnas.pdf",
+            "maquetacion": {"COLS": 2, "FONT_NOMBRE": 7.0},
+        },
+    ]
+    resultados, tiempos = compilar_ediciones(ediciones, excel.EXCEL_FILE, trabajadores=1)
+    assert set(tiempos) == {"carga", "medicion", "ediciones"}
+    por_nombre = {r["nombre"]: r for r in resultados}
+    completa = por_nombre["completa"]
+    assert completa["hoteles"] == len(excel.cargar_registro(excel.EXCEL_FILE))
+    assert por_nombre["Andalucía"]["hoteles"] < completa["hoteles"]
+    assert por_nombre["dos columnas"]["paginas"] > completa["paginas"]
+    for r in resultados:
+        assert os.path.getsize(r["salida"]) > 0
+    # El proceso principal vuelve a la maquetación de fábrica
+    assert excel.COLS == 3
+
+
+def test_trabajador_reutiliza_los_bloques_medidos(tmp_path, registro, monkeypatch):
+    monkeypatch.setattr(ediciones, "_REGISTRO", None)
+    monkeypatch.setattr(ediciones, "_MEDIDAS", {})
+    monkeypatch.setattr(excel, "BLOQUES_HOTEL", {})
+    edicion = {"nombre": "prueba", "salida": str(tmp_path / "prueba.pdf")}
+    try:
+        ediciones._iniciar_trabajador(registro, {}, {}, {})
+        medidas, anchos, bloques = ediciones._medir(edicion, list(registro.index))
+        huella = excel.huella_maquetacion()
+        assert len(bloques) > 0
+
+        # Otro trabajador: parte de las cachés que le pasa el proceso principal
+        monkeypatch.setattr(excel, "BLOQUES_HOTEL", {})
+        ediciones._iniciar_trabajador(registro, {huella: medidas}, dict(anchos), dict(bloques))
+
+        def sin_partir(*_args):
+            raise AssertionError("bloque partido de nuevo en el trabajador")
+
+        monkeypatch.setattr(excel, "_partir_multi_cell", sin_partir)
+        resultado = ediciones._construir(edicion, huella)
+    finally:
+        ediciones._aplicar({})
+    assert resultado["hoteles"] == len(registro)
+    assert os.path.getsize(edicion["salida"]) > 0
+
+
+def test_dibujar_bloque_acaba_donde_multi_cell(registro):
+    fila = registro.iloc[0]
+    bloque = excel.bloque_hotel(excel.construir_lineas_hotel(fila))
+    pdf = excel.PDF()
+    pdf.set_auto_page_break(auto=False)
+    pdf.provincia_actual = None
+    pdf.add_page()
+    y = pdf.dibujar_bloque(20, 30, bloque, excel.line_height)
+
+    pdf.set_xy(20, 30)
+    for estilo, size, lineas in bloque.tramos:
+        pdf.set_font(excel.FUENTE, estilo, size)
+        for linea in lineas:
+            pdf.multi_cell(excel.ancho_texto, excel.line_height, linea, align="L")
+            pdf.set_x(20)
+    assert y == pdf.get_y()
+
+
+def test_lote_vacio(carpeta):
+    assert compilar_ediciones([], excel.EXCEL_FILE, trabajadores=2) == ([], {})
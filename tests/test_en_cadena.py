@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+import excel
+
+
+def test_en_cadena_igual_que_en_dos_pasadas(tmp_path, excel_pequeno, registro):
+    ruta_excel = tmp_path / "ordenado.xlsx"
+    pd.read_excel(excel_pequeno).loc[registro.index].to_excel(ruta_excel, index=False)
+
+    filas, libro = excel.construir_libro_en_cadena(str(ruta_excel), str(tmp_path / "cadena.pdf"))
+
+    ordenado = excel.cargar_registro(str(ruta_excel))
+    assert list(filas.index) == list(ordenado.index)
+    prov_pages, _paginas = excel.paginar_provincias(ordenado, {})
+    normal = excel.construir_libro(ordenado, prov_pages, str(tmp_path / "normal.pdf"))
+    for clave in ("prov_pages", "hotel_pages", "loc_pages", "paginas_fila", "paginas"):
+        assert libro[clave] == normal[clave], clave
+    assert set(libro["paginas_provincia"]) == set(ordenado["PROVINCIA"])
+
+    pymupdf = pytest.importorskip("pymupdf")
+    textos = [
+        [pagina.get_text() for pagina in pymupdf.open(str(tmp_path / nombre))]
+        for nombre in ("cadena.pdf", "normal.pdf")
+    ]
+    assert textos[0] == textos[1]
+
+
+def test_registro_desordenado(tmp_path, excel_pequeno):
+    # El Excel de las pruebas conserva el orden original, no el del catálogo
+    with pytest.raises(excel.RegistroDesordenado):
+        excel.construir_libro_en_cadena(excel_pequeno, str(tmp_path / "cadena.pdf"))
+    assert not (tmp_path / "cadena.pdf").exists()
+
+
+def test_lector_muerto_no_bloquea(tmp_path, excel_pequeno, monkeypatch):
+    def lector_que_muere(_ruta, _cola):
+        os._exit(9)
+
+    monkeypatch.setattr(excel, "_leer_provincias", lector_que_muere)
+    monkeypatch.setattr(excel, "ESPERA_LECTOR", 0.1)
+    with pytest.raises(excel.LectorInterrumpido, match="código 9"):
+        excel.construir_libro_en_cadena(excel_pequeno, str(tmp_path / "cadena.pdf"))
+    assert not (tmp_path / "cadena.pdf").exists()
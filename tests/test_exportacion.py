@@ -0,0 +1,50 @@
+import csv
+import json
+import os
+
+import pytest
+
+import excel
+from exportacion import Destino
+from progreso import CompilacionCancelada, Progreso, TokenCancelacion
+
+
+def _temporales(carpeta):
+    return [nombre for nombre in os.listdir(carpeta) if nombre.endswith(".tmp")]
+
+
+def test_destino_es_abstracto():
+    with pytest.raises(TypeError):
+        Destino("salida.txt")
+
+
+def test_salidas_de_texto(carpeta, monkeypatch):
+    monkeypatch.setattr(excel, "USAR_CACHE", False)
+    excel.compilar()
+    hoteles = len(excel.cargar_registro())
+
+    with open(excel.JSONL_FILE, encoding="utf-8") as f:
+        registros = [json.loads(linea) for linea in f]
+    assert len(registros) == hoteles
+    assert all(r["pagina_localidad"] <= r["pagina"] for r in registros)
+    with open(excel.CSV_PAGINAS_FILE, encoding="utf-8-sig", newline="") as f:
+        assert len(list(csv.reader(f, delimiter=";"))) == hoteles + 1
+    assert os.path.exists(os.path.join(excel.CARPETA_HTML, "index.html"))
+    assert _temporales(carpeta) == []
+
+
+def test_cancelar_no_deja_temporales(carpeta, monkeypatch):
+    monkeypatch.setattr(excel, "USAR_CACHE", False)
+    token = TokenCancelacion()
+
+    def cancelar_tras_una_provincia(evento):
+        # Los destinos ya tienen hoteles escritos en sus temporales
+        if evento["etapa"] == "render" and evento["evento"] == "avance":
+            assert os.path.exists(excel.JSONL_FILE + ".tmp")
+            token.cancelar()
+
+    with pytest.raises(CompilacionCancelada):
+        excel.compilar(Progreso(cancelar_tras_una_provincia, token))
+    assert _temporales(carpeta) == []
+    for ruta in (excel.JSONL_FILE, excel.CSV_PAGINAS_FILE, excel.CARPETA_HTML):
+        assert not os.path.exists(ruta)
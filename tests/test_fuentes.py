@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import excel
+
+pymupdf = pytest.importorskip("pymupdf")
+
+
+@pytest.fixture
+def modo_unicode(monkeypatch):
+    """FUENTES_TTF asignada directamente en el módulo, sin pasar por
+    `configurar_maquetacion`."""
+    if not all(os.path.exists(r) for r in excel.FUENTES_DEJAVU.values()):
+        pytest.skip("No están las fuentes DejaVu")
+    monkeypatch.setattr(excel, "FUENTE", excel.FUENTE)
+    monkeypatch.setattr(excel, "FUENTES_TTF", excel.FUENTES_DEJAVU)
+
+
+def _libro(tmp_path, registro):
+    filas = registro[registro["PROVINCIA"] == "CEUTA"].copy()
+    filas["NOMBRE DE EMPRESA"] = filas["NOMBRE DE EMPRESA"].astype(object)
+    filas.loc[filas.index[0], "NOMBRE DE EMPRESA"] = "HOTEL CAL PAU·LA Ŀ “€”"
+    prov_pages, _paginas = excel.paginar_provincias(filas, {})
+    ruta = str(tmp_path / "libro.pdf")
+    excel.construir_libro(filas, prov_pages, ruta)
+    return pymupdf.open(ruta)
+
+
+def test_fuentes_ttf_asignadas_en_el_modulo(tmp_path, registro, modo_unicode):
+    doc = _libro(tmp_path, registro)
+    assert excel.FUENTE == "Texto"
+    texto = "".join(pagina.get_text() for pagina in doc)
+    assert "CAL PAU·LA Ŀ “€”" in texto
+    fuentes = {f[3] for pagina in doc for f in pagina.get_fonts()}
+    assert all("DejaVu" in f for f in fuentes)
+
+
+def test_modo_latin1_descarta_lo_que_no_cabe(tmp_path, registro):
+    doc = _libro(tmp_path, registro)
+    assert excel.FUENTE == "Helvetica"
+    assert "CAL PAU·LA  " in "".join(pagina.get_text() for pagina in doc)
+
+
+def test_enc_y_huella_no_cambian_la_fuente(monkeypatch):
+    monkeypatch.setattr(excel, "FUENTE", excel.FUENTE)
+    monkeypatch.setattr(excel, "FUENTES_TTF", None)
+    huella_latin1 = excel.huella_maquetacion()
+    monkeypatch.setattr(excel, "FUENTES_TTF", excel.FUENTES_DEJAVU)
+
+    assert excel._enc("Ŀ€") == "Ŀ€"
+    assert excel.huella_maquetacion() != huella_latin1
+    assert excel.FUENTE == "Helvetica"
+    # Se sincroniza al crear el PDF
+    if all(os.path.exists(r) for r in excel.FUENTES_DEJAVU.values()):
+        excel.PDF()
+        assert excel.FUENTE == "Texto"
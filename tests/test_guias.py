@@ -0,0 +1,36 @@
+import pytest
+
+from guias import SesionCatalogo, filtrar_registro
+
+
+def test_filtros(registro):
+    andalucia = filtrar_registro(registro, comunidad="Andalucia")
+    assert set(andalucia["PROVINCIA"]) == {"ALMERÍA"}
+    ciudades = filtrar_registro(registro, provincia=["ceuta", "Melilla"])
+    assert set(ciudades["PROVINCIA"]) == {"CEUTA", "MELILLA"}
+
+    playa = filtrar_registro(registro, modalidad="playa")
+    assert len(playa) > 0
+    assert all("playa" in str(m).lower() for m in playa["MODALIDAD"])
+
+    cinco = filtrar_registro(registro, provincia="Almería", estrellas=[4, 5])
+    assert set(cinco["ESTRELLAS"]) <= {4, 5}
+    # Filtrar no cambia el orden del catálogo
+    assert list(cinco.index) == [i for i in registro.index if i in set(cinco.index)]
+
+    with pytest.raises(ValueError):
+        filtrar_registro(registro, comunidad="Atlántida")
+
+
+def test_guia_filtrada(tmp_path, registro):
+    sesion = SesionCatalogo(df=registro)
+    ruta = tmp_path / "guia.pdf"
+    libro = sesion.guia(str(ruta), provincia="Almería", modalidad="playa")
+    assert ruta.stat().st_size > 0
+    assert len(libro["paginas_fila"]) == len(
+        filtrar_registro(registro, provincia="Almería", modalidad="playa")
+    )
+    # Las medidas quedan en la sesión para la guía siguiente
+    assert sesion.medidas
+    with pytest.raises(ValueError):
+        sesion.guia(str(tmp_path / "vacia.pdf"), provincia="Soria", modalidad="playa")
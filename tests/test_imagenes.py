@@ -0,0 +1,32 @@
+import os
+
+from PIL import Image
+
+from imagenes import preparar_imagen
+
+
+def test_reduce_convierte_y_reutiliza(tmp_path):
+    original = tmp_path / "portada.png"
+    Image.new("RGBA", (4000, 6000), (64, 152, 193, 255)).save(original)
+    carpeta = str(tmp_path / "cache")
+
+    ruta = preparar_imagen(str(original), 50.8, 76.2, dpi=100, carpeta=carpeta)
+    with Image.open(ruta) as img:
+        assert img.format == "JPEG"
+        assert img.mode == "RGB"
+        assert img.size == (200, 300)  # 2" x 3" a 100 ppp
+
+    # Segunda vez: el mismo fichero, sin volver a escribirlo
+    marca = os.stat(ruta).st_mtime_ns
+    assert preparar_imagen(str(original), 50.8, 76.2, dpi=100, carpeta=carpeta) == ruta
+    assert os.stat(ruta).st_mtime_ns == marca
+    # Otro tamaño es otra entrada
+    assert preparar_imagen(str(original), 25.4, 25.4, dpi=100, carpeta=carpeta) != ruta
+
+
+def test_nunca_amplia(tmp_path):
+    original = tmp_path / "pequena.jpg"
+    Image.new("RGB", (100, 150), (255, 255, 255)).save(original)
+    ruta = preparar_imagen(str(original), 152.4, 228.6, carpeta=str(tmp_path / "cache"))
+    with Image.open(ruta) as img:
+        assert img.size == (100, 150)
@@ -0,0 +1,48 @@
+import pytest
+
+from indice_consulta import IndiceCatalogo, escribir_indice
+
+HOTELES = [
+    # nombre, página, provincia, localidad, fila
+    ("Catedral", 5, "ALMERÍA", "Almería", 10),
+    ("Costasol", 5, "ALMERÍA", "Almería", 3),
+    ("Cabo de Gata", 6, "ALMERÍA", "San José", 7),
+    ("Ciudad de Soria", 9, "SORIA", "Soria", 1),
+    ("Catedral", 9, "SORIA", "El Burgo de Osma", 2),
+]
+
+
+@pytest.fixture
+def indice(tmp_path):
+    ruta = str(tmp_path / "catalogo.idx")
+    escribir_indice(ruta, HOTELES)
+    with IndiceCatalogo(ruta) as indice:
+        yield indice
+
+
+def test_busqueda_exacta_de_hotel(indice):
+    encontrados = indice.hotel("HOTEL CATEDRAL")
+    assert sorted((h.provincia, h.pagina, h.fila) for h in encontrados) == [
+        ("ALMERÍA", 5, 10), ("SORIA", 9, 2),
+    ]
+    assert indice.hotel("Inexistente") == []
+
+
+def test_busqueda_por_prefijo(indice):
+    nombres = [h.nombre for h in indice.hoteles_con_prefijo("ca")]
+    assert sorted(nombres) == ["Cabo de Gata", "Catedral", "Catedral"]
+    assert [p.nombre for p in indice.poblaciones_con_prefijo("s")] == ["San José", "Soria"]
+
+
+def test_hoteles_de_poblacion(indice):
+    (almeria,) = indice.poblacion("almeria")
+    assert (almeria.pagina, almeria.hoteles) == (5, 2)
+    assert [h.nombre for h in indice.hoteles_de_poblacion("Almería")] == ["Catedral", "Costasol"]
+    assert indice.hoteles_de_poblacion("El Burgo de Osma")[0].localidad == "El Burgo de Osma"
+
+
+def test_rechaza_otro_fichero(tmp_path):
+    ruta = tmp_path / "otro.idx"
+    ruta.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        IndiceCatalogo(str(ruta))
@@ -0,0 +1,92 @@
+import pytest
+
+import excel
+
+pymupdf = pytest.importorskip("pymupdf")
+
+TEXTOS = [(30.0, 40.0, "Almería ..... 12"), (70.5, 40.0, "Soria ..... 7"), (30.0, 42.9, "Ceuta ..... 3")]
+
+
+def _pagina(dibujar):
+    pdf = excel.PDF()
+    pdf.set_auto_page_break(auto=False)
+    pdf.provincia_actual = None
+    pdf.add_page()
+    pdf.set_font(excel.FUENTE, "", excel.FONT_INDICE)
+    dibujar(pdf)
+    return pymupdf.open(stream=bytes(pdf.output()), filetype="pdf")[0]
+
+
+def test_textos_en_bloque_como_cell():
+    def con_celdas(pdf):
+        for x, y, texto in TEXTOS:
+            pdf.set_xy(x, y)
+            pdf.cell(20, excel.ROW_H_INDICE, texto, align="L")
+
+    def en_bloque(pdf):
+        pdf.textos_en_bloque(TEXTOS, excel.ROW_H_INDICE)
+
+    assert _pagina(en_bloque).get_text("words") == _pagina(con_celdas).get_text("words")
+
+
+def test_indice_alfabetico(tmp_path):
+    entradas = [(f"Hotel {n:04d}", 1) for n in range(700)]
+    pdf = excel.PDF()
+    pdf.set_auto_page_break(auto=False)
+    paginas = excel.render_indice_alfabetico(pdf, excel.INDICE_HOTELES, entradas)
+    pdf.output(str(tmp_path / "indice.pdf"))
+
+    doc = pymupdf.open(str(tmp_path / "indice.pdf"))
+    assert len(doc) == paginas["ultima"]
+    prevision = excel.prever_indice(len(entradas), 1)
+    assert {k: prevision[k] for k in paginas} == paginas
+    # Columnas verticales: en cada página las entradas siguen el orden dado
+    vistas = []
+    for pagina in doc.pages(paginas["primera"] - 1, paginas["ultima"]):
+        palabras = pagina.get_text("words")
+        filas = sorted(
+            (round(w[0]), w[1], w[4] + " " + palabras[i + 1][4])
+            for i, w in enumerate(palabras) if w[4] == "Hotel"
+        )
+        vistas += [texto for _x, _y, texto in filas]
+    assert vistas == [texto for texto, _pagina in entradas]
+
+
+@pytest.mark.parametrize("valores", [{}, {"ALTO_TITULO_INDICE": 6.0, "SEP_CABECERA_INDICE": 3.1}])
+def test_prevision_sigue_a_la_cabecera(monkeypatch, valores):
+    for nombre, valor in valores.items():
+        monkeypatch.setattr(excel, nombre, valor)
+    pdf = excel.PDF()
+    pdf.set_auto_page_break(auto=False)
+    pdf.provincia_actual = None
+    pdf.add_page()
+    y = excel.cabecera_indice(pdf, excel.TITULO_HOTELES_ES, excel.TITULO_HOTELES_EN)
+    assert excel.filas_columna_indice()[0] == y
+
+    n = 3 * excel.prever_indice(0, 1)["por_pagina"] - 5
+    paginas = excel.render_indice_alfabetico(pdf, excel.INDICE_HOTELES, [(str(i), 1) for i in range(n)])
+    assert paginas == {k: v for k, v in excel.prever_indice(n, 2).items() if k in paginas}
+
+
+def test_tercer_indice_solo_en_indices(tmp_path, registro, monkeypatch):
+    def entradas_capitales(filas, _hotel_pages, loc_pages):
+        capitales = filas.loc[filas["ES_CAPITAL"], "LOCALIDAD"].map(str).unique()
+        return sorted((c, loc_pages[c]) for c in capitales)
+
+    capitales = excel.IndiceAlfabetico(
+        "indice_capitales", "Capitales", "Capitals", "CAPITALES", "CAPITALS", "Índice de capitales",
+    )
+    monkeypatch.setattr(excel, "INDICES", excel.INDICES + ((capitales, entradas_capitales),))
+
+    prov_pages, paginas_provincia = excel.paginar_provincias(registro, {})
+    catalogo = sum(map(sum, paginas_provincia.values()))
+    prevision = excel.prever_indices(registro, excel.paginas_fijas_antes() + catalogo)
+    libro = excel.construir_libro(registro, prov_pages, str(tmp_path / "libro.pdf"))
+
+    assert list(libro["indices"]) == [indice.etapa for indice, _e in excel.INDICES]
+    for etapa, paginas in libro["indices"].items():
+        assert (paginas["primera"], paginas["ultima"]) == (
+            prevision[etapa]["primera"], prevision[etapa]["ultima"]
+        )
+    n_entradas = [len(e) for e in excel.entradas_previstas(registro)]
+    assert prevision["paginas"] == libro["paginas"] == excel.paginas_libro(catalogo, n_entradas)
@@ -0,0 +1,17 @@
+import excel
+from delta_registro import huellas_registro
+
+
+def test_registro_compacto_imprime_lo_mismo(excel_pequeno):
+    normal = excel.cargar_registro(excel_pequeno, compacto=False)
+    compacto = excel.cargar_registro(excel_pequeno, compacto=True)
+
+    assert list(compacto.index) == list(normal.index)
+    assert list(compacto.columns) == [c for c in excel.COLUMNAS_REGISTRO if c in compacto.columns]
+    assert str(compacto["PROVINCIA"].dtype) == "category"
+    assert compacto.memory_usage(deep=True).sum() < normal.memory_usage(deep=True).sum()
+
+    for (_i, fila_normal), (_j, fila_compacta) in zip(normal.iterrows(), compacto.iterrows()):
+        assert excel.construir_lineas_hotel(fila_compacta) == excel.construir_lineas_hotel(fila_normal)
+    # Las huellas del delta no dependen de los tipos de columna
+    assert huellas_registro(compacto) == huellas_registro(normal)
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+import excel
+
+pikepdf = pytest.importorskip("pikepdf")
+pymupdf = pytest.importorskip("pymupdf")
+
+
+def test_esquema_y_enlaces_solo_en_el_perfil_web(tmp_path, registro):
+    filas = registro[registro["PROVINCIA"].isin(["CEUTA", "MELILLA", "SORIA"])]
+    prov_pages, _paginas = excel.paginar_provincias(filas, {})
+    imprenta = str(tmp_path / "libro.pdf")
+    web = str(tmp_path / "libro_web.pdf")
+    libro = excel.construir_libro(filas, prov_pages, imprenta, web)
+
+    # El PDF de imprenta no lleva esquema ni enlaces
+    with pikepdf.open(imprenta) as doc:
+        assert "/Outlines" not in doc.Root
+        assert not any("/Annots" in pagina.obj for pagina in doc.pages)
+
+    doc = pymupdf.open(web)
+    esquema = doc.get_toc()
+    secciones = [(titulo, pagina) for nivel, titulo, pagina in esquema if nivel == 1]
+    indices = libro["indices"]
+    assert secciones == (
+        [(excel.MARCADOR_PROVINCIAS, 1)]
+        + sorted(libro["prov_pages"].items(), key=lambda p: p[1])
+        + [(excel.INDICE_HOTELES.marcador, indices["indice_hoteles"]["portada"]),
+           (excel.INDICE_POBLACIONES.marcador, indices["indice_poblaciones"]["portada"])]
+    )
+    localidades = {str(loc).upper() for loc in filas["LOCALIDAD"]}
+    assert {titulo for nivel, titulo, _p in esquema if nivel == 2} == localidades
+
+    destinos = {}
+    for n, pagina in enumerate(doc, start=1):
+        destinos[n] = [enlace["page"] + 1 for enlace in pagina.get_links()]
+    assert destinos[1] and all(p in libro["prov_pages"].values() for p in destinos[1])
+    hoteles = indices["indice_hoteles"]
+    enlaces_hoteles = [
+        p for n in range(hoteles["primera"], hoteles["ultima"] + 1) for p in destinos[n]
+    ]
+    assert sorted(enlaces_hoteles) == sorted(libro["hotel_pages"].values())
+
+
+def test_navegacion_en_cadena(tmp_path, excel_pequeno, registro):
+    # La tabla de provincias se dibuja al escribir el PDF: sus enlaces también
+    ruta_excel = tmp_path / "ordenado.xlsx"
+    pd.read_excel(excel_pequeno).loc[registro.index].to_excel(ruta_excel, index=False)
+    _filas, libro = excel.construir_libro_en_cadena(
+        str(ruta_excel), str(tmp_path / "libro.pdf"), str(tmp_path / "libro_web.pdf")
+    )
+    doc = pymupdf.open(str(tmp_path / "libro_web.pdf"))
+    assert sorted(enlace["page"] + 1 for enlace in doc[0].get_links()) == sorted(
+        libro["prov_pages"].values()
+    )
+    assert len(doc.get_toc()) > len(libro["prov_pages"])
@@ -0,0 +1,22 @@
+import pandas as pd
+
+import excel
+from delta_registro import claves_hotel
+from normalizacion import limpiar_nombre_hotel, nombre_clave, normalizar_ciudad
+
+
+def test_reglas_de_nombres():
+    assert limpiar_nombre_hotel("  Hotel Sol S.L. ") == "Sol"
+    assert normalizar_ciudad(" Vitoria-Gasteiz/Álava ") == "VITORIA GASTEIZ ALAVA"
+    assert nombre_clave("HOTEL Cañada-Real s.l") == "CANADA REAL"
+
+
+def test_libro_y_delta_usan_las_mismas_reglas():
+    # El nombre de orden del libro y la clave del delta salen del mismo nombre limpio
+    nombre = "Hotel Águila S.L."
+    assert excel._nombre_orden(nombre) == "AGUILA"
+    df = pd.DataFrame({
+        "N. REGISTRO": ["-"], "CP": ["04001"],
+        "LOCALIDAD": ["Almería"], "NOMBRE DE EMPRESA": [nombre],
+    })
+    assert claves_hotel(df) == ["C:04001|ALMERIA|AGUILA"]
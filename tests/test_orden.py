@@ -0,0 +1,25 @@
+import pandas as pd
+
+import excel
+
+
+def test_lexsort_igual_que_sort_values(registro):
+    """El orden de `preparar_registro` es el del `sort_values` por columnas
+    que sustituye, con empates en el orden del Excel."""
+    referencia = registro.sort_index().sort_values(
+        by=["PROVINCIA", "ES_CAPITAL", "LOCALIDAD", "ESTRELLAS", "NOMBRE_ORDEN"],
+        key=lambda col: (
+            col.map(excel.normalizar_provincia) if col.name in ["PROVINCIA", "LOCALIDAD"] else col
+        ),
+        ascending=[True, False, True, False, True],
+        kind="stable",
+    )
+    assert list(registro.index) == list(referencia.index)
+
+
+def test_rango_denso():
+    rangos = excel.rango_denso(
+        pd.Series(["Ávila", "avila", "Burgos", "Ávila"]),
+        excel.normalizar_provincia,
+    )
+    assert list(rangos) == [0, 0, 1, 0]
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+import excel
+
+pikepdf = pytest.importorskip("pikepdf")
+
+
+def test_perfiles_imprenta_y_web(tmp_path, registro):
+    filas = registro[registro["PROVINCIA"].isin(["CEUTA", "MELILLA"])]
+    prov_pages, _paginas = excel.paginar_provincias(filas, {})
+    imprenta = str(tmp_path / "libro.pdf")
+    web = str(tmp_path / "libro_web.pdf")
+    libro = excel.construir_libro(filas, prov_pages, imprenta, web)
+
+    salidas = libro["salidas"]
+    assert set(salidas) == {"imprenta", "web"}
+    for perfil, ruta in (("imprenta", imprenta), ("web", web)):
+        assert salidas[perfil]["bytes"] == os.path.getsize(ruta)
+        assert salidas[perfil]["segundos"] >= 0
+
+    with pikepdf.open(imprenta) as doc_imprenta, pikepdf.open(web) as doc_web:
+        assert not doc_imprenta.is_linearized
+        assert doc_web.is_linearized
+        assert len(doc_imprenta.pages) == len(doc_web.pages) == libro["paginas"]
+    with open(web, "rb") as f:
+        assert b"/ObjStm" in f.read()
+
+
+def test_nivel_de_compresion_restaurado(tmp_path, registro, monkeypatch):
+    niveles = []
+    monkeypatch.setattr(pikepdf.settings, "set_flate_compression_level", niveles.append)
+    filas = registro[registro["PROVINCIA"] == "CEUTA"]
+    prov_pages, _paginas = excel.paginar_provincias(filas, {})
+    excel.construir_libro(filas, prov_pages, str(tmp_path / "libro.pdf"), str(tmp_path / "web.pdf"))
+    assert niveles == [excel.NIVEL_FLATE_WEB, excel.NIVEL_FLATE_FABRICA]
+
+    def guardado_fallido(*_args, **_kwargs):
+        raise OSError("disco lleno")
+
+    niveles.clear()
+    monkeypatch.setattr(pikepdf.Pdf, "save", guardado_fallido)
+    with pytest.raises(OSError):
+        excel.construir_libro(filas, prov_pages, str(tmp_path / "libro.pdf"), str(tmp_path / "web.pdf"))
+    assert niveles[-1] == excel.NIVEL_FLATE_FABRICA
@@ -0,0 +1,56 @@
+"""`PDF.plantilla` depende de detalles internos de fpdf2 (ver requirements.txt):
+estas pruebas comparan páginas dibujadas con plantillas y sin ellas."""
+
+import pytest
+
+import excel
+
+pymupdf = pytest.importorskip("pymupdf")
+
+
+def _plantilla_en_linea(self, clave, dibujar, dx=0.0):
+    """Lo mismo que `PDF.plantilla`, pero dibujado en la página."""
+    self._out(f"q 1 0 0 1 {dx * self.k:.2f} 0 cm")
+    with self.local_context():
+        dibujar()
+    self._out("Q")
+
+
+def _libro():
+    """Una página de catálogo (cabecera con la línea) en cada lado y una
+    portada azul de sección en cada lado."""
+    pdf = excel.PDF()
+    pdf.set_auto_page_break(auto=False)
+    pdf.provincia_actual = "SORIA"
+    for _ in range(2):
+        pdf.add_page()
+    pdf.provincia_actual = None
+    for _ in range(2):
+        pdf.add_page()
+        excel.dibujar_portada_seccion(
+            pdf, excel.PORTADA_HOTELES_ES, excel.PORTADA_HOTELES_EN, pdf.page_no()
+        )
+    return bytes(pdf.output())
+
+
+def test_plantillas_dibujan_lo_mismo(monkeypatch):
+    con_plantillas = pymupdf.open(stream=_libro(), filetype="pdf")
+    monkeypatch.setattr(excel.PDF, "plantilla", _plantilla_en_linea)
+    sin_plantillas = pymupdf.open(stream=_libro(), filetype="pdf")
+
+    assert len(con_plantillas) == len(sin_plantillas) == 4
+    for a, b in zip(con_plantillas, sin_plantillas):
+        assert a.get_pixmap(dpi=72).samples == b.get_pixmap(dpi=72).samples
+        assert a.get_text() == b.get_text()
+
+
+def test_una_plantilla_por_elemento():
+    doc = pymupdf.open(stream=_libro(), filetype="pdf")
+    formularios = [
+        {x[0] for x in pagina.get_xobjects()} for pagina in doc
+    ]
+    # La línea de cabecera es la misma en las dos páginas de catálogo y el
+    # fondo de portada solo cambia de lado
+    assert formularios[0] == formularios[1]
+    assert len(formularios[0]) == 1
+    assert len(formularios[2] | formularios[3]) == 2
@@ -0,0 +1,50 @@
+import io
+import json
+import os
+
+import pytest
+
+import excel
+from progreso import CompilacionCancelada, Progreso, TokenCancelacion, salida_jsonl
+
+
+def test_eventos_jsonl():
+    fichero = io.StringIO()
+    progreso = Progreso(salida_jsonl(fichero))
+    progreso.inicio("render", 10)
+    progreso.avance("render", 5, 10, provincia="SORIA")
+    progreso.fin("render", paginas=3)
+    eventos = [json.loads(l) for l in fichero.getvalue().splitlines()]
+    assert [e["evento"] for e in eventos] == ["inicio", "avance", "fin"]
+    assert eventos[1]["hecho"] == 5 and eventos[1]["provincia"] == "SORIA"
+    assert eventos[2]["paginas"] == 3 and eventos[2]["segundos"] >= 0
+
+
+def test_compilacion_con_eventos(carpeta, monkeypatch):
+    monkeypatch.setattr(excel, "USAR_CACHE", False)
+    eventos = []
+    excel.compilar(Progreso(eventos.append))
+    fines = {e["etapa"] for e in eventos if e["evento"] == "fin"}
+    assert {"carga", "paginacion", "render", "indice_hoteles", "salida"} <= fines
+    provincias = [e["provincia"] for e in eventos
+                  if e["evento"] == "avance" and e["etapa"] == "render"]
+    assert provincias == [p for p, _t in excel.tramos_provincia(excel.cargar_registro())]
+
+
+def test_cancelar_no_escribe_salidas(carpeta, monkeypatch):
+    monkeypatch.setattr(excel, "USAR_CACHE", False)
+    token = TokenCancelacion()
+
+    def cancelar_al_dibujar(evento):
+        if evento["etapa"] == "render":
+            token.cancelar()
+
+    # Las propuestas de una compilación anterior siguen como estaban
+    with open(excel.DUPLICADOS_FILE, "w", encoding="utf-8") as f:
+        f.write("anteriores\n")
+    with pytest.raises(CompilacionCancelada):
+        excel.compilar(Progreso(cancelar_al_dibujar, token))
+    for ruta in (excel.PDF_FILE, excel.PDF_WEB_FILE, excel.SNAPSHOT_FILE, excel.INDICE_FILE):
+        assert not os.path.exists(ruta)
+    with open(excel.DUPLICADOS_FILE, encoding="utf-8") as f:
+        assert f.read() == "anteriores\n"
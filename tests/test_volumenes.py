@@ -0,0 +1,35 @@
+import pytest
+
+import excel
+from volumenes import construir_volumenes, planificar_volumenes
+
+
+def test_reparto_contiguo_y_equilibrado(registro):
+    medidas = {}
+    volumenes = planificar_volumenes(registro, medidas, n_volumenes=2)
+    assert len(volumenes) == 2
+    # Los volúmenes parten la secuencia de provincias sin saltarse ninguna
+    provincias = [p for v in volumenes for p in v["provincias"]]
+    assert provincias == [p for p, _t in excel.tramos_provincia(registro)]
+    assert sum(len(v["filas"]) for v in volumenes) == len(registro)
+    for v in volumenes:
+        assert v["margenes"] == excel.margenes_para_paginas(v["paginas"])
+
+    # Con un máximo de páginas el nº de volúmenes es el mínimo que lo cumple
+    una = planificar_volumenes(registro, medidas)
+    assert len(una) == 1
+    limite = max(v["paginas"] for v in volumenes)
+    assert all(v["paginas"] <= limite for v in planificar_volumenes(registro, medidas, max_paginas=limite))
+    with pytest.raises(ValueError):
+        planificar_volumenes(registro, medidas, max_paginas=5)
+    # Con el nº de volúmenes fijado también se respeta el máximo pedido
+    with pytest.raises(ValueError, match=f"máximo: {limite - 1}"):
+        planificar_volumenes(registro, medidas, n_volumenes=2, max_paginas=limite - 1)
+
+
+def test_volumen_dibujado_con_las_paginas_previstas(tmp_path, registro):
+    medidas = {}
+    volumenes = planificar_volumenes(registro, medidas, n_volumenes=2)
+    libros = construir_volumenes(volumenes, medidas, str(tmp_path / "vol{n}.pdf"))
+    assert [l["paginas"] for l in libros] == [v["paginas"] for v in volumenes]
+    assert (excel.MARGIN_GUTTER, excel.MARGIN_OUTER) == (19.3, 17.1)
@@ -0,0 +1,190 @@
+"""División automática del catálogo en varios volúmenes.
+
+Cuando el libro se acerca al máximo de páginas de KDP (cuantas más páginas,
+más ancho debe ser el medianil) se parte la secuencia de provincias en
+volúmenes consecutivos de tamaño lo más parecido posible. Cada volumen es un
+libro completo: su índice de provincias, portadas azules e índices
+alfabéticos, y el medianil que corresponde a SU nº de páginas.
+
+Elegir los cortes no requiere dibujar nada: las páginas de cada provincia
+salen de la simulación de `paginar_provincias` y las de los índices de
+`paginas_indice`, así que el total de cada volumen candidato se conoce de
+antemano. Solo se renderizan los volúmenes elegidos.
+
+Uso:
+    python volumenes.py                    # nº mínimo de volúmenes para KDP
+    python volumenes.py -n 3               # exactamente 3 volúmenes
+    python volumenes.py --max-paginas 400  # volúmenes de hasta 400 págs.
+"""
+
+import argparse
+import time
+
+import excel
+from excel import (
+    EXCEL_FILE,
+    MAX_PAGINAS_KDP,
+    cargar_registro,
+    construir_libro,
+    entradas_previstas,
+    margenes_para_paginas,
+    paginar_provincias,
+    paginas_libro,
+    tramos_provincia,
+)
+
+PLANTILLA_SALIDA = "catalogo_hoteles_vol{n}.pdf"
+
+
+def _resumen_tramos(filas, medidas):
+    """Páginas de catálogo de cada tramo de provincia y los textos de sus
+    entradas en cada índice alfabético (en el orden de `excel.INDICES`)."""
+    _prov_pages, paginas_provincia = paginar_provincias(filas, medidas)
+    usados = {}
+    resumen = []
+    for provincia, tramo in tramos_provincia(filas):
+        i = usados.get(provincia, 0)
+        usados[provincia] = i + 1
+        claves = [{texto for texto, _p in entradas} for entradas in entradas_previstas(tramo)]
+        resumen.append((provincia, paginas_provincia[provincia][i], claves))
+    return resumen
+
+
+def _paginas_tramos(resumen):
+    """paginas[i][j]: páginas totales de un volumen con los tramos i..j-1."""
+    n = len(resumen)
+    paginas = [[0] * (n + 1) for _ in range(n + 1)]
+    for i in range(n):
+        catalogo = 0
+        claves = [set() for _indice in excel.INDICES]
+        for j in range(i, n):
+            catalogo += resumen[j][1]
+            for union, tramo in zip(claves, resumen[j][2]):
+                union |= tramo
+            paginas[i][j + 1] = paginas_libro(catalogo, [len(c) for c in claves])
+    return paginas
+
+
+def _reparto_optimo(paginas, n_tramos, n_volumenes):
+    """Cortes que minimizan el volumen más grueso (partición lineal).
+    Devuelve (máximo de páginas, lista de (inicio, fin) de cada volumen)."""
+    infinito = float("inf")
+    mejor = [[infinito] * (n_tramos + 1) for _ in range(n_volumenes + 1)]
+    corte = [[0] * (n_tramos + 1) for _ in range(n_volumenes + 1)]
+    mejor[0][0] = 0
+    for k in range(1, n_volumenes + 1):
+        for j in range(k, n_tramos + 1):
+            for i in range(k - 1, j):
+                coste = max(mejor[k - 1][i], paginas[i][j])
+                if coste < mejor[k][j]:
+                    mejor[k][j] = coste
+                    corte[k][j] = i
+    rangos = []
+    j = n_tramos
+    for k in range(n_volumenes, 0, -1):
+        i = corte[k][j]
+        rangos.append((i, j))
+        j = i
+    return mejor[n_volumenes][n_tramos], rangos[::-1]
+
+
+def planificar_volumenes(filas, medidas=None, n_volumenes=None, max_paginas=MAX_PAGINAS_KDP):
+    """Decide los volúmenes sin renderizar ninguno.
+
+    Con `n_volumenes=None` usa el menor nº de volúmenes en que ninguno pasa
+    de `max_paginas`; con `n_volumenes` dado, falla si alguno pasa de
+    `max_paginas`. Devuelve una lista de dicts con `provincias`, `filas`
+    (subconjunto del registro), `paginas` previstas y `margenes`
+    (medianil, exterior).
+    """
+    medidas = {} if medidas is None else medidas
+    tramos = tramos_provincia(filas)
+    resumen = _resumen_tramos(filas, medidas)
+    paginas = _paginas_tramos(resumen)
+    n_tramos = len(tramos)
+
+    if n_volumenes is None:
+        for n_volumenes in range(1, n_tramos + 1):
+            maximo, rangos = _reparto_optimo(paginas, n_tramos, n_volumenes)
+            if maximo <= max_paginas:
+                break
+        else:
+            raise ValueError(
+                f"Hay provincias que por sí solas superan {max_paginas} páginas"
+            )
+    else:
+        if not 1 <= n_volumenes <= n_tramos:
+            raise ValueError(f"El nº de volúmenes debe estar entre 1 y {n_tramos}")
+        maximo, rangos = _reparto_optimo(paginas, n_tramos, n_volumenes)
+        if maximo > max_paginas:
+            raise ValueError(
+                f"Con {n_volumenes} volúmenes alguno tendría {maximo} páginas "
+                f"(máximo: {max_paginas})"
+            )
+
+    # Posición en `filas` de la primera fila de cada tramo
+    posiciones = [0]
+    for _provincia, tramo in tramos:
+        posiciones.append(posiciones[-1] + len(tramo))
+
+    volumenes = []
+    for i, j in rangos:
+        volumenes.append({
+            "provincias": [provincia for provincia, _tramo in tramos[i:j]],
+            "filas": filas.iloc[posiciones[i]:posiciones[j]],
+            "paginas": paginas[i][j],
+            "margenes": margenes_para_paginas(paginas[i][j]),
+        })
+    return volumenes
+
+
+def construir_volumenes(volumenes, medidas=None, plantilla=PLANTILLA_SALIDA):
+    """Renderiza cada volumen con el medianil de su nº de páginas. Devuelve
+    la lista de resultados de `construir_libro` (más `salida`)."""
+    medidas = {} if medidas is None else medidas
+    margenes_base = excel.MARGIN_GUTTER, excel.MARGIN_OUTER
+    resultados = []
+    try:
+        for n, volumen in enumerate(volumenes, start=1):
+            medianil, exterior = volumen["margenes"]
+            excel.configurar_maquetacion(MARGIN_GUTTER=medianil, MARGIN_OUTER=exterior)
+            prov_pages, _paginas = paginar_provincias(volumen["filas"], medidas)
+            salida = plantilla.format(n=n)
+            libro = construir_libro(volumen["filas"], prov_pages, salida)
+            libro["salida"] = salida
+            resultados.append(libro)
+    finally:
+        excel.configurar_maquetacion(
+            MARGIN_GUTTER=margenes_base[0], MARGIN_OUTER=margenes_base[1]
+        )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Divide el catálogo en volúmenes.")
+    parser.add_argument("-n", "--volumenes", type=int, default=None)
+    parser.add_argument("--max-paginas", type=int, default=MAX_PAGINAS_KDP)
+    parser.add_argument("--excel", default=EXCEL_FILE)
+    parser.add_argument("-o", "--plantilla", default=PLANTILLA_SALIDA,
+                        help="nombre de salida con {n} para el nº de volumen")
+    args = parser.parse_args()
+
+    df = cargar_registro(args.excel)
+    medidas = {}
+    inicio = time.perf_counter()
+    volumenes = planificar_volumenes(df, medidas, args.volumenes, args.max_paginas)
+    print(f"Reparto en {len(volumenes)} volúmenes ({time.perf_counter() - inicio:.1f} s):")
+    for n, v in enumerate(volumenes, start=1):
+        print(
+            f"  Vol. {n}: {v['provincias'][0]} - {v['provincias'][-1]} "
+            f"({len(v['provincias'])} prov.), {v['paginas']} págs., "
+            f"medianil {v['margenes'][0]:.2f} mm"
+        )
+
+    for n, (v, libro) in enumerate(zip(volumenes, construir_volumenes(volumenes, medidas, args.plantilla)), start=1):
+        aviso = "" if libro["paginas"] == v["paginas"] else f" (previstas {v['paginas']})"
+        print(f"  Vol. {n}: {libro['paginas']} páginas{aviso} → {libro['salida']}")
+
+
+if __name__ == "__main__":
+    main()